@@ -0,0 +1,77 @@
+import logging
+import time
+from typing import Optional
+from urllib.parse import quote
+
+from requests import RequestException
+
+from bci import util
+
+logger = logging.getLogger(__name__)
+
+DEVTOOLS_PORT = 9222
+
+
+class DevToolsSession:
+    """
+    Controls a running Chromium process through the HTTP endpoints of its remote debugging server.
+    Only the endpoints to open and close tabs are used, which are supported by (almost) all Chromium builds that have a
+    remote debugging server at all.
+    """
+
+    def __init__(self, port: int = DEVTOOLS_PORT) -> None:
+        self.__base_url = f'http://127.0.0.1:{port}'
+
+    @staticmethod
+    def get_args(port: int = DEVTOOLS_PORT) -> list[str]:
+        """
+        Returns the command line arguments that enable the remote debugging server.
+        """
+        return [f'--remote-debugging-port={port}']
+
+    def wait_until_available(self, timeout: float) -> bool:
+        """
+        Waits until the remote debugging server of the browser accepts requests.
+
+        :param timeout: The maximum number of seconds to wait.
+        :return: True if the server is available, False if the timeout expired.
+        """
+        deadline = time.monotonic() + timeout
+        # Requests are not retried, since the browser either answers right away or is not ready (yet).
+        session = util.get_session(max_retries=0)
+        while time.monotonic() < deadline:
+            try:
+                if session.get(f'{self.__base_url}/json/version', timeout=1).status_code == 200:
+                    return True
+            except RequestException:
+                pass
+            time.sleep(0.1)
+        logger.debug(f'Remote debugging server did not become available within {timeout}s')
+        return False
+
+    def open_tab(self, url: str) -> Optional[str]:
+        """
+        Opens the given URL in a new tab.
+
+        :return: The id of the tab, or None if it could not be opened.
+        """
+        endpoint = f'{self.__base_url}/json/new?{quote(url, safe=":/?&=%")}'
+        session = util.get_session(max_retries=0)
+        try:
+            # Recent builds require PUT, older builds only accept GET.
+            response = session.put(endpoint, timeout=5)
+            if response.status_code >= 400:
+                response = session.get(endpoint, timeout=5)
+            if response.status_code >= 400:
+                logger.error(f'Could not open tab for {url}: {response.status_code} {response.text}')
+                return None
+            return response.json().get('id')
+        except (RequestException, ValueError):
+            logger.error(f'Could not open tab for {url}', exc_info=True)
+            return None
+
+    def close_tab(self, tab_id: str) -> None:
+        try:
+            util.get_session(max_retries=0).get(f'{self.__base_url}/json/close/{tab_id}', timeout=5)
+        except RequestException:
+            logger.debug(f'Could not close tab {tab_id}', exc_info=True)
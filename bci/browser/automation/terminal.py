@@ -2,19 +2,45 @@ import logging
 import signal
 import subprocess
 import time
+from typing import Callable, Optional
 
 logger = logging.getLogger(__name__)
 
 
 class TerminalAutomation:
     @staticmethod
-    def visit_url(url: str, args: list[str], seconds_per_visit: int):
+    def visit_url(
+        url: str, args: list[str], seconds_per_visit: int, wait_for_completion: Optional[Callable[[float], bool]] = None
+    ):
+        """
+        Visits the given URL in a new browser process.
+
+        :param url: The URL to visit.
+        :param args: The arguments to start the browser.
+        :param seconds_per_visit: The (maximum) duration of the visit.
+        :param wait_for_completion: Waits at most the given number of seconds for the page to complete, and returns
+            whether it did. If not given, the visit always takes `seconds_per_visit` seconds.
+        """
         args.append(url)
         proc = TerminalAutomation.open_browser(args)
-        logger.debug(f'Visiting the page for {seconds_per_visit}s')
-        time.sleep(seconds_per_visit)
+        TerminalAutomation.wait_during_visit(seconds_per_visit, wait_for_completion)
         TerminalAutomation.terminate_browser(proc, args)
 
+    @staticmethod
+    def wait_during_visit(seconds_per_visit: int, wait_for_completion: Optional[Callable[[float], bool]] = None):
+        """
+        Waits while the browser visits a page, for `seconds_per_visit` seconds or until the page completes.
+        """
+        if wait_for_completion is None:
+            logger.debug(f'Visiting the page for {seconds_per_visit}s')
+            time.sleep(seconds_per_visit)
+        else:
+            start = time.time()
+            completed = wait_for_completion(seconds_per_visit)
+            logger.debug(
+                f'Visited the page for {time.time() - start:.2f}s ({"completed" if completed else "timed out"})'
+            )
+
     @staticmethod
     def open_browser(args: list[str]) -> subprocess.Popen:
         logger.debug('Starting browser process...')
@@ -8,6 +8,7 @@ from typing import Optional
 
 from bci import util
 from bci.browser.binary.artisanal_manager import ArtisanalBuildManager
+from bci.browser.binary.binary_store import BinaryStore
 from bci.database.mongo.binary_cache import BinaryCache
 from bci.version_control.states.state import State
 
@@ -75,9 +76,14 @@ class Binary:
         if self.is_built():
             logger.info(f'Binary for {self.state.index} is already in place')
             return
+        # Consult node-local binary store
+        elif BinaryStore.fetch_binary_files(self.get_potential_bin_path(), self.state):
+            logger.info(f'Binary for {self.state.index} fetched from store')
+            return
         # Consult binary cache
         elif BinaryCache.fetch_binary_files(self.get_potential_bin_path(), self.state):
             logger.info(f'Binary for {self.state.index} fetched from cache')
+            BinaryStore.store_binary_files(self.get_potential_bin_path(), self.state)
             return
         # Try to download binary
         elif self.is_available_online():
@@ -85,6 +91,7 @@ class Binary:
             self.download_binary()
             elapsed_time = time.time() - start
             logger.info(f'Binary for {self.state.index} downloaded in {elapsed_time:.2f}s')
+            BinaryStore.store_binary_files(self.get_potential_bin_path(), self.state)
             BinaryCache.store_binary_files(self.get_potential_bin_path(), self.state)
         else:
             raise BuildNotAvailableError(self.browser_name, self.state)
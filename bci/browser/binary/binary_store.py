@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import contextlib
+import fcntl
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from typing import Iterator, Optional
+
+from bci import util
+from bci.configuration import Global
+from bci.version_control.states.state import State
+
+logger = logging.getLogger(__name__)
+
+STORE_FOLDER_PATH = '/app/browser/binaries/store'
+ENTRY_BINARY_FOLDER_NAME = 'binary'
+ENTRY_MANIFEST_FILE_NAME = 'manifest.json'
+
+
+class BinaryStore:
+    """
+    Node-local store of browser binaries, shared by all workers on the same host.
+    It sits in front of the database binary cache: binaries are restored from the store through hard links, which
+    only fall back to copies if the store is on another file system than the binary folders.
+
+    Each state has at most one entry, of which the content never changes once it is published. Entries are populated
+    in a temporary folder and published through an atomic rename, while a lock file per entry makes sure that only one
+    worker populates it. Since the files of an entry are shared with the binary folders that were restored from it,
+    binary files must never be modified in place. The store is bounded in size by evicting the least recently used
+    entries, which does not affect restored binary folders.
+    """
+
+    @staticmethod
+    def is_enabled() -> bool:
+        return Global.get_binary_store_limit() > 0 and os.path.isdir(STORE_FOLDER_PATH)
+
+    @staticmethod
+    def fetch_binary_files(binary_executable_path: str, state: State) -> bool:
+        """
+        Links the binary of the given state from the store to the folder of the given path.
+
+        :param binary_executable_path: The path where the binary executable should be restored.
+        :param state: The state of the binary.
+        :return: True if the binary was restored, False otherwise.
+        """
+        if not BinaryStore.is_enabled():
+            return False
+        entry_path = BinaryStore.__get_entry_path(state)
+        if not os.path.isdir(entry_path):
+            return False
+
+        binary_folder_path = os.path.dirname(binary_executable_path)
+        start_time = time.time()
+        # A shared lock prevents the entry from being evicted while it is being linked.
+        with BinaryStore.__lock(state, shared=True):
+            if not os.path.isdir(entry_path):
+                return False
+            try:
+                is_linked = util.link_folder(os.path.join(entry_path, ENTRY_BINARY_FOLDER_NAME), binary_folder_path)
+            except OSError:
+                logger.error(f'Could not restore binary for {state} from store', exc_info=True)
+                shutil.rmtree(binary_folder_path, ignore_errors=True)
+                return False
+            # The modification time of the entry marks its last use.
+            os.utime(entry_path)
+        logger.debug(
+            f"{'Linked' if is_linked else 'Copied'} binary for {state} from store in {time.time() - start_time:.2f}s"
+        )
+        return True
+
+    @staticmethod
+    def store_binary_files(binary_executable_path: str, state: State) -> bool:
+        """
+        Publishes the binary in the folder of the given path to the store, if it is not there yet.
+
+        :param binary_executable_path: The path to the binary executable.
+        :param state: The state of the binary.
+        :return: True if the store holds the binary afterwards, False otherwise.
+        """
+        if not BinaryStore.is_enabled():
+            return False
+        entry_path = BinaryStore.__get_entry_path(state)
+        if os.path.isdir(entry_path):
+            return True
+
+        binary_folder_path = os.path.dirname(binary_executable_path)
+        tmp_entry_path = os.path.join(STORE_FOLDER_PATH, '.tmp', uuid.uuid4().hex)
+        with BinaryStore.__lock(state):
+            # Another worker might have published the entry while we were waiting for the lock.
+            if os.path.isdir(entry_path):
+                return True
+            try:
+                util.link_folder(binary_folder_path, os.path.join(tmp_entry_path, ENTRY_BINARY_FOLDER_NAME))
+                nb_of_bytes = BinaryStore.__get_folder_size(tmp_entry_path)
+                with open(os.path.join(tmp_entry_path, ENTRY_MANIFEST_FILE_NAME), 'w') as file:
+                    json.dump({'state': state.name, 'nb_of_bytes': nb_of_bytes}, file)
+                os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+                os.rename(tmp_entry_path, entry_path)
+            except OSError:
+                logger.error(f'Could not add binary for {state} to store', exc_info=True)
+                shutil.rmtree(tmp_entry_path, ignore_errors=True)
+                return False
+        logger.debug(f'Added binary for {state} to store ({nb_of_bytes / 1024**2:.1f} MB)')
+        BinaryStore.evict(keep=entry_path)
+        return True
+
+    @staticmethod
+    def evict(keep: Optional[str] = None) -> None:
+        """
+        Removes the least recently used entries until the store is within its size limit.
+        Entries that are being restored are skipped.
+
+        :param keep: The path of an entry that should not be evicted.
+        """
+        limit = Global.get_binary_store_limit()
+        with BinaryStore.__lock_path(os.path.join(STORE_FOLDER_PATH, '.locks', 'eviction.lock')):
+            entries = BinaryStore.__get_entries()
+            total_size = sum(nb_of_bytes for _, _, nb_of_bytes in entries)
+            for entry_path, _, nb_of_bytes in sorted(entries, key=lambda entry: entry[1]):
+                if total_size <= limit:
+                    break
+                if entry_path == keep:
+                    continue
+                lock_path = BinaryStore.__get_lock_path_of_entry(entry_path)
+                with BinaryStore.__lock_path(lock_path, blocking=False) as is_locked:
+                    if not is_locked:
+                        continue
+                    # Renaming first makes sure that workers never see a partially removed entry.
+                    trash_path = os.path.join(STORE_FOLDER_PATH, '.tmp', uuid.uuid4().hex)
+                    os.rename(entry_path, trash_path)
+                shutil.rmtree(trash_path, ignore_errors=True)
+                total_size -= nb_of_bytes
+                logger.debug(f"Evicted '{entry_path}' from store")
+
+    @staticmethod
+    def __get_entries() -> list[tuple[str, float, int]]:
+        """
+        Returns the path, last use and size of all entries in the store.
+        """
+        entries = []
+        for browser_name in os.listdir(STORE_FOLDER_PATH):
+            if browser_name.startswith('.'):
+                continue
+            browser_folder_path = os.path.join(STORE_FOLDER_PATH, browser_name)
+            for entry_name in os.listdir(browser_folder_path):
+                entry_path = os.path.join(browser_folder_path, entry_name)
+                try:
+                    with open(os.path.join(entry_path, ENTRY_MANIFEST_FILE_NAME)) as file:
+                        nb_of_bytes = json.load(file)['nb_of_bytes']
+                    entries.append((entry_path, os.path.getmtime(entry_path), nb_of_bytes))
+                except (OSError, ValueError, KeyError):
+                    logger.warning(f"Skipping invalid store entry '{entry_path}'")
+        return entries
+
+    @staticmethod
+    def __get_entry_path(state: State) -> str:
+        return os.path.join(STORE_FOLDER_PATH, state.browser_name, f'{state.type}_{state.index}')
+
+    @staticmethod
+    def __get_lock_path_of_entry(entry_path: str) -> str:
+        browser_name = os.path.basename(os.path.dirname(entry_path))
+        return os.path.join(STORE_FOLDER_PATH, '.locks', f'{browser_name}_{os.path.basename(entry_path)}.lock')
+
+    @staticmethod
+    def __get_folder_size(folder_path: str) -> int:
+        return sum(
+            os.path.getsize(os.path.join(root, file_name))
+            for root, _, file_names in os.walk(folder_path)
+            for file_name in file_names
+        )
+
+    @staticmethod
+    def __lock(state: State, shared: bool = False):
+        return BinaryStore.__lock_path(
+            BinaryStore.__get_lock_path_of_entry(BinaryStore.__get_entry_path(state)), shared=shared
+        )
+
+    @staticmethod
+    @contextlib.contextmanager
+    def __lock_path(lock_path: str, shared: bool = False, blocking: bool = True) -> Iterator[bool]:
+        """
+        Holds a lock on the given lock file, which is shared by all processes on the same host.
+
+        :param lock_path: The path of the lock file.
+        :param shared: Whether the lock is shared (for reading) or exclusive (for writing).
+        :param blocking: Whether to wait for the lock. If not, the context yields whether the lock was acquired.
+        """
+        os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+        os.makedirs(os.path.join(STORE_FOLDER_PATH, '.tmp'), exist_ok=True)
+        operation = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+        if not blocking:
+            operation |= fcntl.LOCK_NB
+        with open(lock_path, 'a') as lock_file:
+            try:
+                fcntl.flock(lock_file, operation)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
+import logging
 import os
 import subprocess
 from abc import abstractmethod
+from typing import Callable, Optional
 
 import bci.browser.binary.factory as binary_factory
 from bci import util
@@ -12,6 +14,8 @@ from bci.browser.configuration.profile import remove_profile_execution_folder
 from bci.evaluations.logic import BrowserConfiguration, EvaluationConfiguration
 from bci.version_control.states.state import State
 
+logger = logging.getLogger(__name__)
+
 EXECUTION_PARENT_FOLDER = '/tmp'
 
 
@@ -35,14 +39,46 @@ class Browser:
     def get_binary_origin(self) -> str:
         return self.binary.origin
 
-    def visit(self, url: str):
+    def visit(self, url: str, wait_for_completion: Optional[Callable[[float], bool]] = None):
         match self.eval_config.automation:
             case 'terminal':
                 args = self._get_terminal_args()
-                TerminalAutomation.visit_url(url, args, self.eval_config.seconds_per_visit)
+                TerminalAutomation.visit_url(url, args, self.eval_config.seconds_per_visit, wait_for_completion)
             case _:
                 raise AttributeError('Not implemented')
 
+    def visit_all(
+        self, urls: list[str], create_wait_for_completion: Optional[Callable[[], Callable[[float], bool]]] = None
+    ):
+        """
+        Visits the given URLs one after the other.
+        If a persistent session is requested and supported, all URLs are visited in the same browser process.
+        Otherwise, each URL is visited in a new browser process.
+
+        :param urls: The URLs to visit.
+        :param create_wait_for_completion: Creates the callable that waits for the completion of a visit (see
+            `TerminalAutomation.visit_url`), right before the visit starts.
+        """
+        if self.eval_config.persistent_session and self._supports_persistent_session():
+            if self._visit_all_in_session(urls, create_wait_for_completion):
+                return
+            logger.info('Could not control browser session, falling back to one browser process per URL')
+        for url in urls:
+            self.visit(url, create_wait_for_completion() if create_wait_for_completion else None)
+
+    def _supports_persistent_session(self) -> bool:
+        return False
+
+    def _visit_all_in_session(
+        self, urls: list[str], create_wait_for_completion: Optional[Callable[[], Callable[[float], bool]]]
+    ) -> bool:
+        """
+        Visits the given URLs in one browser process.
+
+        :return: False if the browser could not be controlled, in which case no URLs were visited.
+        """
+        raise NotImplementedError()
+
     def open(self, url: str) -> None:
         args = self._get_terminal_args()
         args.append(url)
@@ -82,7 +118,8 @@ class Browser:
 
     def __prepare_execution_folder(self):
         path = self.__get_execution_folder_path()
-        util.copy_folder(self.binary.get_bin_folder_path(), path)
+        # Binary files are never modified during tests, so they are linked instead of copied.
+        util.link_folder(self.binary.get_bin_folder_path(), path)
 
     @abstractmethod
     def _prepare_profile_folder(self):
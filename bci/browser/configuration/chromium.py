@@ -1,7 +1,17 @@
+import logging
+from typing import Callable, Optional
+
+from bci.browser.automation.devtools import DevToolsSession
+from bci.browser.automation.terminal import TerminalAutomation
 from bci.browser.configuration.browser import Browser
 from bci.browser.configuration.options import Default, BlockThirdPartyCookies, PrivateBrowsing
 from bci.browser.configuration.profile import prepare_chromium_profile
 
+logger = logging.getLogger(__name__)
+
+# The remote debugging server is not reliably available in earlier builds.
+MIN_PERSISTENT_SESSION_VERSION = 20
+
 SUPPORTED_OPTIONS = [
     Default(),
     BlockThirdPartyCookies(),
@@ -65,6 +75,42 @@ class Chromium(Browser):
         args.extend(SELENIUM_USED_FLAGS)
         return args
 
+    def _supports_persistent_session(self) -> bool:
+        # Tabs opened through the remote debugging server are not opened in the incognito window.
+        if 'pb' in self.browser_config.browser_setting:
+            return False
+        return int(self.version.split('.')[0]) >= MIN_PERSISTENT_SESSION_VERSION
+
+    def _visit_all_in_session(
+        self, urls: list[str], create_wait_for_completion: Optional[Callable[[], Callable[[float], bool]]]
+    ) -> bool:
+        args = self._get_terminal_args()
+        args.extend(DevToolsSession.get_args())
+        args.append('about:blank')
+        proc = TerminalAutomation.open_browser(args)
+        try:
+            session = DevToolsSession()
+            if not session.wait_until_available(timeout=10):
+                return False
+            for i, url in enumerate(urls):
+                wait_for_completion = create_wait_for_completion() if create_wait_for_completion else None
+                if (tab_id := session.open_tab(url)) is None:
+                    if i == 0:
+                        return False
+                    # Later URLs are visited in a new process, such that the outcome of the test is not affected.
+                    logger.info(f'Could not open tab, visiting {url} in a new browser process instead')
+                    TerminalAutomation.terminate_browser(proc, args)
+                    proc = None
+                    for remaining_url in urls[i:]:
+                        self.visit(remaining_url, create_wait_for_completion() if create_wait_for_completion else None)
+                    return True
+                TerminalAutomation.wait_during_visit(self.eval_config.seconds_per_visit, wait_for_completion)
+                session.close_tab(tab_id)
+            return True
+        finally:
+            if proc is not None:
+                TerminalAutomation.terminate_browser(proc, args)
+
     def _prepare_profile_folder(self):
         profile_path = None
         match self.browser_config.browser_setting:
@@ -1,6 +1,5 @@
 import os
 
-from bci import cli
 from bci.browser.configuration.browser import Browser
 from bci.browser.configuration.options import BlockThirdPartyCookies, Default, PrivateBrowsing, TrackingProtection
 from bci.browser.configuration.profile import prepare_firefox_profile
@@ -86,25 +85,8 @@ class Firefox(Browser):
 
     def _prepare_profile_folder(self):
         # TODO: double check validity of Firefox profiles
+        # The profile trusts the bughog CA (see `prepare_firefox_profile`)
         if 'tp' in self.browser_config.browser_setting:
             self._profile_path = prepare_firefox_profile('tp-67')
         else:
             self._profile_path = prepare_firefox_profile()
-
-        # Make Firefox trust the bughog CA
-
-        # For newer Firefox versions (> 57):
-        # Generate SQLite database: cert9.db  key4.db  pkcs11.txt
-        cli.execute(
-            f'certutil -A -n bughog-ca -t CT,c -i /etc/nginx/ssl/certs/bughog_CA.crt -d sql:{self._profile_path}'
-            )
-        # For older Firefox versions (<= 57):
-        # Generate in Berkeley DB database: cert8.db, key3.db, secmod.db
-        cli.execute(
-            f'certutil -A -n bughog-ca -t CT,c -i /etc/nginx/ssl/certs/bughog_CA.crt -d dbm:{self._profile_path}'
-            )
-
-        # More info:
-        # - https://support.mozilla.org/en-US/questions/1207165
-        # - https://stackoverflow.com/questions/1435000/programmatically-install-certificate-into-mozilla
-        # - https://ftpdocs.broadcom.com/cadocs/0/CA%20SiteMinder%20r12%20SP3-ENU/Bookshelf_Files/HTML/idocs/792390.html
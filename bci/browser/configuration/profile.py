@@ -1,48 +1,107 @@
 import os
-from typing import Optional
+import shutil
+import threading
+from typing import Callable, Optional
 
 from bci import cli
 
 PROFILE_STORAGE_FOLDER = '/app/browser/profiles'
 PROFILE_EXECUTION_FOLDER = '/tmp/profiles'
+PROFILE_TEMPLATE_FOLDER = '/tmp/profile_templates'
+BUGHOG_CA_CERTIFICATE_PATH = '/etc/nginx/ssl/certs/bughog_CA.crt'
+
+# Profile templates are built once per process, after which each try only requires an in-process copy.
+__templates: dict[tuple[str, Optional[str]], str] = {}
+__templates_lock = threading.Lock()
 
 
 def prepare_chromium_profile(profile_name: Optional[str] = None) -> str:
-    # Create new execution profile folder
-    profile_execution_path = os.path.join(PROFILE_EXECUTION_FOLDER, 'new_profile')
-    profile_execution_path = __create_folder(profile_execution_path)
+    """
+    Create a temporary profile folder, based on the provided name of the premade profile.
 
-    # Copy profile from storage to execution folder if profile_name is given
-    if profile_name:
-        if not os.path.exists(os.path.join(PROFILE_STORAGE_FOLDER, 'chromium', profile_name)):
-            raise Exception(f"Profile '{profile_name}' does not exist")
-        profile_storage_path = os.path.join(PROFILE_STORAGE_FOLDER, profile_name, 'Default')
-        cli.execute(f'cp -r {profile_storage_path} {profile_execution_path}')
-    return profile_execution_path
+    :param profile_name: Reference to the premade profile folder used for creating the temporary profile.
+    """
+    def initialize(template_path: str) -> None:
+        if profile_name:
+            profile_storage_path = os.path.join(PROFILE_STORAGE_FOLDER, 'chromium', profile_name, 'Default')
+            shutil.copytree(profile_storage_path, os.path.join(template_path, 'Default'))
+
+    return __create_profile_from_template('chromium', profile_name, initialize)
 
 
 def prepare_firefox_profile(profile_name: Optional[str] = None) -> str:
     """"
     Create a temporary profile folder, based on the provided name of the premade profile.
+    The profile trusts the BugHog CA.
 
     :param profile_name: Reference to the premade profile folder used for creating the temporary profile.
     """
+    def initialize(template_path: str) -> None:
+        if profile_name is not None:
+            profile_storage_path = os.path.join(PROFILE_STORAGE_FOLDER, 'firefox', profile_name)
+            shutil.copytree(profile_storage_path, template_path, dirs_exist_ok=True)
+
+        # Make Firefox trust the bughog CA
+
+        # For newer Firefox versions (> 57):
+        # Generate SQLite database: cert9.db  key4.db  pkcs11.txt
+        cli.execute(f'certutil -A -n bughog-ca -t CT,c -i {BUGHOG_CA_CERTIFICATE_PATH} -d sql:{template_path}')
+        # For older Firefox versions (<= 57):
+        # Generate in Berkeley DB database: cert8.db, key3.db, secmod.db
+        cli.execute(f'certutil -A -n bughog-ca -t CT,c -i {BUGHOG_CA_CERTIFICATE_PATH} -d dbm:{template_path}')
+
+        # More info:
+        # - https://support.mozilla.org/en-US/questions/1207165
+        # - https://stackoverflow.com/questions/1435000/programmatically-install-certificate-into-mozilla
+        # - https://ftpdocs.broadcom.com/cadocs/0/CA%20SiteMinder%20r12%20SP3-ENU/Bookshelf_Files/HTML/idocs/792390.html
+
+    return __create_profile_from_template('firefox', profile_name, initialize)
+
+
+def remove_profile_execution_folder(profile_path: str):
+    assert profile_path.startswith(PROFILE_EXECUTION_FOLDER)
+    shutil.rmtree(profile_path, ignore_errors=True)
+
+
+def __create_profile_from_template(
+    browser_name: str, profile_name: Optional[str], initialize: Callable[[str], None]
+) -> str:
+    """
+    Creates a new execution profile folder as a copy of the template of the given profile.
+    Profile files are modified by the browser, so they are copied instead of linked.
+
+    :param browser_name: The name of the browser.
+    :param profile_name: The name of the premade profile, or None for an empty profile.
+    :param initialize: Populates the given (empty) template folder. This is only called the first time the template
+        is requested.
+    """
+    if profile_name and not os.path.exists(os.path.join(PROFILE_STORAGE_FOLDER, browser_name, profile_name)):
+        raise Exception(f"Profile '{profile_name}' does not exist")
+    template_path = __get_template(browser_name, profile_name, initialize)
+
     # Create new execution profile folder
     profile_execution_path = os.path.join(PROFILE_EXECUTION_FOLDER, 'new_profile')
     profile_execution_path = __create_folder(profile_execution_path)
-
-    # Copy profile from storage to execution folder if profile_name is given
-    if profile_name is not None:
-        if not os.path.exists(os.path.join(PROFILE_STORAGE_FOLDER, 'firefox', profile_name)):
-            raise Exception(f"Profile '{profile_name}' does not exist")
-        profile_storage_path = os.path.join(PROFILE_STORAGE_FOLDER, profile_name)
-        cli.execute(f'cp -r {profile_storage_path} {profile_execution_path}')
+    shutil.copytree(template_path, profile_execution_path, dirs_exist_ok=True)
     return profile_execution_path
 
 
-def remove_profile_execution_folder(profile_path: str):
-    assert profile_path.startswith(PROFILE_EXECUTION_FOLDER)
-    cli.execute(f'rm -rf {profile_path}')
+def __get_template(browser_name: str, profile_name: Optional[str], initialize: Callable[[str], None]) -> str:
+    key = (browser_name, profile_name)
+    with __templates_lock:
+        if (template_path := __templates.get(key)) is not None and os.path.isdir(template_path):
+            return template_path
+        template_path = os.path.join(PROFILE_TEMPLATE_FOLDER, browser_name, profile_name or 'empty')
+        shutil.rmtree(template_path, ignore_errors=True)
+        os.makedirs(template_path)
+        try:
+            initialize(template_path)
+        except Exception:
+            # Incomplete templates are never reused.
+            shutil.rmtree(template_path, ignore_errors=True)
+            raise
+        __templates[key] = template_path
+        return template_path
 
 
 def __create_folder(folder_path: str) -> str:
@@ -70,17 +70,24 @@ class Global:
     def get_database_params() -> DatabaseParameters:
         required_database_params = ['BCI_MONGO_HOST', 'BCI_MONGO_USERNAME', 'BCI_MONGO_DATABASE', 'BCI_MONGO_PASSWORD']
         missing_database_params = [param for param in required_database_params if os.getenv(param) in ['', None]]
-        binary_cache_limit = int(os.getenv('BCI_BINARY_CACHE_LIMIT', 0))
+        binary_cache_params = {
+            'binary_cache_limit': int(os.getenv('BCI_BINARY_CACHE_LIMIT', 0)),
+            'binary_cache_threads': int(os.getenv('BCI_BINARY_CACHE_THREADS') or 8),
+            'binary_cache_format': os.getenv('BCI_BINARY_CACHE_FORMAT') or 'files',
+            'binary_cache_size_limit': int(os.getenv('BCI_BINARY_CACHE_SIZE_LIMIT') or 0) * 1024**2,
+        }
+        if binary_cache_params['binary_cache_format'] not in ['files', 'archive']:
+            raise ValueError(f"Unknown binary cache format '{binary_cache_params['binary_cache_format']}'")
         if missing_database_params:
             logger.info(f'Could not find database parameters {missing_database_params}, using database container...')
-            return container.run(binary_cache_limit)
+            return container.run(**binary_cache_params)
         else:
             database_params = DatabaseParameters(
                 os.getenv('BCI_MONGO_HOST'),
                 os.getenv('BCI_MONGO_USERNAME'),
                 os.getenv('BCI_MONGO_PASSWORD'),
                 os.getenv('BCI_MONGO_DATABASE'),
-                binary_cache_limit,
+                **binary_cache_params,
             )
             logger.info(f"Found database environment variables '{database_params}'")
             return database_params
@@ -96,6 +103,34 @@ class Global:
             raise ValueError('BUGHOG_VERSION is not set')
         return bughog_version
 
+    @staticmethod
+    def use_worker_pool() -> bool:
+        """
+        Returns whether tests are distributed over a pool of persistent worker containers.
+        """
+        return os.getenv('BCI_WORKER_POOL', '').lower() in ['1', 'true', 'yes']
+
+    @staticmethod
+    def get_binary_store_limit() -> int:
+        """
+        Returns the maximum size in bytes of the node-local binary store, which is disabled if 0.
+        """
+        return int(os.getenv('BCI_BINARY_STORE_LIMIT') or 0) * 1024**2
+
+    @staticmethod
+    def get_http_pool_size() -> int:
+        """
+        Returns the maximum number of connections that are kept alive per host for outbound HTTP requests.
+        """
+        return int(os.getenv('BCI_HTTP_POOL_SIZE') or 10)
+
+    @staticmethod
+    def get_http_max_retries() -> int:
+        """
+        Returns the number of times failed outbound HTTP requests are retried (with exponential backoff).
+        """
+        return int(os.getenv('BCI_HTTP_MAX_RETRIES') or 3)
+
 
 class Chromium:
     extension_folder = '/app/browser/extensions/chromium'
@@ -2,14 +2,27 @@ import concurrent.futures
 import datetime
 import logging
 import os
+import shutil
+import tarfile
 import time
-from typing import Optional
+
+from pymongo import ASCENDING
 
 from bci.database.mongo.mongodb import MongoDB
 from bci.version_control.states.state import State
 
 logger = logging.getLogger(__name__)
 
+# Binaries are cached either as one GridFS file per binary file, or as one GridFS file holding a tar archive.
+BINARY_FILE_TYPE = 'binary'
+BINARY_ARCHIVE_FILE_TYPE = 'binary_archive'
+# Max chunk size is 16 MB (meta-data included)
+CHUNK_SIZE = 1024 * 1024 * 15
+# GridFS bucket of which the collections hold the cached files.
+BUCKET_NAME = 'fs'
+# Collection with one document per cached binary, which keeps track of its size and usage.
+ENTRIES_COLLECTION_NAME = 'binary_cache_entries'
+
 
 class BinaryCache:
     """
@@ -28,45 +41,109 @@ class BinaryCache:
         if MongoDB().binary_cache_limit <= 0:
             return False
 
-        files_collection = MongoDB().get_collection('fs.files')
-
-        query = {
-            'file_type': 'binary',
-            'browser_name': state.browser_name,
-            'state_type': state.type,
-            'state_index': state.index,
-        }
-        if files_collection.count_documents(query) == 0:
-            return False
-        # Update access count and last access timestamp
-        files_collection.update_many(
-            query,
-            {'$inc': {'access_count': 1}, '$set': {'last_access_ts': datetime.datetime.now()}},
+        files_collection = MongoDB().get_collection(f'{BUCKET_NAME}.files')
+        entry_query = BinaryCache.__get_entry_query(state.browser_name, state.type, state.index)
+        # Update hit count and last access timestamp, which also tells whether the binary is cached at all.
+        entry = MongoDB().get_collection(ENTRIES_COLLECTION_NAME).find_one_and_update(
+            entry_query,
+            {'$inc': {'hit_count': 1}, '$set': {'last_access_ts': datetime.datetime.now()}},
+            {'_id': True, 'nb_of_files': True},
         )
+        if entry is None:
+            return False
+        query = {'file_type': {'$in': [BINARY_FILE_TYPE, BINARY_ARCHIVE_FILE_TYPE]}, **entry_query}
         binary_folder_path = os.path.dirname(binary_executable_path)
         if not os.path.exists(binary_folder_path):
             os.mkdir(binary_folder_path)
 
+        grid_docs = list(
+            files_collection.find(
+                query,
+                {'_id': True, 'file_type': True, 'relative_file_path': True, 'length': True, 'manifest': True},
+            )
+        )
+        if not grid_docs:
+            # The binary is being evicted, which removes the entry before its files.
+            logger.debug(f'Cached binary files for {state} were evicted while fetching.')
+            shutil.rmtree(binary_folder_path, ignore_errors=True)
+            return False
+        nb_of_bytes = sum(grid_doc.get('length', 0) for grid_doc in grid_docs)
+        start_time = time.time()
+        try:
+            archive_docs = [grid_doc for grid_doc in grid_docs if grid_doc['file_type'] == BINARY_ARCHIVE_FILE_TYPE]
+            if archive_docs:
+                nb_of_files = BinaryCache.__restore_archive(archive_docs[0]['_id'], binary_folder_path)
+            else:
+                nb_of_files = BinaryCache.__restore_files(grid_docs, binary_folder_path)
+        except Exception:
+            logger.error(
+                f'Something went wrong fetching cached binary files for {state}, removing restored files.',
+                exc_info=True,
+            )
+            shutil.rmtree(binary_folder_path, ignore_errors=True)
+            return False
+        # Entries created before the number of files was tracked lack it, but archives hold it in their manifest.
+        expected_nb_of_files = entry.get('nb_of_files')
+        if expected_nb_of_files is None and archive_docs:
+            expected_nb_of_files = archive_docs[0].get('manifest', {}).get('nb_of_files')
+        if expected_nb_of_files is not None and nb_of_files != expected_nb_of_files:
+            logger.warning(
+                f'Restored {nb_of_files} instead of {expected_nb_of_files} cached binary files for {state}, '
+                'removing restored files.'
+            )
+            shutil.rmtree(binary_folder_path, ignore_errors=True)
+            return False
+
+        elapsed_time = time.time() - start_time
+        throughput = nb_of_bytes / (1024 * 1024) / elapsed_time if elapsed_time > 0 else 0
+        logger.debug(
+            f'Fetched cached binary ({nb_of_files} files, {nb_of_bytes / (1024 * 1024):.1f} MB) in '
+            f'{elapsed_time:.2f}s ({throughput:.1f} MB/s)'
+        )
+        return True
+
+    @staticmethod
+    def __restore_files(grid_docs: list[dict], binary_folder_path: str) -> int:
+        """
+        Restores binary files that are cached as separate GridFS files.
+
+        :return: The number of restored files.
+        """
+        fs = MongoDB().get_gridfs(BUCKET_NAME)
+
         def write_from_db(file_path: str, grid_file_id: str) -> None:
+            # Chunks are written one by one, so that memory usage is bounded by the chunk size.
             grid_file = fs.get(grid_file_id)
             os.makedirs(os.path.dirname(file_path), exist_ok=True)
             with open(file_path, 'wb') as file:
-                file.write(grid_file.read())
+                while chunk := grid_file.readchunk():
+                    file.write(chunk)
             os.chmod(file_path, 0o744)
 
-        grid_cursor = files_collection.find(query)
-        fs = MongoDB().gridfs
-        start_time = time.time()
-        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
-            for grid_doc in grid_cursor:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=MongoDB().binary_cache_threads) as executor:
+            futures = []
+            for grid_doc in grid_docs:
                 file_path = os.path.join(binary_folder_path, grid_doc['relative_file_path'])
-                grid_file_id = grid_doc['_id']
-                executor.submit(write_from_db, file_path, grid_file_id)
+                futures.append(executor.submit(write_from_db, file_path, grid_doc['_id']))
+        for future in futures:
+            future.result()
+        return len(futures)
 
-        executor.shutdown(wait=True)
-        elapsed_time = time.time() - start_time
-        logger.debug(f'Fetched cached binary in {elapsed_time:.2f}s')
-        return True
+    @staticmethod
+    def __restore_archive(grid_file_id, binary_folder_path: str) -> int:
+        """
+        Restores binary files that are cached as a single tar archive, which is extracted while it is streamed.
+
+        :return: The number of restored files, symbolic links included.
+        """
+        grid_file = MongoDB().get_gridfs(BUCKET_NAME).get(grid_file_id)
+        nb_of_files = 0
+        with tarfile.open(fileobj=grid_file, mode='r|') as tar:
+            for member in tar:
+                tar.extract(member, binary_folder_path, filter='tar')
+                # Files that are hard linked to an earlier member are stored as a link to that member.
+                nb_of_files += member.isfile() or member.islnk() or member.issym()
+        return nb_of_files
 
     @staticmethod
     def store_binary_files(binary_executable_path: str, state: State):
@@ -80,36 +157,78 @@ class BinaryCache:
         if MongoDB().binary_cache_limit <= 0:
             return False
 
-        while BinaryCache.__count_cached_binaries() >= MongoDB().binary_cache_limit:
-            if BinaryCache.__count_cached_binaries(state_type='revision') <= 0:
-                # There are only version binaries in the cache, which will never be removed
-                return False
-            BinaryCache.__remove_least_used_revision_binary_files()
+        binary_folder_path = os.path.dirname(binary_executable_path)
+        nb_of_bytes = sum(
+            os.path.getsize(os.path.join(root, file_name))
+            for root, _, file_names in os.walk(binary_folder_path)
+            for file_name in file_names
+        )
+        if not BinaryCache.__make_room_for(nb_of_bytes):
+            return False
 
         logger.debug(f"Caching binary files for {state}...")
-        fs = MongoDB().gridfs
+        start_time = time.time()
+        try:
+            if MongoDB().binary_cache_format == 'archive':
+                nb_of_files = BinaryCache.__store_archive(binary_folder_path, state)
+            else:
+                nb_of_files = BinaryCache.__store_files(binary_folder_path, state)
+        except Exception:
+            logger.error(
+                (
+                    f"Something went wrong caching binary files for {state}, "
+                    "Removing possibly imcomplete binary files from cache."
+                ),
+                exc_info=True
+            )
+            BinaryCache.remove_binary_files(state)
+            logger.debug(f"Removed possibly incomplete cached binary files for {state}.")
+            return False
+        now = datetime.datetime.now()
+        MongoDB().get_collection(ENTRIES_COLLECTION_NAME).update_one(
+            BinaryCache.__get_entry_query(state.browser_name, state.type, state.index),
+            {
+                '$set': {
+                    'format': MongoDB().binary_cache_format,
+                    'size': nb_of_bytes,
+                    'nb_of_files': nb_of_files,
+                    'hit_count': 0,
+                    'last_access_ts': now,
+                    'stored_ts': now,
+                }
+            },
+            upsert=True,
+        )
+        elapsed_time = time.time() - start_time
+        logger.debug(f'Stored binary in {elapsed_time:.2f}s')
+        return True
 
-        binary_folder_path = os.path.dirname(binary_executable_path)
+    @staticmethod
+    def __store_files(binary_folder_path: str, state: State) -> int:
+        """
+        Stores each file in the given folder as a separate GridFS file.
+
+        :return: The number of stored files.
+        """
+        fs = MongoDB().get_gridfs(BUCKET_NAME)
         last_access_ts = datetime.datetime.now()
+
         def store_file(file_path: str) -> None:
-            # Max chunk size is 16 MB (meta-data included)
-            chunk_size = 1024 * 1024 * 15
             with open(file_path, 'rb') as file:
                 file_id = fs.new_file(
-                    file_type='binary',
+                    file_type=BINARY_FILE_TYPE,
                     browser_name=state.browser_name,
-                        state_type=state.type,
-                        state_index=state.index,
-                        relative_file_path=os.path.relpath(file_path, binary_folder_path),
-                        access_count=0,
-                        last_access_ts=last_access_ts,
-                        chunk_size=chunk_size
+                    state_type=state.type,
+                    state_index=state.index,
+                    relative_file_path=os.path.relpath(file_path, binary_folder_path),
+                    access_count=0,
+                    last_access_ts=last_access_ts,
+                    chunk_size=CHUNK_SIZE
                 )
-                while chunk := file.read(chunk_size):
+                while chunk := file.read(CHUNK_SIZE):
                     file_id.write(chunk)
             file_id.close()
 
-        start_time = time.time()
         with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
             futures = []
             for root, _, files in os.walk(binary_folder_path):
@@ -118,65 +237,158 @@ class BinaryCache:
                     future = executor.submit(store_file, file_path)
                     futures.append(future)
             logger.debug(f"Number of files to cache: {len(futures)}")
-            executor.shutdown(wait=True)
-
-            futures_with_exception = [future for future in futures if future.exception() is not None]
-            if futures_with_exception:
-                logger.error(
-                    (
-                        f"Something went wrong caching binary files for {state}, "
-                        "Removing possibly imcomplete binary files from cache."
-                    ),
-                    exc_info=futures_with_exception[0].exception()
-                )
-                BinaryCache.__remove_revision_binary_files(state.type, state.index)
-                logger.debug(f"Removed possibly incomplete cached binary files for {state}.")
-            else:
-                elapsed_time = time.time() - start_time
-                logger.debug(f'Stored binary in {elapsed_time:.2f}s')
+        for future in futures:
+            future.result()
+        return len(futures)
+
+    @staticmethod
+    def __store_archive(binary_folder_path: str, state: State) -> int:
+        """
+        Stores all files in the given folder as a single tar archive, which is streamed into one GridFS file.
+        The archive is not compressed itself, since GridFS chunks are already compressed by the storage engine.
+        A manifest with the number of files and their total size is stored alongside.
+        Symbolic links are stored as links, including those to directories, which are not walked into.
+
+        :return: The number of stored files, symbolic links included.
+        """
+        file_paths = [
+            os.path.join(root, name)
+            for root, dirs, files in os.walk(binary_folder_path)
+            for name in files + [name for name in dirs if os.path.islink(os.path.join(root, name))]
+        ]
+        manifest = {
+            'nb_of_files': len(file_paths),
+            'nb_of_bytes': sum(os.lstat(file_path).st_size for file_path in file_paths),
+        }
+        logger.debug(f"Number of files to cache: {manifest['nb_of_files']}")
+        grid_file = MongoDB().get_gridfs(BUCKET_NAME).new_file(
+            file_type=BINARY_ARCHIVE_FILE_TYPE,
+            browser_name=state.browser_name,
+            state_type=state.type,
+            state_index=state.index,
+            relative_file_path=None,
+            access_count=0,
+            last_access_ts=datetime.datetime.now(),
+            chunk_size=CHUNK_SIZE,
+            manifest=manifest,
+        )
+        try:
+            with tarfile.open(fileobj=grid_file, mode='w|') as tar:
+                for file_path in file_paths:
+                    tar.add(file_path, arcname=os.path.relpath(file_path, binary_folder_path), recursive=False)
+        except Exception:
+            # Otherwise, the chunks that were already written would be left behind without a file document.
+            grid_file.abort()
+            raise
+        grid_file.close()
+        return manifest['nb_of_files']
 
     @staticmethod
     def remove_binary_files(state: State) -> None:
-        BinaryCache.__remove_revision_binary_files(state.type, state.index)
+        BinaryCache.__remove_binary_files(state.browser_name, state.type, state.index)
 
     @staticmethod
-    def __count_cached_binaries(state_type: Optional[str] = None) -> int:
+    def __get_entry_query(browser_name: str, state_type: str, state_index: int) -> dict:
+        return {'browser_name': browser_name, 'state_type': state_type, 'state_index': state_index}
+
+    @staticmethod
+    def __make_room_for(nb_of_bytes: int) -> bool:
         """
-        Counts the number of cached binaries in the database.
+        Evicts cached revision binaries, least used first, until a binary of the given size fits within both the
+        limit on the number of binaries and the limit on their total size.
+        Version binaries are never evicted.
 
-        :param state_type: The type of the state.
-        :return: The number of cached binaries.
+        :param nb_of_bytes: The size of the binary to make room for.
+        :return: True if the binary fits in the cache.
         """
-        files_collection = MongoDB().get_collection('fs.files')
-        if state_type:
-            query = {'file_type': 'binary', 'state_type': state_type}
-        else:
-            query = {'file_type': 'binary'}
-        return len(files_collection.find(query).distinct('state_index'))
+        count_limit = MongoDB().binary_cache_limit
+        size_limit = MongoDB().binary_cache_size_limit
+        if 0 < size_limit < nb_of_bytes:
+            return False
+        entries_collection = MongoDB().get_collection(ENTRIES_COLLECTION_NAME)
+        totals = next(
+            entries_collection.aggregate([{'$group': {'_id': None, 'count': {'$sum': 1}, 'size': {'$sum': '$size'}}}]),
+            {'count': 0, 'size': 0},
+        )
+        nb_of_entries, total_size = totals['count'], totals['size']
+
+        while nb_of_entries >= count_limit or (size_limit > 0 and total_size + nb_of_bytes > size_limit):
+            entry = entries_collection.find_one_and_delete(
+                {'state_type': 'revision'},
+                sort=[('hit_count', ASCENDING), ('last_access_ts', ASCENDING)],
+            )
+            if entry is None:
+                # There are only version binaries in the cache, which will never be removed
+                return False
+            BinaryCache.__remove_binary_files(entry['browser_name'], entry['state_type'], entry['state_index'])
+            logger.debug(f"Evicted cached binary '{entry['browser_name']}' {entry['state_index']} from cache.")
+            nb_of_entries -= 1
+            total_size -= entry.get('size', 0)
+        return True
 
     @staticmethod
-    def __remove_least_used_revision_binary_files() -> None:
+    def __remove_binary_files(browser_name: str, state_type: str, state_index: int) -> None:
         """
-        Removes the least used revision binary files from the database.
+        Removes the binary files associated with the parameters, and their cache entry.
         """
-        files_collection = MongoDB().get_collection('fs.files')
+        fs = MongoDB().get_gridfs(BUCKET_NAME)
+        files_collection = MongoDB().get_collection(f'{BUCKET_NAME}.files')
+        query = BinaryCache.__get_entry_query(browser_name, state_type, state_index)
 
-        grid_cursor = files_collection.find(
-            {'file_type': 'binary', 'state_type': 'revision'},
-            sort=[('access_count', 1), ('last_access_ts', 1)],
-        )
-        for state_doc in grid_cursor:
-            state_index = state_doc['state_index']
-            BinaryCache.__remove_revision_binary_files('revision', state_index)
-            break
+        MongoDB().get_collection(ENTRIES_COLLECTION_NAME).delete_one(query)
+        for grid_doc in files_collection.find(query, {'_id': True}):
+            fs.delete(grid_doc['_id'])
 
     @staticmethod
-    def __remove_revision_binary_files(state_type: str, state_index: int) -> None:
+    def create_missing_entries() -> None:
         """
-        Removes the binary files associated with the parameters.
+        Creates the cache entries of binaries that were cached before cache entries were introduced.
         """
-        fs = MongoDB().gridfs
-        files_collection = MongoDB().get_collection('fs.files')
-
-        for grid_doc in files_collection.find({'state_index': state_index, 'state_type': state_type}):
-            fs.delete(grid_doc['_id'])
+        entries_collection = MongoDB().get_collection(ENTRIES_COLLECTION_NAME)
+        files_collection = MongoDB().get_collection(f'{BUCKET_NAME}.files')
+        known_entries = {
+            (entry['browser_name'], entry['state_type'], entry['state_index'])
+            for entry in entries_collection.find({}, {'_id': False})
+        }
+        cached_binaries = files_collection.aggregate([
+            {'$match': {'file_type': {'$in': [BINARY_FILE_TYPE, BINARY_ARCHIVE_FILE_TYPE]}}},
+            {
+                '$group': {
+                    '_id': {
+                        'browser_name': '$browser_name',
+                        'state_type': '$state_type',
+                        'state_index': '$state_index',
+                    },
+                    'file_type': {'$first': '$file_type'},
+                    'size': {'$sum': '$length'},
+                    'nb_of_grid_files': {'$sum': 1},
+                    'manifest_nb_of_files': {'$first': '$manifest.nb_of_files'},
+                    'hit_count': {'$max': '$access_count'},
+                    'last_access_ts': {'$max': '$last_access_ts'},
+                    'stored_ts': {'$min': '$uploadDate'},
+                }
+            },
+        ])
+        nb_of_created_entries = 0
+        for binary in cached_binaries:
+            key = (binary['_id']['browser_name'], binary['_id']['state_type'], binary['_id']['state_index'])
+            if key in known_entries:
+                continue
+            is_archive = binary['file_type'] == BINARY_ARCHIVE_FILE_TYPE
+            entries_collection.update_one(
+                binary['_id'],
+                {
+                    '$setOnInsert': {
+                        'format': 'archive' if is_archive else 'files',
+                        'size': binary['size'],
+                        'nb_of_files': binary['manifest_nb_of_files'] if is_archive else binary['nb_of_grid_files'],
+                        'hit_count': binary['hit_count'] or 0,
+                        'last_access_ts': binary['last_access_ts'],
+                        'stored_ts': binary['stored_ts'],
+                    }
+                },
+                upsert=True,
+            )
+            nb_of_created_entries += 1
+        if nb_of_created_entries:
+            logger.info(f'Created {nb_of_created_entries} missing binary cache entries.')
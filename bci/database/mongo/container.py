@@ -20,7 +20,7 @@ DEFAULT_DB_NAME = 'bci'
 DEFAULT_HOST = 'bh_db'
 
 
-def run(binary_cache_limit: int) -> DatabaseParameters:
+def run(**binary_cache_params) -> DatabaseParameters:
     docker_client = docker.from_env()
     try:
         mongo_container = docker_client.containers.get(DEFAULT_HOST)
@@ -33,7 +33,7 @@ def run(binary_cache_limit: int) -> DatabaseParameters:
         LOGGER.debug('MongoDB container not found, creating a new one...')
         __create_new_container(DEFAULT_USER, DEFAULT_PW, DEFAULT_DB_NAME, DEFAULT_HOST)
     LOGGER.debug('MongoDB container has started!')
-    return DatabaseParameters(DEFAULT_HOST, DEFAULT_USER, DEFAULT_PW, DEFAULT_DB_NAME, binary_cache_limit)
+    return DatabaseParameters(DEFAULT_HOST, DEFAULT_USER, DEFAULT_PW, DEFAULT_DB_NAME, **binary_cache_params)
 
 
 def stop():
@@ -0,0 +1,246 @@
+"""
+Maintenance commands for the BugHog database.
+
+Usage (e.g., in the core container, where the database environment variables are set):
+    python -m bci.database.mongo.maintenance explain [--collection NAME ...]
+    python -m bci.database.mongo.maintenance backfill-test-keys [--collection NAME ...]
+    python -m bci.database.mongo.maintenance import-chromium-revisions FILE
+
+The Chromium revision index is imported from a git log dump of the Chromium repository (use '-' to read from stdin):
+    git log --format='%H %(trailers:key=Cr-Commit-Position,valueonly,separator=)' origin/main > chromium_revisions.txt
+"""
+
+import argparse
+import logging
+import sys
+from typing import Optional
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from bci.configuration import Global
+from bci.database.mongo.mongodb import MongoDB, get_test_key_of_document
+from bci.database.mongo.revision_cache import RevisionCache
+from bci.version_control.revision_parser.chromium_parser import ChromiumRevisionParser
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def get_hot_queries(sample: dict) -> dict[str, dict]:
+    """
+    Returns the queries that are frequently performed on experiment result collections, shaped like the queries of
+    `MongoDB` and filled in with the values of the given sample document.
+
+    :param sample: A result document of the collection.
+    """
+    state = sample['state']
+    extensions = sample.get('extensions', [])
+    cli_options = sample.get('cli_options', [])
+    list_filters = {
+        'extensions': {'$size': len(extensions), '$all': extensions} if extensions else [],
+        'cli_options': {'$size': len(cli_options), '$all': cli_options} if cli_options else [],
+    }
+    revision_number = state.get('revision_number', 0)
+    return {
+        'test_result_by_key': {'test_key': sample.get('test_key') or get_test_key_of_document(sample)},
+        'test_result': {
+            'state': state,
+            'browser_automation': sample.get('browser_automation'),
+            'browser_config': sample['browser_config'],
+            'mech_group': sample['mech_group'],
+            **list_filters,
+        },
+        'evaluated_states': {
+            'browser_config': sample['browser_config'],
+            'mech_group': sample['mech_group'],
+            'state.browser_name': state['browser_name'],
+            'results': {'$exists': True},
+            'state.type': state['type'],
+            'state.revision_number': {'$gte': revision_number - 1000, '$lte': revision_number + 1000},
+            **list_filters,
+        },
+        'evaluated_states_since': {
+            'browser_config': sample['browser_config'],
+            'mech_group': sample['mech_group'],
+            'state.browser_name': state['browser_name'],
+            'results': {'$exists': True},
+            'state.type': state['type'],
+            'ts': {'$gte': sample.get('ts', '')},
+            **list_filters,
+        },
+        'plot_releases': {
+            'mech_group': sample['mech_group'],
+            'browser_config': sample['browser_config'],
+            'state.type': 'version',
+            'extensions': {'$size': len(extensions)},
+            'cli_options': {'$size': len(cli_options)},
+            'padded_browser_version': {'$gte': '0000', '$lte': '9999'},
+        },
+    }
+
+
+def has_collection_scan(plan: dict | list) -> bool:
+    """
+    Returns whether the given (part of a) query plan contains a collection scan.
+    """
+    if isinstance(plan, dict):
+        if plan.get('stage') == 'COLLSCAN':
+            return True
+        return any(has_collection_scan(value) for value in plan.values() if isinstance(value, (dict, list)))
+    return any(has_collection_scan(value) for value in plan if isinstance(value, (dict, list)))
+
+
+def get_data_collection_names() -> list[str]:
+    db = MongoDB()
+    return [
+        name
+        for browser_name in db.binary_availability_collection_names
+        for name in db.get_all_collection_names_for_browser(browser_name)
+    ]
+
+
+def explain(collection_names: Optional[list[str]] = None) -> bool:
+    """
+    Explains the hot queries on the given experiment result collections, or all of them if none are given, and
+    reports which queries would scan the whole collection.
+
+    :param collection_names: The names of the collections to check.
+    :return: True if no collection scans were found.
+    """
+    db = MongoDB()
+    all_indexed = True
+    for collection_name in collection_names or get_data_collection_names():
+        collection = db.get_collection(collection_name)
+        sample = collection.find_one({'results': {'$exists': True}, 'state': {'$exists': True}})
+        if sample is None:
+            print(f'{collection_name}: no results to derive queries from, skipping')
+            continue
+        for query_name, query in get_hot_queries(sample).items():
+            winning_plan = collection.find(query).explain()['queryPlanner']['winningPlan']
+            if has_collection_scan(winning_plan):
+                all_indexed = False
+                print(f'{collection_name}: {query_name}: COLLSCAN')
+            else:
+                print(f'{collection_name}: {query_name}: ok')
+    return all_indexed
+
+
+def backfill_test_keys(collection_names: Optional[list[str]] = None) -> bool:
+    """
+    Stores the test key of all result documents that were stored before test keys were introduced.
+    Documents of which the test key is already taken by another document are duplicate results of the same test, and
+    are reported and left untouched. The same goes for documents that lack the fields that identify their test.
+
+    :param collection_names: The names of the collections to backfill.
+    :return: True if all documents have a test key afterwards.
+    """
+    db = MongoDB()
+    all_keyed = True
+    for collection_name in collection_names or get_data_collection_names():
+        collection = db.get_collection(collection_name)
+        cursor = collection.find(
+            {'test_key': {'$exists': False}},
+            {'state': True, 'browser_config': True, 'cli_options': True, 'extensions': True, 'mech_group': True,
+             'browser_automation': True},
+        )
+        nb_of_updated, nb_of_duplicates, nb_of_unkeyable = 0, 0, 0
+        batch = []
+        for document in cursor:
+            if (test_key := get_test_key_of_document(document)) is None:
+                nb_of_unkeyable += 1
+                continue
+            batch.append(UpdateOne({'_id': document['_id']}, {'$set': {'test_key': test_key}}))
+            if len(batch) == BACKFILL_BATCH_SIZE:
+                updated, duplicates = __write_batch(collection, batch)
+                nb_of_updated, nb_of_duplicates = nb_of_updated + updated, nb_of_duplicates + duplicates
+                batch = []
+        if batch:
+            updated, duplicates = __write_batch(collection, batch)
+            nb_of_updated, nb_of_duplicates = nb_of_updated + updated, nb_of_duplicates + duplicates
+        print(
+            f'{collection_name}: {nb_of_updated} test keys added, {nb_of_duplicates} duplicate results skipped, '
+            f'{nb_of_unkeyable} incomplete results skipped'
+        )
+        all_keyed = all_keyed and nb_of_duplicates == 0 and nb_of_unkeyable == 0
+        db.invalidate_collection_cache(collection_name)
+    return all_keyed
+
+
+def __write_batch(collection, batch: list[UpdateOne]) -> tuple[int, int]:
+    try:
+        result = collection.bulk_write(batch, ordered=False)
+        return result.modified_count, 0
+    except BulkWriteError as e:
+        duplicates = [error for error in e.details['writeErrors'] if error['code'] == 11000]
+        if len(duplicates) < len(e.details['writeErrors']):
+            raise
+        return e.details['nModified'], len(duplicates)
+
+
+def import_chromium_revisions(file_path: str) -> bool:
+    """
+    Imports the revision numbers and ids of a git log dump of the Chromium repository into the Chromium revision index.
+
+    :param file_path: The path of the dump, or '-' for stdin.
+    :return: True if any revisions were found in the dump.
+    """
+    file = sys.stdin if file_path == '-' else open(file_path, 'r')
+    try:
+        revisions = ChromiumRevisionParser.parse_git_log(file)
+        nb_of_parsed = 0
+
+        def count(revision: tuple[int, str]) -> tuple[int, str]:
+            nonlocal nb_of_parsed
+            nb_of_parsed += 1
+            return revision
+
+        nb_of_stored = RevisionCache.chromium_store_revisions(map(count, revisions))
+    finally:
+        if file is not sys.stdin:
+            file.close()
+    print(f'chromium_revision_index: {nb_of_parsed} revisions parsed, {nb_of_stored} added or changed')
+    return nb_of_parsed > 0
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Maintenance commands for the BugHog database.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    explain_parser = subparsers.add_parser(
+        'explain', help='Flag hot queries on experiment result collections that scan the whole collection.'
+    )
+    explain_parser.add_argument(
+        '--collection', action='append', dest='collections', help='Collection to check (default: all).'
+    )
+    backfill_parser = subparsers.add_parser(
+        'backfill-test-keys', help='Add test keys to results that were stored before test keys were introduced.'
+    )
+    backfill_parser.add_argument(
+        '--collection', action='append', dest='collections', help='Collection to backfill (default: all).'
+    )
+    import_parser = subparsers.add_parser(
+        'import-chromium-revisions', help='Import Chromium revision numbers and ids from a git log dump.'
+    )
+    import_parser.add_argument('file', help="Path of the git log dump, or '-' to read from stdin.")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    MongoDB().connect(Global.get_database_params())
+    try:
+        match args.command:
+            case 'explain':
+                return 0 if explain(args.collections) else 1
+            case 'backfill-test-keys':
+                return 0 if backfill_test_keys(args.collections) else 1
+            case 'import-chromium-revisions':
+                return 0 if import_chromium_revisions(args.file) else 1
+            case _:
+                parser.error(f"Unknown command '{args.command}'")
+    finally:
+        MongoDB().disconnect()
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
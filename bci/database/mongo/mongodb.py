@@ -1,15 +1,18 @@
 from __future__ import annotations
 
+import hashlib
+import json
 import logging
+import threading
 from datetime import datetime, timezone
 from typing import Optional
 
 from flatten_dict import flatten
 from gridfs import GridFS
-from pymongo import ASCENDING, MongoClient
+from pymongo import ASCENDING, MongoClient, UpdateOne
 from pymongo.collection import Collection
 from pymongo.database import Database
-from pymongo.errors import ServerSelectionTimeoutError
+from pymongo.errors import CollectionInvalid, DuplicateKeyError, ServerSelectionTimeoutError
 
 from bci.evaluations.logic import (
     DatabaseParameters,
@@ -23,6 +26,68 @@ from bci.version_control.states.state import State
 
 logger = logging.getLogger(__name__)
 
+# Indexes of experiment result collections, supporting (in order):
+# - Lookups of individual test results, which match the state as a whole.
+# - Fetching the evaluated states and plotting data of a revision range.
+# - Fetching the results that were stored since the last fetch.
+# - Plotting data of a release range.
+DATA_COLLECTION_INDEXES = [
+    ['mech_group', 'browser_config', 'state'],
+    ['mech_group', 'browser_config', 'state.type', 'state.revision_number'],
+    ['mech_group', 'browser_config', 'ts'],
+    ['mech_group', 'browser_config', 'state.type', 'padded_browser_version'],
+]
+
+
+def create_test_key(
+    browser_setting: str, cli_options: list[str], extensions: list[str], mech_group: str, automation: str, state: dict
+) -> str:
+    """
+    Returns the canonical key that identifies a test, which is stored alongside its result.
+    Options and extensions are sorted, and the state is only identified by its type, browser and index, so that the
+    key does not depend on their order or on optional state attributes (e.g., a missing revision id).
+    """
+    state_index = state['major_version'] if state['type'] == 'version' else state['revision_number']
+    canonical = [
+        state['browser_name'],
+        browser_setting,
+        sorted(cli_options),
+        sorted(extensions),
+        mech_group,
+        automation,
+        [state['type'], state_index],
+    ]
+    return hashlib.sha256(json.dumps(canonical, separators=(',', ':')).encode()).hexdigest()
+
+
+def get_test_key(params: TestParameters) -> str:
+    return create_test_key(
+        params.browser_configuration.browser_setting,
+        params.browser_configuration.cli_options,
+        params.browser_configuration.extensions,
+        params.mech_group,
+        params.evaluation_configuration.automation,
+        params.state.to_dict(),
+    )
+
+
+def get_test_key_of_document(document: dict) -> Optional[str]:
+    """
+    Returns the test key of the given result document, or None if the document lacks the fields that identify its test
+    (e.g., results stored by early versions, which did not record the browser automation).
+    """
+    try:
+        return create_test_key(
+            document['browser_config'],
+            document.get('cli_options', []),
+            document.get('extensions', []),
+            document['mech_group'],
+            document['browser_automation'],
+            document['state'],
+        )
+    except (KeyError, TypeError):
+        return None
+
 
 def singleton(class_):
     instances = {}
@@ -39,6 +104,9 @@ def singleton(class_):
 class MongoDB:
     instance = None
     binary_cache_limit = 0
+    binary_cache_size_limit = 0
+    binary_cache_threads = 8
+    binary_cache_format = 'files'
 
     binary_availability_collection_names = {
         'chromium': 'chromium_binary_availability',
@@ -48,6 +116,13 @@ class MongoDB:
     def __init__(self):
         self.client: Optional[MongoClient] = None
         self._db: Optional[Database] = None
+        # Handles of collections that are known to exist, so their existence is only verified once.
+        self.__collections: dict[str, Collection] = {}
+        self.__collections_lock = threading.Lock()
+        # Experiment result collections of which the indexes are ensured during this session.
+        self.__indexed_data_collections: set[str] = set()
+        # Experiment result collections of which all documents are known to have a test key.
+        self.__test_keyed_data_collections: set[str] = set()
 
     def connect(self, db_params: DatabaseParameters) -> None:
         assert db_params is not None
@@ -62,7 +137,11 @@ class MongoDB:
             serverSelectionTimeoutMS=10000,
         )
         self.binary_cache_limit = db_params.binary_cache_limit
+        self.binary_cache_size_limit = db_params.binary_cache_size_limit
+        self.binary_cache_threads = db_params.binary_cache_threads
+        self.binary_cache_format = db_params.binary_cache_format
         logger.info(f'Binary cache limit set to {db_params.binary_cache_limit}')
+        self.invalidate_collection_cache()
         # Force connection to check whether MongoDB server is reachable
         try:
             self.client.server_info()
@@ -80,48 +159,85 @@ class MongoDB:
             self.client.close()
         self.client = None
         self._db = None
+        self.invalidate_collection_cache()
 
     def __initialize_collections(self):
         if self._db is None:
             raise
 
+        existing_collection_names = self._db.list_collection_names()
+
         for collection_name in ['chromium_binary_availability']:
-            if collection_name not in self._db.list_collection_names():
+            if collection_name not in existing_collection_names:
                 self._db.create_collection(collection_name)
+            # Supports prefetching the binary availability of a whole evaluation range
+            self._db[collection_name].create_index(['state.type', 'state.revision_number'])
 
         # Binary cache
-        if 'fs.files' not in self._db.list_collection_names():
-            # Create the 'fs.files' collection with indexes
-            self._db.create_collection('fs.files')
-            self._db['fs.files'].create_index(
-                ['state_type', 'browser_name', 'state_index', 'relative_file_path'], unique=True
-            )
-        if 'fs.chunks' not in self._db.list_collection_names():
-            # Create the 'fs.chunks' collection with zstd compression
-            self._db.create_collection(
-                'fs.chunks', storageEngine={'wiredTiger': {'configString': 'block_compressor=zstd'}}
-            )
-            self._db['fs.chunks'].create_index(['files_id', 'n'], unique=True)
+        self.create_binary_cache_collections()
 
         # Revision cache
-        if 'firefox_binary_availability' not in self._db.list_collection_names():
+        if 'firefox_binary_availability' not in existing_collection_names:
             self._db.create_collection('firefox_binary_availability')
             self._db['firefox_binary_availability'].create_index([('revision_number', ASCENDING)])
             self._db['firefox_binary_availability'].create_index(['node'])
-        if 'firefox_release_base_revs' not in self._db.list_collection_names():
+        if 'firefox_release_base_revs' not in existing_collection_names:
             self._db.create_collection('firefox_release_base_revs')
-        if 'chromium_release_base_revs' not in self._db.list_collection_names():
+        if 'chromium_release_base_revs' not in existing_collection_names:
             self._db.create_collection('chromium_release_base_revs')
+        if 'chromium_revision_index' not in existing_collection_names:
+            # Maps commit positions to commit hashes, imported from a git log dump (see maintenance.py)
+            self._db.create_collection('chromium_revision_index')
+            self._db['chromium_revision_index'].create_index([('revision_number', ASCENDING)], unique=True)
+            self._db['chromium_revision_index'].create_index(['revision_id'], unique=True)
+
+        # Worker queue
+        if 'worker_queue' not in existing_collection_names:
+            self._db.create_collection('worker_queue')
+            self._db['worker_queue'].create_index(['pool_id', 'status', '_id'])
 
     def get_collection(self, name: str, create_if_not_found: bool = False) -> Collection:
+        """
+        Returns the collection with the given name.
+        The existence of each collection is only verified (or the collection is created) on first access.
+
+        :param name: The name of the collection.
+        :param create_if_not_found: Whether the collection should be created if it does not exist.
+        """
         if self._db is None:
             raise ServerException('Database server does not have a database')
-        if name not in self._db.list_collection_names():
-            if create_if_not_found:
-                return self._db.create_collection(name)
+        with self.__collections_lock:
+            if (collection := self.__collections.get(name)) is not None:
+                return collection
+            if name in self._db.list_collection_names(filter={'name': name}):
+                collection = self._db[name]
+            elif create_if_not_found:
+                try:
+                    collection = self._db.create_collection(name)
+                except CollectionInvalid:
+                    # The collection was created concurrently, e.g. by a worker.
+                    collection = self._db[name]
             else:
                 raise ServerException(f"Could not find collection '{name}'")
-        return self._db[name]
+            self.__collections[name] = collection
+            return collection
+
+    def invalidate_collection_cache(self, name: Optional[str] = None) -> None:
+        """
+        Forgets the handle of the given collection, or of all collections if no name is given, so that its existence
+        is verified again on the next access.
+
+        :param name: The name of the collection.
+        """
+        with self.__collections_lock:
+            if name is None:
+                self.__collections.clear()
+                self.__indexed_data_collections.clear()
+                self.__test_keyed_data_collections.clear()
+            else:
+                self.__collections.pop(name, None)
+                self.__indexed_data_collections.discard(name)
+                self.__test_keyed_data_collections.discard(name)
 
     def get_all_collection_names_for_browser(self, browser_name: str) -> list[str]:
         """
@@ -133,9 +249,47 @@ class MongoDB:
 
     @property
     def gridfs(self) -> GridFS:
+        return self.get_gridfs()
+
+    def get_gridfs(self, bucket_name: str = 'fs') -> GridFS:
+        """
+        Returns the GridFS bucket with the given name, of which the files and chunks are stored in the collections
+        '<bucket_name>.files' and '<bucket_name>.chunks'.
+        """
         if self._db is None:
             raise ServerException('Database server does not have a database')
-        return GridFS(self._db)
+        return GridFS(self._db, collection=bucket_name)
+
+    def create_binary_cache_collections(
+        self, bucket_name: str = 'fs', entries_collection_name: str = 'binary_cache_entries'
+    ) -> None:
+        """
+        Creates the collections of the binary cache with their indexes, if they do not exist yet.
+
+        :param bucket_name: The name of the GridFS bucket that holds the cached files.
+        :param entries_collection_name: The name of the collection that holds one entry per cached binary.
+        """
+        if self._db is None:
+            raise ServerException('Database server does not have a database')
+        existing_collection_names = self._db.list_collection_names()
+        files_collection_name, chunks_collection_name = f'{bucket_name}.files', f'{bucket_name}.chunks'
+        if files_collection_name not in existing_collection_names:
+            # Create the files collection with indexes
+            self._db.create_collection(files_collection_name)
+            self._db[files_collection_name].create_index(
+                ['state_type', 'browser_name', 'state_index', 'relative_file_path'], unique=True
+            )
+        if chunks_collection_name not in existing_collection_names:
+            # Create the chunks collection with zstd compression
+            self._db.create_collection(
+                chunks_collection_name, storageEngine={'wiredTiger': {'configString': 'block_compressor=zstd'}}
+            )
+            self._db[chunks_collection_name].create_index(['files_id', 'n'], unique=True)
+        if entries_collection_name not in existing_collection_names:
+            # One document per cached binary, ordered for eviction (least hits first, then least recently used)
+            self._db.create_collection(entries_collection_name)
+            self._db[entries_collection_name].create_index(['browser_name', 'state_type', 'state_index'], unique=True)
+            self._db[entries_collection_name].create_index(['state_type', 'hit_count', 'last_access_ts'])
 
     def store_result(self, result: TestResult):
         """
@@ -143,7 +297,8 @@ class MongoDB:
         """
         browser_config = result.params.browser_configuration
         eval_config = result.params.evaluation_configuration
-        collection = self.__get_data_collection(result.params)
+        collection = self.__get_data_collection(result.params.database_collection)
+        test_key = get_test_key(result.params)
         query = {
             'browser_automation': eval_config.automation,
             'browser_version': result.browser_version,
@@ -165,18 +320,24 @@ class MongoDB:
                 query['build_id'] = 'artisanal'
             else:
                 query['build_id'] = build_id
-        update = {
-            '$set': {
-                'results': result.data,
-                'dirty': result.is_dirty,
-                'ts': str(datetime.now(timezone.utc).replace(microsecond=0)),
-            }
+        fields = {
+            'results': result.data,
+            'dirty': result.is_dirty,
+            'ts': str(datetime.now(timezone.utc).replace(microsecond=0)),
         }
-        collection.update_one(query, update, upsert=True)
+        if not self.__has_test_keys(collection):
+            # Documents stored without test key can only be matched on their content, which also migrates them.
+            try:
+                collection.update_one(query, {'$set': {'test_key': test_key, **fields}}, upsert=True)
+                return
+            except DuplicateKeyError:
+                # A document of this test with a test key exists, but its content differs (e.g., binary origin).
+                pass
+        collection.update_one({'test_key': test_key}, {'$set': {**query, **fields}}, upsert=True)
 
     def get_result(self, params: TestParameters) -> Optional[TestResult]:
-        collection = self.__get_data_collection(params)
-        query = self.__to_test_query(params)
+        collection = self.__get_data_collection(params.database_collection)
+        query = self.__to_test_query(params, collection)
         document = collection.find_one(query)
         if document:
             return params.create_test_result_with(
@@ -187,15 +348,28 @@ class MongoDB:
             return None
 
     def has_result(self, params: TestParameters) -> bool:
-        collection = self.__get_data_collection(params)
-        query = self.__to_test_query(params)
-        nb_of_documents = collection.count_documents(query)
-        return nb_of_documents > 0
+        collection = self.__get_data_collection(params.database_collection)
+        query = self.__to_test_query(params, collection)
+        return collection.find_one(query, {'_id': True}) is not None
 
     def get_evaluated_states(
-        self, params: EvaluationParameters, boundary_states: Optional[tuple[State, State]], result_factory: StateResultFactory, dirty: Optional[bool]=None
+        self,
+        params: EvaluationParameters,
+        boundary_states: Optional[tuple[State, State]],
+        result_factory: StateResultFactory,
+        dirty: Optional[bool] = None,
+        since: Optional[str] = None,
     ) -> list[State]:
-        collection = self.get_collection(params.database_collection, create_if_not_found=True)
+        """
+        Returns the evaluated states of the given evaluation, including their results.
+
+        :param params: The evaluation parameters.
+        :param boundary_states: If given, only states within these (inclusive) boundaries are returned.
+        :param result_factory: The factory to create the results of the states.
+        :param dirty: If given, only states with a dirty (True) or clean (False) result are returned.
+        :param since: If given, only states of which the result was stored at or after this timestamp are returned.
+        """
+        collection = self.__get_data_collection(params.database_collection)
         query = {
             'browser_config': params.browser_configuration.browser_setting,
             'mech_group': params.evaluation_range.mech_group,
@@ -224,7 +398,9 @@ class MongoDB:
             query['cli_options'] = []
         if dirty is not None:
             query['dirty'] = dirty
-        cursor = collection.find(query)
+        if since is not None:
+            query['ts'] = {'$gte': since}
+        cursor = collection.find(query, {'state': True, 'results': True})
         states = []
         for doc in cursor:
             state = State.from_dict(doc['state'])
@@ -232,7 +408,13 @@ class MongoDB:
             states.append(state)
         return states
 
-    def __to_test_query(self, params: TestParameters) -> dict:
+    def __to_test_query(self, params: TestParameters, collection: Collection) -> dict:
+        """
+        Returns the query that matches the result document of the given test.
+        This is a lookup by test key, unless the collection still contains documents without test key.
+        """
+        if self.__has_test_keys(collection):
+            return {'test_key': get_test_key(params)}
         query = {
             'state': params.state.to_dict(),
             'browser_automation': params.evaluation_configuration.automation,
@@ -255,9 +437,47 @@ class MongoDB:
             query['cli_options'] = []
         return query
 
-    def __get_data_collection(self, test_params: TestParameters) -> Collection:
-        collection_name = test_params.database_collection
-        return self.get_collection(collection_name, create_if_not_found=True)
+    def __get_data_collection(self, collection_name: str) -> Collection:
+        """
+        Returns the experiment result collection with the given name, which is created and indexed if necessary.
+        """
+        collection = self.get_collection(collection_name, create_if_not_found=True)
+        if collection_name not in self.__indexed_data_collections:
+            self.__create_data_collection_indexes(collection)
+            self.__indexed_data_collections.add(collection_name)
+        return collection
+
+    @staticmethod
+    def __create_data_collection_indexes(collection: Collection) -> None:
+        """
+        Creates the indexes that support the queries on experiment results.
+        Creating an index that already exists is a no-op.
+        """
+        for keys in DATA_COLLECTION_INDEXES:
+            collection.create_index(keys)
+        # Documents stored before test keys were introduced might not have one yet.
+        collection.create_index('test_key', unique=True, partialFilterExpression={'test_key': {'$exists': True}})
+
+    def __has_test_keys(self, collection: Collection) -> bool:
+        """
+        Returns whether all documents of the given experiment result collection have a test key.
+        Once this is the case, it remains so because all results are stored with a test key.
+        """
+        if collection.name not in self.__test_keyed_data_collections:
+            if collection.find_one({'test_key': {'$exists': False}}, {'_id': True}) is not None:
+                return False
+            self.__test_keyed_data_collections.add(collection.name)
+        return True
+
+    def create_all_data_collection_indexes(self) -> None:
+        """
+        Creates the indexes of all existing experiment result collections, which might have been created by an
+        earlier version of BugHog without indexes.
+        """
+        for browser_name in self.binary_availability_collection_names:
+            for collection_name in self.get_all_collection_names_for_browser(browser_name):
+                logger.debug(f"Ensuring indexes of '{collection_name}'")
+                self.__get_data_collection(collection_name)
 
     def get_binary_availability_collection(self, browser_name: str):
         collection_name = self.binary_availability_collection_names[browser_name]
@@ -265,13 +485,46 @@ class MongoDB:
 
     # Caching of online binary availability
 
+    @staticmethod
+    def __get_binary_availability_query(state: State) -> dict:
+        state_dict = state.to_dict()
+        # Revisions that are stored in bulk only have a revision number, so they are not queried by revision id.
+        if state_dict['type'] == 'revision' and 'revision_number' in state_dict:
+            state_dict.pop('revision_id', None)
+        return flatten({'state': state_dict}, reducer='dot')
+
     def has_binary_available_online(self, browser: str, state: State):
         collection = self.get_binary_availability_collection(browser)
-        document = collection.find_one({'state': state.to_dict()})
+        document = collection.find_one(self.__get_binary_availability_query(state))
         if document is None:
             return None
         return document['binary_online']
 
+    def get_binary_availability_of_revisions(
+        self, browser: str, lower_revision_nb: int, upper_revision_nb: int
+    ) -> tuple[list[int], list[int]]:
+        """
+        Returns the revision numbers within the given (inclusive) range of which the binary availability is cached.
+
+        :param browser: The browser name.
+        :param lower_revision_nb: The lower revision number of the range.
+        :param upper_revision_nb: The upper revision number of the range.
+        :return: The revision numbers with and without an available binary, respectively.
+        """
+        collection = self.get_binary_availability_collection(browser)
+        cursor = collection.find(
+            {
+                'state.type': 'revision',
+                'state.revision_number': {'$gte': lower_revision_nb, '$lte': upper_revision_nb},
+            },
+            {'_id': False, 'state.revision_number': True, 'binary_online': True},
+        )
+        available, unavailable = [], []
+        for document in cursor:
+            revision_nb = document['state']['revision_number']
+            (available if document['binary_online'] else unavailable).append(revision_nb)
+        return available, unavailable
+
     def get_stored_binary_availability(self, browser):
         collection = MongoDB().get_binary_availability_collection(browser)
         result = collection.find(
@@ -300,7 +553,7 @@ class MongoDB:
     ):
         collection = MongoDB().get_binary_availability_collection(browser)
         collection.update_one(
-            {'state': state.to_dict()},
+            self.__get_binary_availability_query(state),
             {
                 '$set': {
                     'state': state.to_dict(),
@@ -312,6 +565,28 @@ class MongoDB:
             upsert=True,
         )
 
+    def store_binary_availability_of_revisions(self, browser: str, revision_nbs: list[int]) -> None:
+        """
+        Stores in bulk that a binary is available online for each of the given revision numbers.
+        Revisions of which no availability was stored yet are stored with their revision number only.
+        """
+        if not revision_nbs:
+            return
+        collection = MongoDB().get_binary_availability_collection(browser)
+        ts = str(datetime.now(timezone.utc).replace(microsecond=0))
+        operations = [
+            UpdateOne(
+                {'state.type': 'revision', 'state.revision_number': revision_nb},
+                {
+                    '$set': {'binary_online': True, 'ts': ts},
+                    '$setOnInsert': {'state.browser_name': browser, 'url': None},
+                },
+                upsert=True,
+            )
+            for revision_nb in revision_nbs
+        ]
+        collection.bulk_write(operations, ordered=False)
+
     def get_build_id_firefox(self, state: State):
         collection = MongoDB().get_binary_availability_collection('firefox')
 
@@ -323,7 +598,7 @@ class MongoDB:
         return result['build_id']
 
     def get_documents_for_plotting(self, params: PlotParameters, releases: bool = False) -> list:
-        collection = self.get_collection(params.database_collection, create_if_not_found=True)
+        collection = self.__get_data_collection(params.database_collection)
         query = {
             'mech_group': params.mech_group,
             'browser_config': params.browser_config,
@@ -356,13 +631,14 @@ class MongoDB:
         return list(docs)
 
     def remove_datapoint(self, params: TestParameters) -> None:
-        collection = self.get_collection(params.database_collection)
-        query = self.__to_test_query(params)
+        collection = self.__get_data_collection(params.database_collection)
+        query = self.__to_test_query(params, collection)
         collection.delete_one(query)
 
     def remove_all_data_from_collection(self, collection_name: str) -> None:
         collection = self.get_collection(collection_name)
         collection.delete_many({})
+        self.invalidate_collection_cache(collection_name)
 
     def get_info(self) -> dict:
         if self.client and self.client.address:
@@ -1,8 +1,10 @@
 import logging
 from concurrent.futures import ThreadPoolExecutor
-from typing import Optional
+from itertools import islice
+from typing import Iterable, Optional
 
-from pymongo import ASCENDING, DESCENDING
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
 
 from bci import util
 from bci.database.mongo.mongodb import MongoDB
@@ -10,6 +12,7 @@ from bci.database.mongo.mongodb import MongoDB
 logger = logging.getLogger(__name__)
 
 BASE_URL = 'https://bughog.distrinet-research.be/'
+CHROMIUM_REVISION_INDEX_BATCH_SIZE = 1000
 
 
 class RevisionCache:
@@ -62,6 +65,15 @@ class RevisionCache:
             raise AttributeError('No revision number or id was provided')
         return result is not None
 
+    @staticmethod
+    def firefox_get_revision_nbs_with_binary(lower_revision_nb: int, upper_revision_nb: int) -> list[int]:
+        collection = MongoDB().get_collection('firefox_binary_availability')
+        cursor = collection.find(
+            {'revision_number': {'$gte': lower_revision_nb, '$lte': upper_revision_nb}},
+            {'_id': False, 'revision_number': True},
+        )
+        return [document['revision_number'] for document in cursor]
+
     @staticmethod
     def firefox_get_binary_info(revision_id: str) -> Optional[dict]:
         collection = MongoDB().get_collection('firefox_binary_availability')
@@ -94,6 +106,55 @@ class RevisionCache:
             return None
         return result.get('node', None)
 
+    @staticmethod
+    def chromium_get_revision_id(revision_nb: int) -> Optional[str]:
+        collection = MongoDB().get_collection('chromium_revision_index')
+        result = collection.find_one({'revision_number': revision_nb}, {'_id': False, 'revision_id': True})
+        if result is None:
+            return None
+        return result['revision_id']
+
+    @staticmethod
+    def chromium_get_revision_nb(revision_id: str) -> Optional[int]:
+        collection = MongoDB().get_collection('chromium_revision_index')
+        result = collection.find_one({'revision_id': revision_id}, {'_id': False, 'revision_number': True})
+        if result is None:
+            return None
+        return result['revision_number']
+
+    @staticmethod
+    def chromium_store_revisions(revisions: Iterable[tuple[int, str]]) -> int:
+        """
+        Stores the given pairs of revision number and revision id in the Chromium revision index, in batches.
+        Pairs that conflict with the index (i.e., of which the revision id is already paired with another revision
+        number) are logged and skipped.
+
+        :return: The number of revisions that were added or changed.
+        """
+        collection = MongoDB().get_collection('chromium_revision_index')
+        revisions = iter(revisions)
+        nb_of_stored = 0
+        while batch := list(islice(revisions, CHROMIUM_REVISION_INDEX_BATCH_SIZE)):
+            try:
+                result = collection.bulk_write(
+                    [
+                        UpdateOne({'revision_number': revision_nb}, {'$set': {'revision_id': revision_id}}, upsert=True)
+                        for revision_nb, revision_id in batch
+                    ],
+                    ordered=False,
+                )
+                nb_of_stored += result.upserted_count + result.modified_count
+            except BulkWriteError as e:
+                # Unordered writes continue after a failed write, so the other revisions of the batch are stored.
+                nb_of_stored += e.details['nUpserted'] + e.details['nModified']
+                for error in e.details['writeErrors']:
+                    revision_nb, revision_id = batch[error['index']]
+                    logger.warning(
+                        f'Could not add revision {revision_nb} ({revision_id}) to the Chromium revision index: '
+                        f"{error['errmsg']}"
+                    )
+        return nb_of_stored
+
     @staticmethod
     def __get_release_base_rev_collection(browser: str) -> str:
         match browser:
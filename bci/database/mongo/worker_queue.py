@@ -0,0 +1,138 @@
+import datetime
+import logging
+from typing import Optional
+
+from pymongo import ASCENDING, ReturnDocument
+
+from bci.database.mongo.mongodb import MongoDB
+from bci.evaluations.logic import WorkerParameters
+
+logger = logging.getLogger(__name__)
+
+COLLECTION_NAME = 'worker_queue'
+
+
+class WorkerQueue:
+    """
+    The worker queue is used to distribute tests over a pool of persistent worker containers.
+    Each pool is identified by a unique id, so that leftover jobs of previous pools are never picked up.
+    """
+
+    @staticmethod
+    def clear(pool_id: Optional[str] = None) -> None:
+        """
+        Removes all jobs of the given pool, or all jobs if no pool is given.
+
+        :param pool_id: The id of the worker pool.
+        """
+        query = {} if pool_id is None else {'pool_id': pool_id}
+        MongoDB().get_collection(COLLECTION_NAME).delete_many(query)
+
+    @staticmethod
+    def clear_stale(max_age: datetime.timedelta) -> None:
+        """
+        Removes the jobs of all pools that were queued longer than the given age ago, such as leftovers of pools of
+        which the manager did not exit cleanly.
+
+        :param max_age: The age after which jobs are considered stale.
+        """
+        MongoDB().get_collection(COLLECTION_NAME).delete_many({'ts': {'$lt': datetime.datetime.now() - max_age}})
+
+    @staticmethod
+    def put(pool_id: str, params: WorkerParameters) -> str:
+        """
+        Adds a test to the queue of the given pool.
+
+        :param pool_id: The id of the worker pool.
+        :param params: The parameters of the test.
+        :return: The id of the queued job.
+        """
+        result = MongoDB().get_collection(COLLECTION_NAME).insert_one({
+            'pool_id': pool_id,
+            'params': params.serialize(),
+            'state': str(params.state),
+            'status': 'pending',
+            'worker': None,
+            'ts': datetime.datetime.now(),
+        })
+        return str(result.inserted_id)
+
+    @staticmethod
+    def put_shutdown(pool_id: str, nb_of_workers: int) -> None:
+        """
+        Adds a shutdown job for each worker of the given pool.
+        Shutdown jobs are only claimed after all tests that were queued before.
+
+        :param pool_id: The id of the worker pool.
+        :param nb_of_workers: The number of workers in the pool.
+        """
+        MongoDB().get_collection(COLLECTION_NAME).insert_many([
+            {
+                'pool_id': pool_id,
+                'shutdown': True,
+                'status': 'pending',
+                'worker': None,
+                'ts': datetime.datetime.now(),
+            }
+            for _ in range(nb_of_workers)
+        ])
+
+    @staticmethod
+    def claim(pool_id: str, worker_name: str) -> Optional[dict]:
+        """
+        Atomically claims the oldest pending job of the given pool.
+
+        :param pool_id: The id of the worker pool.
+        :param worker_name: The name of the worker claiming the job.
+        :return: The claimed job, or None if there are no pending jobs.
+        """
+        return MongoDB().get_collection(COLLECTION_NAME).find_one_and_update(
+            {'pool_id': pool_id, 'status': 'pending'},
+            {'$set': {'status': 'running', 'worker': worker_name}},
+            sort=[('_id', ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    @staticmethod
+    def mark_finished(job: dict, succeeded: bool) -> None:
+        """
+        Marks the given claimed job as finished.
+
+        :param job: The claimed job.
+        :param succeeded: Whether the test was performed without errors.
+        """
+        MongoDB().get_collection(COLLECTION_NAME).update_one(
+            {'_id': job['_id']}, {'$set': {'status': 'finished' if succeeded else 'failed'}}
+        )
+
+    @staticmethod
+    def fail_running_jobs(pool_id: str, worker_name: str) -> None:
+        """
+        Marks all jobs that are claimed by the given worker as failed.
+        This is used when a worker exits unexpectedly, so that its jobs are not awaited forever.
+
+        :param pool_id: The id of the worker pool.
+        :param worker_name: The name of the worker.
+        """
+        MongoDB().get_collection(COLLECTION_NAME).update_many(
+            {'pool_id': pool_id, 'status': 'running', 'worker': worker_name}, {'$set': {'status': 'failed'}}
+        )
+
+    @staticmethod
+    def pop_finished_jobs(pool_id: str) -> list[dict]:
+        """
+        Removes all finished and failed jobs of the given pool from the queue and returns them.
+
+        :param pool_id: The id of the worker pool.
+        :return: The finished and failed jobs.
+        """
+        collection = MongoDB().get_collection(COLLECTION_NAME)
+        jobs = list(
+            collection.find(
+                {'pool_id': pool_id, 'status': {'$in': ['finished', 'failed']}},
+                {'_id': True, 'state': True, 'status': True, 'worker': True, 'shutdown': True},
+            )
+        )
+        if jobs:
+            collection.delete_many({'_id': {'$in': [job['_id'] for job in jobs]}})
+        return jobs
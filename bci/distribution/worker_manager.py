@@ -1,23 +1,45 @@
+import datetime
+import json
 import logging
 import os
 import threading
 import time
+import uuid
 from queue import Queue
+from typing import Optional
 
 import docker
 import docker.errors
 
-from bci import worker
 from bci.configuration import Global
-from bci.evaluations.logic import WorkerParameters
+from bci.database.mongo.worker_queue import WorkerQueue
+from bci.evaluations.logic import DatabaseParameters, WorkerParameters
 from bci.web.clients import Clients
 
 logger = logging.getLogger(__name__)
 
+# Interval at which the worker queue is checked for finished tests in worker pool mode.
+POOL_POLL_INTERVAL = 0.2
+# Number of times a pool worker that exits unexpectedly is restarted, and the delay in seconds before each restart.
+MAX_POOL_WORKER_RESTARTS = 3
+POOL_WORKER_RESTART_DELAY = 5
+# Jobs in the worker queue that are older than this are leftovers of pools that were not shut down cleanly.
+STALE_POOL_JOB_AGE = datetime.timedelta(days=1)
+# Delay in seconds before subscribing to the Docker events stream again after it was lost.
+DOCKER_EVENTS_RESUBSCRIBE_DELAY = 1
+
 
 class WorkerManager:
-    def __init__(self, max_nb_of_containers: int) -> None:
+    def __init__(self, max_nb_of_containers: int, use_worker_pool: bool = False) -> None:
+        """
+        Initializes the worker manager.
+
+        :param max_nb_of_containers: The maximum number of tests that are performed in parallel.
+        :param use_worker_pool: Whether tests are distributed over persistent worker containers through the worker
+        queue, instead of starting a new container for each test.
+        """
         self.max_nb_of_containers = max_nb_of_containers
+        self.use_worker_pool = use_worker_pool
 
         if self.max_nb_of_containers == 1:
             logger.info('Running in single container mode')
@@ -26,71 +48,39 @@ class WorkerManager:
             for i in range(max_nb_of_containers):
                 self.container_id_pool.put(i)
             self.client = docker.from_env()
+            # Slots are counted in-process and released by the container threads as soon as they finish.
+            self.__slot_condition = threading.Condition()
+            self.__active_container_names: set[str] = set()
+            # Running worker containers that were not started by this manager (e.g., leftovers of a previous run).
+            self.__foreign_container_ids: set[str] = set()
+            # Worker pool mode
+            self.__pool_id: Optional[str] = None
+            self.__pool_container_names: set[str] = set()
+            self.__queued_job_ids: set[str] = set()
+            self.__is_shut_down = False
+            self.__start_listening_to_docker_events()
+            if self.use_worker_pool:
+                logger.info(f'Running in worker pool mode with {max_nb_of_containers} workers')
 
     def start_test(self, params: WorkerParameters, blocking_wait=True) -> None:
         if self.max_nb_of_containers != 1:
+            if self.use_worker_pool:
+                return self.__queue_test(params, blocking_wait)
             return self.__run_container(params, blocking_wait)
 
-        # Single container mode
+        # Single container mode, the worker is only imported here since it requires a display.
+        from bci import worker
+
         worker.run(params)
         Clients.push_results_to_all()
 
     def __run_container(self, params: WorkerParameters, blocking_wait=True) -> None:
-        while blocking_wait and self.get_nb_of_running_worker_containers() >= self.max_nb_of_containers:
-            time.sleep(5)
-        container_id = self.container_id_pool.get()
-        container_name = f'bh_worker_{container_id}'
+        container_id, container_name = self.__acquire_slot(blocking_wait)
 
         def start_container_thread():
-            if (host_pwd := os.getenv('HOST_PWD', None)) is None:
-                raise AttributeError('Could not find HOST_PWD environment var')
-            try:
-                # Sometimes, it takes a while for Docker to remove the container
-                while True:
-                    # Get all containers with same name
-                    active_containers = self.client.containers.list(
-                        all=True,
-                        ignore_removed=True,
-                        filters={
-                            'name': f'^/{container_name}$'  # The exact name has to match
-                        },
-                    )
-                    # Break loop if no container with same name is active
-                    if not active_containers:
-                        break
-                    # Remove all containers with same name (never higher than 1 in practice)
-                    for container in active_containers:
-                        logger.info(f'Removing old container \'{container.attrs["Name"]}\' to start new one')
-                        container.remove(force=True)
-            except docker.errors.APIError:
-                logger.error("Could not consult list of active containers", exc_info=True)
-
             container = None
             try:
-                container = self.client.containers.run(
-                    f'bughog/worker:{Global.get_tag()}',
-                    name=container_name,
-                    hostname=container_name,
-                    shm_size='2gb',
-                    network='bh_net',
-                    mem_limit='4g',  # To prevent one container from consuming multiple gigs of memory (was the case for a Firefox evaluation)
-                    mem_reservation='2g',
-                    detach=True,
-                    labels=['bh_worker'],
-                    command=[params.serialize()],
-                    volumes=[
-                        os.path.join(host_pwd, 'config') + ':/app/config:ro',
-                        os.path.join(host_pwd, 'browser/binaries/chromium/artisanal')
-                        + ':/app/browser/binaries/chromium/artisanal:rw',
-                        os.path.join(host_pwd, 'browser/binaries/firefox/artisanal')
-                        + ':/app/browser/binaries/firefox/artisanal:rw',
-                        os.path.join(host_pwd, 'experiments') + ':/app/experiments:ro',
-                        os.path.join(host_pwd, 'browser/extensions') + ':/app/browser/extensions:ro',
-                        os.path.join(host_pwd, 'logs') + ':/app/logs:rw',
-                        os.path.join(host_pwd, 'nginx/ssl') + ':/etc/nginx/ssl:ro',
-                        '/dev/shm:/dev/shm',
-                    ],
-                )
+                container = self.__start_worker_container(container_name, [params.serialize()])
                 result = container.wait()
                 if result["StatusCode"] != 0:
                     logger.error(
@@ -111,14 +101,311 @@ class WorkerManager:
                     logger.error(f"'{container_name}' exited unexpectedly with {container_info}", exc_info=True)
             finally:
                 if container is not None:
-                    container.remove()
-                self.container_id_pool.put(container_id)
+                    try:
+                        container.remove()
+                    except docker.errors.APIError:
+                        logger.debug(f"Container '{container_name}' was already removed")
+                self.__release_slot(container_id, container_name)
 
         thread = threading.Thread(target=start_container_thread)
         thread.start()
         logger.info(f"Container '{container_name}' started experiments for '{params.state}'")
-        # Sleep to avoid all workers downloading browser binaries at once, clogging up all IO.
-        time.sleep(5)
+
+    def __start_worker_container(self, container_name: str, command: list[str]):
+        """
+        Starts a detached worker container with the given name and command.
+        Containers with the same name, which are possibly left over, are removed first.
+
+        :param container_name: The name of the container.
+        :param command: The arguments passed to the worker.
+        :return: The started container.
+        """
+        if (host_pwd := os.getenv('HOST_PWD', None)) is None:
+            raise AttributeError('Could not find HOST_PWD environment var')
+        try:
+            # Sometimes, it takes a while for Docker to remove the container
+            while True:
+                # Get all containers with same name
+                active_containers = self.client.containers.list(
+                    all=True,
+                    ignore_removed=True,
+                    filters={
+                        'name': f'^/{container_name}$'  # The exact name has to match
+                    },
+                )
+                # Break loop if no container with same name is active
+                if not active_containers:
+                    break
+                # Remove all containers with same name (never higher than 1 in practice)
+                for container in active_containers:
+                    logger.info(f'Removing old container \'{container.attrs["Name"]}\' to start new one')
+                    container.remove(force=True)
+        except docker.errors.APIError:
+            logger.error("Could not consult list of active containers", exc_info=True)
+
+        return self.client.containers.run(
+            f'bughog/worker:{Global.get_tag()}',
+            name=container_name,
+            hostname=container_name,
+            shm_size='2gb',
+            network='bh_net',
+            mem_limit='4g',  # To prevent one container from consuming multiple gigs of memory (was the case for a Firefox evaluation)
+            mem_reservation='2g',
+            detach=True,
+            labels=['bh_worker'],
+            command=command,
+            environment={
+                param: os.getenv(param, '')
+                for param in ['BCI_BINARY_STORE_LIMIT', 'BCI_HTTP_POOL_SIZE', 'BCI_HTTP_MAX_RETRIES']
+            },
+            volumes=[
+                os.path.join(host_pwd, 'config') + ':/app/config:ro',
+                os.path.join(host_pwd, 'browser/binaries/chromium/artisanal')
+                + ':/app/browser/binaries/chromium/artisanal:rw',
+                os.path.join(host_pwd, 'browser/binaries/firefox/artisanal')
+                + ':/app/browser/binaries/firefox/artisanal:rw',
+                os.path.join(host_pwd, 'browser/binaries/store') + ':/app/browser/binaries/store:rw',
+                os.path.join(host_pwd, 'experiments') + ':/app/experiments:ro',
+                os.path.join(host_pwd, 'browser/extensions') + ':/app/browser/extensions:ro',
+                os.path.join(host_pwd, 'logs') + ':/app/logs:rw',
+                os.path.join(host_pwd, 'nginx/ssl') + ':/etc/nginx/ssl:ro',
+                '/dev/shm:/dev/shm',
+            ],
+        )
+
+    def __queue_test(self, params: WorkerParameters, blocking_wait=True) -> None:
+        with self.__slot_condition:
+            if blocking_wait:
+                self.__slot_condition.wait_for(
+                    lambda: self.__get_nb_of_occupied_slots() < self.max_nb_of_containers
+                )
+            # A new pool is started if there is none yet, or if all workers of the previous one are gone.
+            if self.__pool_id is None:
+                self.__start_worker_pool(params.database_connection_params)
+            # The job id is registered while holding the lock, so it cannot be released before it is registered.
+            job_id = WorkerQueue.put(self.__pool_id, params)
+            self.__queued_job_ids.add(job_id)
+        logger.info(f"Queued experiments for '{params.state}'")
+
+    def __start_worker_pool(self, database_params: DatabaseParameters) -> None:
+        """
+        Starts the persistent worker containers, which keep taking tests from the worker queue until shut down.
+        """
+        # Pools clear their own jobs once they are abandoned, so the jobs of pools that are still running are kept.
+        pool_id = uuid.uuid4().hex
+        self.__pool_id = pool_id
+        WorkerQueue.clear_stale(STALE_POOL_JOB_AGE)
+        command = ['--pool', pool_id, json.dumps(database_params.to_dict())]
+        for i in range(self.max_nb_of_containers):
+            container_name = f'bh_worker_{i}'
+            with self.__slot_condition:
+                self.__pool_container_names.add(container_name)
+            thread = threading.Thread(target=self.__run_pool_container, args=(pool_id, container_name, command))
+            thread.start()
+        thread = threading.Thread(target=self.__collect_finished_jobs, args=(pool_id,), daemon=True)
+        thread.start()
+
+    def __run_pool_container(self, pool_id: str, container_name: str, command: list[str]) -> None:
+        """
+        Runs the given worker of the pool, and restarts it if it exits unexpectedly.
+        Once all workers of the pool are gone, the pool is abandoned.
+        """
+        nb_of_restarts = 0
+        while True:
+            should_restart = self.__run_pool_container_once(container_name, command)
+            try:
+                # Tests claimed by this worker would otherwise be awaited forever.
+                WorkerQueue.fail_running_jobs(pool_id, container_name)
+            except Exception:
+                logger.error(f"Could not fail the tests claimed by '{container_name}'", exc_info=True)
+            if not should_restart or self.__is_shut_down or nb_of_restarts >= MAX_POOL_WORKER_RESTARTS:
+                break
+            nb_of_restarts += 1
+            logger.info(f"Restarting worker '{container_name}' ({nb_of_restarts}/{MAX_POOL_WORKER_RESTARTS})")
+            time.sleep(POOL_WORKER_RESTART_DELAY)
+        with self.__slot_condition:
+            self.__pool_container_names.discard(container_name)
+            if not self.__pool_container_names and self.__pool_id == pool_id:
+                self.__abandon_worker_pool()
+
+    def __run_pool_container_once(self, container_name: str, command: list[str]) -> bool:
+        """
+        Runs the given worker of the pool until it exits.
+
+        :return: Whether the worker should be restarted, which is the case if it failed without being removed (e.g.,
+        by a forceful stop).
+        """
+        container = None
+        should_restart = True
+        try:
+            container = self.__start_worker_container(container_name, command)
+            logger.info(f"Worker '{container_name}' joined the worker pool")
+            result = container.wait()
+            if result["StatusCode"] != 0:
+                logger.error(
+                    f"'{container_name}' exited unexpectedly with status code {result['StatusCode']}. "
+                    "Check the worker logs in ./logs/ for more information."
+                )
+            else:
+                logger.debug(f"Worker '{container_name}' left the worker pool")
+                should_restart = False
+        except docker.errors.NotFound:
+            logger.info(f"Worker '{container_name}' was removed")
+            should_restart = False
+        except (docker.errors.APIError, AttributeError):
+            logger.error(f"Could not run worker '{container_name}'", exc_info=True)
+        finally:
+            if container is not None:
+                try:
+                    container.remove()
+                except docker.errors.APIError:
+                    logger.debug(f"Container '{container_name}' was already removed")
+                    should_restart = False
+        return should_restart
+
+    def __abandon_worker_pool(self) -> None:
+        """
+        Fails all tests that are still queued for the current pool, since no worker is left to perform them, and
+        releases their slots. The caller should hold the slot condition.
+        """
+        if self.__queued_job_ids:
+            logger.error(f'All workers left the worker pool, abandoning {len(self.__queued_job_ids)} queued tests')
+        try:
+            WorkerQueue.clear(self.__pool_id)
+        except Exception:
+            logger.error('Could not clear the worker queue', exc_info=True)
+        self.__queued_job_ids.clear()
+        self.__pool_id = None
+        self.__slot_condition.notify_all()
+
+    def __collect_finished_jobs(self, pool_id: str) -> None:
+        while not self.__is_shut_down and self.__pool_id == pool_id:
+            try:
+                for job in WorkerQueue.pop_finished_jobs(pool_id):
+                    if job.get('shutdown', False):
+                        continue
+                    if job['status'] == 'failed':
+                        logger.error(
+                            f"'{job['worker']}' could not finish experiments for '{job['state']}'. "
+                            "Check the worker logs in ./logs/ for more information."
+                        )
+                    else:
+                        logger.debug(f"Worker '{job['worker']}' finished experiments for '{job['state']}'")
+                        Clients.push_results_to_all()
+                    with self.__slot_condition:
+                        self.__queued_job_ids.discard(str(job['_id']))
+                        self.__slot_condition.notify_all()
+            except Exception:
+                logger.error('Could not consult the worker queue', exc_info=True)
+            time.sleep(POOL_POLL_INTERVAL)
+
+    def wait_for_free_slots(self) -> int:
+        """
+        Blocks until at least one test can be started without waiting, and returns the number of such tests.
+        """
+        if self.max_nb_of_containers == 1:
+            return 1
+        with self.__slot_condition:
+            self.__slot_condition.wait_for(lambda: self.__get_nb_of_occupied_slots() < self.max_nb_of_containers)
+            return self.max_nb_of_containers - self.__get_nb_of_occupied_slots()
+
+    def __acquire_slot(self, blocking_wait: bool) -> tuple[int, str]:
+        """
+        Blocks until a container slot is free and claims it.
+        Slots are occupied by the containers of this manager, as well as by worker containers started by others.
+
+        :param blocking_wait: Whether to wait for worker containers that were not started by this manager.
+        :return: The claimed container id and associated container name.
+        """
+        with self.__slot_condition:
+            self.__slot_condition.wait_for(
+                lambda: not self.container_id_pool.empty()
+                and (not blocking_wait or self.__get_nb_of_occupied_slots() < self.max_nb_of_containers)
+            )
+            container_id = self.container_id_pool.get_nowait()
+            container_name = f'bh_worker_{container_id}'
+            self.__active_container_names.add(container_name)
+        return container_id, container_name
+
+    def __release_slot(self, container_id: int, container_name: str) -> None:
+        with self.__slot_condition:
+            self.container_id_pool.put(container_id)
+            self.__active_container_names.discard(container_name)
+            self.__slot_condition.notify_all()
+
+    def __get_nb_of_occupied_slots(self) -> int:
+        return len(self.__active_container_names) + len(self.__queued_job_ids) + len(self.__foreign_container_ids)
+
+    def __is_own_container(self, container_name: str) -> bool:
+        return container_name in self.__active_container_names or container_name in self.__pool_container_names
+
+    def __start_listening_to_docker_events(self) -> None:
+        """
+        Subscribes to the Docker events stream, to notice worker containers that start or exit outside of this
+        manager's control.
+        """
+        self.__subscribe_to_docker_events()
+        if self.__foreign_container_ids:
+            logger.info(f'Found {len(self.__foreign_container_ids)} running worker containers of a previous run')
+
+        thread = threading.Thread(target=self.__process_docker_events, daemon=True)
+        thread.start()
+
+    def __subscribe_to_docker_events(self) -> None:
+        """
+        Subscribes to the Docker events stream, and synchronizes the foreign worker containers with the running ones.
+        """
+        # We subscribe before listing the running containers, so that no container is missed in between.
+        events = self.client.events(
+            decode=True, filters={'type': 'container', 'label': 'bh_worker', 'event': ['start', 'die']}
+        )
+        running_containers = self.get_runnning_containers()
+        with self.__slot_condition:
+            self.__events = events
+            # Containers that exited while we were not subscribed would otherwise occupy a slot forever.
+            self.__foreign_container_ids = {
+                container.id for container in running_containers if not self.__is_own_container(container.name)
+            }
+            self.__slot_condition.notify_all()
+        if self.__is_shut_down:
+            events.close()
+
+    def __process_docker_events(self) -> None:
+        """
+        Processes the Docker events stream until this manager is shut down.
+        If the stream is lost (e.g., because the Docker daemon restarted), we subscribe to it again.
+        """
+        while True:
+            try:
+                for event in self.__events:
+                    self.__process_docker_event(event)
+                if not self.__is_shut_down:
+                    logger.warning('Docker events stream ended unexpectedly')
+            except Exception:
+                if not self.__is_shut_down:
+                    logger.error('Lost the Docker events stream', exc_info=True)
+            while not self.__is_shut_down:
+                time.sleep(DOCKER_EVENTS_RESUBSCRIBE_DELAY)
+                try:
+                    self.__subscribe_to_docker_events()
+                    logger.info('Subscribed to the Docker events stream again')
+                    break
+                except Exception:
+                    logger.error('Could not subscribe to the Docker events stream', exc_info=True)
+            if self.__is_shut_down:
+                return
+
+    def __process_docker_event(self, event: dict) -> None:
+        container_id = event.get('id')
+        container_name = event.get('Actor', {}).get('Attributes', {}).get('name')
+        with self.__slot_condition:
+            if event.get('Action') == 'start':
+                if not self.__is_own_container(container_name):
+                    logger.debug(f"Worker container '{container_name}' was started by another process")
+                    self.__foreign_container_ids.add(container_id)
+            else:
+                self.__foreign_container_ids.discard(container_id)
+            self.__slot_condition.notify_all()
 
     def get_nb_of_running_worker_containers(self):
         return len(self.get_runnning_containers())
@@ -132,10 +419,19 @@ class WorkerManager:
     def wait_until_all_evaluations_are_done(self):
         if self.max_nb_of_containers == 1:
             return
-        while True:
-            if self.get_nb_of_running_worker_containers() == 0:
-                break
-            time.sleep(5)
+        with self.__slot_condition:
+            self.__slot_condition.wait_for(lambda: not self.__active_container_names and not self.__queued_job_ids)
+
+    def shutdown(self) -> None:
+        """
+        Releases the resources held by this manager, such as the subscription to the Docker events stream.
+        """
+        if self.max_nb_of_containers == 1:
+            return
+        if self.__pool_id is not None:
+            WorkerQueue.put_shutdown(self.__pool_id, self.max_nb_of_containers)
+        self.__is_shut_down = True
+        self.__events.close()
 
     @staticmethod
     def forcefully_stop_all_running_containers():
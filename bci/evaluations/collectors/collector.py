@@ -1,4 +1,5 @@
 import logging
+import time
 from enum import Enum
 
 from bci.evaluations.collectors.base import BaseCollector
@@ -25,6 +26,9 @@ class Collector:
             self.collectors.append(collector)
         logger.debug(f'Using {len(self.collectors)} result collectors')
 
+    def __get_request_collector(self) -> RequestCollector | None:
+        return next((collector for collector in self.collectors if isinstance(collector, RequestCollector)), None)
+
     def start(self):
         for collector in self.collectors:
             collector.start()
@@ -33,6 +37,24 @@ class Collector:
         for collector in self.collectors:
             collector.stop()
 
+    def get_nb_of_requests(self) -> int:
+        if (request_collector := self.__get_request_collector()) is None:
+            return 0
+        return request_collector.get_nb_of_requests()
+
+    def wait_for_terminal_report(self, since: int, timeout: float) -> bool:
+        """
+        Waits until a request that marks the end of a page visit is received (see `TERMINAL_REPORT_VARIABLES`).
+
+        :param since: The number of requests received before the page visit started.
+        :param timeout: The maximum number of seconds to wait.
+        :return: True if such a request was received, False if the timeout expired.
+        """
+        if (request_collector := self.__get_request_collector()) is None:
+            time.sleep(timeout)
+            return False
+        return request_collector.wait_for_terminal_report(since, timeout)
+
     def collect_results(self) -> dict:
         all_data = {}
         for collector in self.collectors:
@@ -1,32 +1,101 @@
+import logging
+import os
 import re
+from threading import Event, Lock, Thread
+from typing import Callable, Optional
 
 from .base import BaseCollector
 
+logger = logging.getLogger(__name__)
+
+LOG_FILE_PATH = '/tmp/browser.log'
+# Lines without the marker are skipped without running the regex, which matters for verbose browser logs.
+MARKER = b'+++bughog_'
+PATTERN = re.compile(rb'\+\+\+bughog_(.+)=(.+)\+\+\+')
+FOLLOW_INTERVAL = 0.2
+
 
 class LogCollector(BaseCollector):
+    """
+    Collects the BugHog variables that are logged by the browser (e.g., through console.log).
+    The log file is read incrementally: each parse only scans the bytes that were appended since the previous one.
+    An incomplete last line is scanned as well, but it is scanned again by the next parse, since it might still grow.
+    """
+
+    def __init__(self, on_match: Optional[Callable[[dict], None]] = None, log_file_path: str = LOG_FILE_PATH) -> None:
+        """
+        Initializes the collector.
 
-    def __init__(self) -> None:
+        :param on_match: If given, the log file is followed while the collector runs, and this callable is called
+            with each logged variable as soon as it appears.
+        :param log_file_path: The path of the browser log file.
+        """
         super().__init__()
         self.data['log_vars'] = []
+        self.__on_match = on_match
+        self.__log_file_path = log_file_path
+        self.__offset = 0
+        # Variables logged on complete lines, which are never scanned again.
+        self.__log_vars = []
+        self.__lock = Lock()
+        self.__stop_event = Event()
+        self.__thread = None
 
     def start(self):
-        with open('/tmp/browser.log', 'w') as file:
+        with open(self.__log_file_path, 'w') as file:
             file.write('')
+        with self.__lock:
+            self.__offset = 0
+            self.__log_vars = []
+            self.data['log_vars'] = []
+        if self.__on_match is not None:
+            self.__stop_event.clear()
+            self.__thread = Thread(target=self.__follow, daemon=True)
+            self.__thread.start()
 
     def stop(self):
-        pass
+        if self.__thread is not None:
+            self.__stop_event.set()
+            self.__thread.join()
+            self.__thread = None
+        # The browser has terminated, so the last line is complete even without a trailing newline.
+        self.__read_new_lines(is_last_line_complete=True)
 
     def parse_data(self):
-        data = []
-        regex = r'\+\+\+bughog_(.+)=(.+)\+\+\+'
-        with open('/tmp/browser.log', 'r+') as log_file:
-            log_lines = [line for line in log_file.readlines()]
-            log_file.write('')
-        regex_match_lists = [re.findall(regex, line) for line in log_lines if re.search(regex, line)]
-        # Flatten list
-        regex_matches = [regex_match for regex_match_list in regex_match_lists for regex_match in regex_match_list]
-        for match in regex_matches:
-            var = match[0]
-            val = match[1]
-            data.append({'var': var, 'val': val})
-        self.data['log_vars'] = data
+        self.__read_new_lines()
+
+    def __follow(self):
+        while not self.__stop_event.wait(FOLLOW_INTERVAL):
+            self.__read_new_lines()
+
+    def __read_new_lines(self, is_last_line_complete: bool = False) -> None:
+        """
+        Scans the lines that were appended to the log file since the previous call.
+        The variables of an incomplete last line are included in the collected data, but the line is scanned again
+        by the next call, unless it is known to be complete.
+        """
+        with self.__lock:
+            if not os.path.isfile(self.__log_file_path):
+                return
+            with open(self.__log_file_path, 'rb') as log_file:
+                log_file.seek(self.__offset)
+                new_bytes = log_file.read()
+            end = len(new_bytes) if is_last_line_complete else new_bytes.rfind(b'\n') + 1
+            self.__offset += end
+            new_vars = self.__scan(new_bytes[:end])
+            self.__log_vars.extend(new_vars)
+            self.data['log_vars'] = self.__log_vars + self.__scan(new_bytes[end:])
+        if self.__on_match is not None:
+            for new_var in new_vars:
+                self.__on_match(new_var)
+
+    @staticmethod
+    def __scan(log_bytes: bytes) -> list[dict]:
+        log_vars = []
+        if MARKER in log_bytes:
+            for line in log_bytes.splitlines():
+                if MARKER not in line:
+                    continue
+                for var, val in PATTERN.findall(line):
+                    log_vars.append({'var': var.decode('utf-8', 'replace'), 'val': val.decode('utf-8', 'replace')})
+        return log_vars
@@ -1,16 +1,30 @@
+from __future__ import annotations
+
 import http.server
 import json
 import logging
 import socket
-import socketserver
-from threading import Thread
+import time
+import uuid
+from threading import Condition, Lock, Thread
+from typing import Optional
 from urllib.parse import parse_qs, urlparse
 
+from requests import RequestException
+
+from bci import util
+
 from .base import BaseCollector
 
 logger = logging.getLogger(__name__)
 
 PORT = 5001
+# Partitions are registered with the core, which tags each report it forwards to a collector with the partition id
+# that collector registered last.
+PARTITION_REGISTRATION_URL = 'http://core:5000/api/collector/partition/'
+# Report variables that mark the end of a page visit: the outcome is known or the page signals that it is done.
+# The sanity check is not among them, since pages commonly report it before they (possibly) reproduce.
+TERMINAL_REPORT_VARIABLES = ('reproduced', 'done')
 
 
 class RequestHandler(http.server.BaseHTTPRequestHandler):
@@ -18,8 +32,9 @@ class RequestHandler(http.server.BaseHTTPRequestHandler):
     Handles requests sent to the collector.
     """
 
-    def __init__(self, collector, request, client_address, server) -> None:
-        self.collector = collector
+    server: CollectorServer
+
+    def __init__(self, request, client_address, server) -> None:
         self.request_body = None
         super().__init__(request, client_address, server)
 
@@ -32,8 +47,11 @@ class RequestHandler(http.server.BaseHTTPRequestHandler):
             return
 
         request_body = json.loads(self.request_body)
-        logger.debug(f'Received request information with {len(request_body.keys())} attributes.')
-        self.collector.data['requests'].append(request_body)
+        # Reports can be forwarded in batches.
+        reports = request_body if isinstance(request_body, list) else [request_body]
+        logger.debug(f'Received {len(reports)} report(s)')
+        for report in reports:
+            self.server.dispatch(report)
 
     def do_POST(self):
         """
@@ -56,42 +74,187 @@ class RequestHandler(http.server.BaseHTTPRequestHandler):
             logger.debug('Socket closed by NGINX (expected)')
 
 
+class Partition:
+    """
+    The requests received by the collector server on behalf of one test.
+    """
+
+    def __init__(self) -> None:
+        self.id = uuid.uuid4().hex
+        self.__requests = []
+        self.__condition = Condition()
+
+    def add(self, request: dict) -> None:
+        with self.__condition:
+            self.__requests.append(request)
+            self.__condition.notify_all()
+
+    def reset(self) -> None:
+        with self.__condition:
+            self.__requests = []
+
+    def snapshot(self) -> list[dict]:
+        with self.__condition:
+            return list(self.__requests)
+
+    def __len__(self) -> int:
+        with self.__condition:
+            return len(self.__requests)
+
+    def wait_for_terminal_report(self, since: int, timeout: float) -> bool:
+        """
+        Waits until one of the requests received after the first `since` requests reports a terminal variable.
+
+        :param since: The number of requests that were already received before the visit started.
+        :param timeout: The maximum number of seconds to wait.
+        :return: True if a terminal report was received, False if the timeout expired.
+        """
+        deadline = time.monotonic() + timeout
+        with self.__condition:
+            while True:
+                new_requests = self.__requests[since:]
+                for request in new_requests:
+                    if any(var in TERMINAL_REPORT_VARIABLES for var, _ in get_report_variables(request)):
+                        return True
+                # Only requests that arrive later have to be checked again.
+                since += len(new_requests)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.__condition.wait(remaining)
+
+
+class CollectorServer(http.server.ThreadingHTTPServer):
+    """
+    Long-lived server that receives the requests of all tests performed by this process.
+    Each received request is tagged with the id of the partition it belongs to, and stored in that partition. Requests
+    of unknown or closed partitions (e.g., late reports of a previous test) are dropped, unless a fallback partition is
+    set. The fallback partition receives these requests instead, for collectors that could not register their partition.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    __instance: Optional[CollectorServer] = None
+    __instance_lock = Lock()
+
+    def __init__(self, port: int = PORT) -> None:
+        super().__init__(('', port), RequestHandler)
+        self.__partitions: dict[str, Partition] = {}
+        self.__fallback_partition: Optional[Partition] = None
+        self.__partitions_lock = Lock()
+
+    @staticmethod
+    def get_instance() -> CollectorServer:
+        """
+        Returns the collector server of this process, which is started on first use.
+        """
+        with CollectorServer.__instance_lock:
+            if CollectorServer.__instance is None:
+                logger.debug('Starting collector server...')
+                server = CollectorServer()
+                Thread(target=server.serve_forever, daemon=True).start()
+                CollectorServer.__instance = server
+            return CollectorServer.__instance
+
+    def open_partition(self) -> Partition:
+        partition = Partition()
+        with self.__partitions_lock:
+            self.__partitions[partition.id] = partition
+        return partition
+
+    def close_partition(self, partition: Partition) -> None:
+        with self.__partitions_lock:
+            self.__partitions.pop(partition.id, None)
+            if self.__fallback_partition is partition:
+                self.__fallback_partition = None
+
+    def set_fallback_partition(self, partition: Partition) -> None:
+        """
+        Stores requests of unknown or closed partitions in the given partition until it is closed.
+        """
+        with self.__partitions_lock:
+            self.__fallback_partition = partition
+
+    def dispatch(self, request: dict) -> None:
+        partition_id = request.pop('partition_id', None)
+        with self.__partitions_lock:
+            partition = self.__partitions.get(partition_id, self.__fallback_partition)
+        if partition is None:
+            logger.debug(f"Dropped request of unknown or closed partition '{partition_id}'")
+            return
+        partition.add(request)
+
+
 class RequestCollector(BaseCollector):
     def __init__(self):
         super().__init__()
-        self.__httpd = None
-        self.__thread = None
+        self.__partition: Optional[Partition] = None
         self.data['requests'] = []
         self.data['req_vars'] = []
 
     def start(self):
-        logger.debug('Starting collector...')
-        socketserver.TCPServer.allow_reuse_address = True
-        self.__httpd = socketserver.TCPServer(('', PORT), lambda *args, **kwargs: RequestHandler(self, *args, **kwargs))
-        # self.__httpd.allow_reuse_address = True
-        self.__thread = Thread(target=self.__httpd.serve_forever)
-        self.__thread.start()
+        server = CollectorServer.get_instance()
+        self.__partition = server.open_partition()
+        # A restarted collector keeps the requests it received earlier.
+        for request in self.data['requests']:
+            self.__partition.add(request)
+        if not register_partition(self.__partition.id):
+            logger.warning('Continuing without partitioning, reports of earlier tests might be collected as well')
+            server.set_fallback_partition(self.__partition)
 
     def stop(self):
-        if self.__httpd:
-            self.__httpd.shutdown()
-            if self.__thread:
-                self.__thread.join()
-            self.__httpd.server_close()
+        if self.__partition is None:
+            return
+        self.data['requests'] = self.__partition.snapshot()
+        CollectorServer.get_instance().close_partition(self.__partition)
+        self.__partition = None
+
+    def get_nb_of_requests(self) -> int:
+        if self.__partition is None:
+            return len(self.data['requests'])
+        return len(self.__partition)
+
+    def wait_for_terminal_report(self, since: int, timeout: float) -> bool:
+        if self.__partition is None:
+            time.sleep(timeout)
+            return False
+        return self.__partition.wait_for_terminal_report(since, timeout)
 
     def parse_data(self):
-        # Important: we only consider requests to the /report/ endpoint where the bughog parameter immediately follows.
-        # Otherwise conditional endpoints (e.g., /report/if/Referer/) cause false positives.
+        if self.__partition is not None:
+            self.data['requests'] = self.__partition.snapshot()
         request_variables = set()
-        parsed_queries = [
-            parse_qs(urlparse(request['url']).query)
-            for request in self.data['requests']
-            if urlparse(request['url']).path in ['/report', '/report/']
-        ]
-        for parsed_query in parsed_queries:
-            request_variables.update(
-                (key[7:], values[0])
-                for key, values in parsed_query.items()
-                if key.startswith('bughog_')
-            )
+        for request in self.data['requests']:
+            request_variables.update(get_report_variables(request))
         self.data['req_vars'] = [{'var': pair[0], 'val': pair[1]} for pair in request_variables]
+
+
+def register_partition(partition_id: str) -> bool:
+    """
+    Registers the given partition with the core, so that all reports of requests made from this host from now on are
+    forwarded with the id of this partition.
+    The IP address of this host is sent along, since the core might only see the address of a proxy.
+
+    :return: True if the partition was registered, False otherwise.
+    """
+    try:
+        data = {'partition_id': partition_id, 'collector_ip': socket.gethostbyname(socket.gethostname())}
+        response = util.get_session().post(PARTITION_REGISTRATION_URL, json=data, timeout=10)
+        response.raise_for_status()
+    except (RequestException, OSError):
+        logger.error(f"Could not register partition '{partition_id}' with the core", exc_info=True)
+        return False
+    return True
+
+
+def get_report_variables(request: dict) -> list[tuple[str, str]]:
+    """
+    Returns the BugHog variables reported by the given request.
+    """
+    # Important: we only consider requests to the /report/ endpoint where the bughog parameter immediately follows.
+    # Otherwise conditional endpoints (e.g., /report/if/Referer/) cause false positives.
+    parsed_url = urlparse(request['url'])
+    if parsed_url.path not in ['/report', '/report/']:
+        return []
+    return [(key[7:], values[0]) for key, values in parse_qs(parsed_url.query).items() if key.startswith('bughog_')]
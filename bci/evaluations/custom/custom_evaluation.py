@@ -1,6 +1,6 @@
 import logging
 import os
-from typing import Optional
+from typing import Callable, Optional
 
 from bci.browser.configuration.browser import Browser
 from bci.browser.interaction.interaction import Interaction
@@ -139,8 +139,11 @@ class CustomEvaluationFramework(EvaluationFramework):
                     interaction.execute()
                 else:
                     url_queue = experiment['url_queue']
-                    for url in url_queue:
-                        browser.visit(url)
+                    if params.evaluation_configuration.early_completion:
+                        # Visits end as soon as the page reports its outcome or signals that it is done.
+                        browser.visit_all(url_queue, lambda: self.__create_wait_for_terminal_report(collector))
+                    else:
+                        browser.visit_all(url_queue)
                 browser.post_try_cleanup()
                 intermediary_state_result = state_result_factory.get_result(collector.collect_results())
                 sanity_check_was_successful |= not intermediary_state_result.is_dirty
@@ -159,6 +162,14 @@ class CustomEvaluationFramework(EvaluationFramework):
             results = collector.collect_results()
         return params.create_test_result_with(browser_version, binary_origin, results, is_dirty)
 
+    @staticmethod
+    def __create_wait_for_terminal_report(collector: Collector) -> Callable[[float], bool]:
+        """
+        Returns a callable that waits for a terminal report that was received after this call.
+        """
+        since = collector.get_nb_of_requests()
+        return lambda timeout: collector.wait_for_terminal_report(since, timeout)
+
     def get_mech_groups(self, project: str) -> list[tuple[str, bool]]:
         if project not in self.tests_per_project:
             return []
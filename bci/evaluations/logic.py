@@ -76,13 +76,21 @@ class EvaluationConfiguration:
     project: str
     automation: str
     seconds_per_visit: int = 5
+    early_completion: bool = False
+    persistent_session: bool = False
 
     def to_dict(self) -> dict:
         return asdict(self)
 
     @staticmethod
     def from_dict(data: dict) -> EvaluationConfiguration:
-        return EvaluationConfiguration(data['project'], data['automation'], data['seconds_per_visit'])
+        return EvaluationConfiguration(
+            data['project'],
+            data['automation'],
+            data['seconds_per_visit'],
+            data.get('early_completion', False),
+            data.get('persistent_session', False),
+        )
 
 
 @dataclass(frozen=True)
@@ -106,6 +114,7 @@ class SequenceConfiguration:
     nb_of_containers: int = 8
     sequence_limit: int = 10000
     search_strategy: str | None = None
+    speculative: bool = False
 
 
 @dataclass(frozen=True)
@@ -115,13 +124,25 @@ class DatabaseParameters:
     password: str
     database_name: str
     binary_cache_limit: int
+    binary_cache_threads: int = 8
+    binary_cache_format: str = 'files'
+    binary_cache_size_limit: int = 0
 
     def to_dict(self) -> dict:
         return asdict(self)
 
     @staticmethod
     def from_dict(data: dict) -> DatabaseParameters:
-        return DatabaseParameters(data['host'], data['username'], data['password'], data['database_name'], data['binary_cache_limit'])
+        return DatabaseParameters(
+            data['host'],
+            data['username'],
+            data['password'],
+            data['database_name'],
+            data['binary_cache_limit'],
+            data.get('binary_cache_threads', 8),
+            data.get('binary_cache_format', 'files'),
+            data.get('binary_cache_size_limit', 0),
+        )
 
     def __str__(self) -> str:
         return f'{self.username}@{self.host}:27017/{self.database_name}'
@@ -272,12 +293,17 @@ def evaluation_factory(kwargs: ImmutableMultiDict) -> list[EvaluationParameters]
 
     browser_configuration = BrowserConfiguration.from_dict(kwargs)
     evaluation_configuration = EvaluationConfiguration(
-        kwargs['project'], kwargs['automation'], int(kwargs.get('seconds_per_visit', 5))
+        kwargs['project'],
+        kwargs['automation'],
+        int(kwargs.get('seconds_per_visit', 5)),
+        bool(kwargs.get('early_completion', False)),
+        bool(kwargs.get('persistent_session', False)),
     )
     sequence_configuration = SequenceConfiguration(
         int(kwargs.get('nb_of_containers')),
         int(kwargs.get('sequence_limit')),
         kwargs.get('search_strategy'),
+        bool(kwargs.get('speculative', False)),
     )
     evaluation_params_list = []
     for mech_group in mech_groups:
@@ -3,6 +3,7 @@ import time
 
 import bci.database.mongo.container as mongodb_container
 from bci.configuration import Global, Loggers
+from bci.database.mongo.binary_cache import BinaryCache
 from bci.database.mongo.mongodb import MongoDB, ServerException
 from bci.database.mongo.revision_cache import RevisionCache
 from bci.distribution.worker_manager import WorkerManager
@@ -47,12 +48,17 @@ class Main:
     def connect_to_database(self, db_connection_params: DatabaseParameters) -> None:
         try:
             MongoDB().connect(db_connection_params)
+            # Result collections created by earlier versions lack indexes.
+            MongoDB().create_all_data_collection_indexes()
+            BinaryCache.create_missing_entries()
         except ServerException:
             logger.error('Could not connect to database.', exc_info=True)
 
     def run(self, eval_params_list: list[EvaluationParameters]) -> None:
         # Sequence_configuration settings are the same over evaluation parameters (quick fix)
-        worker_manager = WorkerManager(eval_params_list[0].sequence_configuration.nb_of_containers)
+        worker_manager = WorkerManager(
+            eval_params_list[0].sequence_configuration.nb_of_containers, Global.use_worker_pool()
+        )
         self.stop_gracefully = False
         self.stop_forcefully = False
         try:
@@ -81,6 +87,7 @@ class Main:
             # MongoDB.disconnect()
             logger.info('Waiting for remaining experiments to stop...')
             worker_manager.wait_until_all_evaluations_are_done()
+            worker_manager.shutdown()
             logger.info('BugHog has finished the evaluation!')
             self.__update_state(is_running=False, status='idle', queue=self.eval_queue)
 
@@ -99,13 +106,19 @@ class Main:
             try:
                 while (self.stop_gracefully or self.stop_forcefully) is False:
                     # Update search strategy with new potentially new results
-                    current_state = search_strategy.next()
-
-                    # Prepare worker parameters
-                    worker_params = eval_params.create_worker_params_for(current_state, self.db_connection_params)
-
-                    # Start worker to perform evaluation
-                    worker_manager.start_test(worker_params)
+                    if eval_params.sequence_configuration.speculative:
+                        # Only decide on the next states once containers are free, so the latest results are used.
+                        nb_of_free_slots = worker_manager.wait_for_free_slots()
+                        current_states = search_strategy.next_batch(nb_of_free_slots)
+                    else:
+                        current_states = [search_strategy.next()]
+
+                    for current_state in current_states:
+                        # Prepare worker parameters
+                        worker_params = eval_params.create_worker_params_for(current_state, self.db_connection_params)
+
+                        # Start worker to perform evaluation
+                        worker_manager.start_test(worker_params)
 
             except SequenceFinished:
                 iteration_time = round(time.time() - start_time)
@@ -37,10 +37,10 @@ class BiggestGapBisectionSearch(BiggestGapBisectionSequence):
         if self._limit and self._limit <= len(self._completed_states):
             raise SequenceFinished()
 
-        if self._lower_state not in self._completed_states:
+        if not self._is_completed(self._lower_state):
             self._add_state(self._lower_state)
             return self._lower_state
-        if self._upper_state not in self._completed_states:
+        if not self._is_completed(self._upper_state):
             self._add_state(self._upper_state)
             return self._upper_state
 
@@ -54,11 +54,88 @@ class BiggestGapBisectionSearch(BiggestGapBisectionSequence):
                 return splitter_state
         raise SequenceFinished()
 
+    def next_batch(self, k: int) -> list[State]:
+        """
+        Returns up to k states to evaluate in parallel, without waiting for the results of each other.
+        Instead of only halving the biggest gap, the k splitters are spread over the undecided gaps such that the
+        biggest remaining subgap is as small as possible. A gap that receives m splitters is split at its
+        (m+1)-quantiles, so that every round of parallel evaluations shrinks all gaps by a factor of m+1.
+
+        :param k: The maximum number of states to return.
+        :raises SequenceFinished: If there are no more states to evaluate.
+        """
+        self._fetch_evaluated_states()
+
+        if self._limit and self._limit <= len(self._completed_states):
+            raise SequenceFinished()
+
+        states = []
+        for boundary_state in (self._lower_state, self._upper_state):
+            if not self._is_completed(boundary_state) and len(states) < k:
+                self._add_state(boundary_state)
+                states.append(boundary_state)
+        # The gap between both boundaries can only be assessed once their results are known.
+        if states:
+            return states
+
+        while len(states) < k and (pairs := self.__get_pairs_to_split()):
+            allocation = self.__allocate_splitters(pairs, k - len(states))
+            # Only adjacent pairs are left, which cannot be split any further.
+            if sum(allocation) == 0:
+                break
+            for pair, nb_of_splitters in zip(pairs, allocation):
+                if nb_of_splitters == 0:
+                    continue
+                splitter_states = self._find_splitter_states(pair[0], pair[1], nb_of_splitters)
+                if not splitter_states:
+                    self._unavailability_gap_pairs.add(pair)
+                    continue
+                logger.debug(
+                    f'Splitting [{pair[0].index}]--/{"/".join(str(state.index) for state in splitter_states)}/--'
+                    f'[{pair[1].index}]'
+                )
+                for splitter_state in splitter_states:
+                    self._add_state(splitter_state)
+                states.extend(splitter_states)
+
+        if not states:
+            raise SequenceFinished()
+        return states
+
+    @staticmethod
+    def __allocate_splitters(pairs: list[tuple[State, State]], k: int) -> list[int]:
+        """
+        Greedily allocates k splitters over the given pairs, each time to the pair of which the subgaps would be the
+        biggest. This minimizes the number of parallel rounds needed to pinpoint all pairs.
+
+        :param pairs: The pairs of states to split.
+        :param k: The number of splitters to allocate.
+        :return: The number of splitters for each pair.
+        """
+        allocation = [0] * len(pairs)
+        for _ in range(k):
+            candidates = [
+                i for i, (first, last) in enumerate(pairs) if allocation[i] < last.index - first.index - 1
+            ]
+            if not candidates:
+                break
+            best = max(candidates, key=lambda i: (pairs[i][1].index - pairs[i][0].index) / (allocation[i] + 1))
+            allocation[best] += 1
+        return allocation
+
     def __get_next_pair_to_split(self) -> Optional[tuple[State, State]]:
         """
         Returns the next pair of states to split.
         """
-        states = self._completed_states
+        pairs = self.__get_pairs_to_split()
+        return pairs[0] if pairs else None
+
+    def __get_pairs_to_split(self) -> list[tuple[State, State]]:
+        """
+        Returns all pairs of states that still have to be split, biggest gaps first.
+        """
+        # Work on a copy, since the evaluated states themselves should remain untouched.
+        states = list(self._completed_states)
         # Remove all states that are confined by states with the same result, ignoring resultless and dirty states.
         states_to_remove = []
         for i, state in enumerate(states):
@@ -82,7 +159,7 @@ class BiggestGapBisectionSearch(BiggestGapBisectionSequence):
         # Make pairwise list of states and remove pairs with the same outcome
         pairs = [(state1, state2) for state1, state2 in zip(states, states[1:]) if not state1.has_same_outcome(state2)]
         if not pairs:
-            return None
+            return []
         # Remove the first and last pair if they have a first and last state without a result, respectively
         if pairs[0][0].result is None:
             pairs = pairs[1:]
@@ -91,14 +168,12 @@ class BiggestGapBisectionSearch(BiggestGapBisectionSequence):
         # Remove all pairs that have already been identified as unavailability gaps
         pairs = [pair for pair in pairs if pair not in self._unavailability_gap_pairs]
 
-        if not pairs:
-            return None
         # Sort pairs to prioritize pairs with bigger gaps.
         # This way, we refrain from pinpointing pair-by-pair, making the search more efficient.
         # E.g., when the splitter of the first gap is being evaluated, we can already evaluate the
         # splitter of the second gap with having to wait for the first gap to be fully evaluated.
         pairs.sort(key=lambda pair: pair[1].index - pair[0].index, reverse=True)
-        return pairs[0]
+        return pairs
 
     @staticmethod
     def create_from_bgb_sequence(bgb_sequence: BiggestGapBisectionSequence) -> BiggestGapBisectionSearch:
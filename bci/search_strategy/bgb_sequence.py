@@ -36,10 +36,10 @@ class BiggestGapBisectionSequence(SequenceStrategy):
         if self._limit and self._limit <= len(self._completed_states):
             raise SequenceFinished()
 
-        if self._lower_state not in self._completed_states:
+        if not self._is_completed(self._lower_state):
             self._add_state(self._lower_state)
             return self._lower_state
-        if self._upper_state not in self._completed_states:
+        if not self._is_completed(self._upper_state):
             self._add_state(self._upper_state)
             return self._upper_state
 
@@ -70,6 +70,28 @@ class BiggestGapBisectionSequence(SequenceStrategy):
         target_state = self._state_factory.create_state(best_splitter_index)
         return self._find_closest_state_with_available_binary(target_state, (first_state, last_state))
 
+    def _find_splitter_states(self, first_state: State, last_state: State, nb_of_splitters: int) -> list[State]:
+        """
+        Returns up to the given number of states with an available binary that split the gap between the two states
+        into (nearly) equally sized parts. The returned states are ordered and strictly within the gap.
+        """
+        splitter_states = []
+        lower_state = first_state
+        gap = last_state.index - first_state.index
+        for i in range(1, nb_of_splitters + 1):
+            target_index = max(first_state.index + round(i * gap / (nb_of_splitters + 1)), lower_state.index + 1)
+            if target_index >= last_state.index:
+                break
+            target_state = self._state_factory.create_state(target_index)
+            splitter_state = self._find_closest_state_with_available_binary(target_state, (lower_state, last_state))
+            if splitter_state is None:
+                continue
+            if splitter_state.index <= lower_state.index or splitter_state in splitter_states:
+                continue
+            splitter_states.append(splitter_state)
+            lower_state = splitter_state
+        return splitter_states
+
     def _state_is_in_unavailability_gap(self, state: State) -> bool:
         """
         Returns True if the state is in a gap between two states without any available binaries.
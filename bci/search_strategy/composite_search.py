@@ -25,3 +25,18 @@ class CompositeSearch():
                 return self.search_strategy.next()
         else:
             return self.search_strategy.next()
+
+    def next_batch(self, k: int) -> list[State]:
+        """
+        Returns up to k states to evaluate in parallel, following the same two stages as `next`.
+
+        :param k: The maximum number of states to return.
+        """
+        if self.search_strategy is None:
+            try:
+                return self.sequence_strategy.next_batch(k)
+            except SequenceFinished:
+                self.search_strategy = BiggestGapBisectionSearch.create_from_bgb_sequence(self.sequence_strategy)
+                return self.search_strategy.next_batch(k)
+        else:
+            return self.search_strategy.next_batch(k)
@@ -1,6 +1,8 @@
+import bisect
 import logging
 from abc import abstractmethod
 from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 from bci.version_control.state_factory import StateFactory
@@ -8,6 +10,13 @@ from bci.version_control.states.state import State
 
 logger = logging.getLogger(__name__)
 
+# Results are timestamped with second precision by the workers, and might only become visible after the fetch that
+# started at that same time. Fetching with some overlap makes sure these results are not missed.
+FETCH_OVERLAP = timedelta(seconds=10)
+
+# Number of states of which the binary availability is probed concurrently.
+PROBE_BATCH_SIZE = 6
+
 
 class SequenceStrategy:
     def __init__(self, state_factory: StateFactory, limit: int, completed_states: Optional[list[State]]=None) -> None:
@@ -21,33 +30,66 @@ class SequenceStrategy:
         self._state_factory = state_factory
         self._limit = limit
         self._lower_state, self._upper_state = self.__create_available_boundary_states()
-        self._completed_states = completed_states if completed_states else []
+        self._completed_states = sorted(completed_states, key=lambda x: x.index) if completed_states else []
+        self._completed_states_by_index = {state.index: state for state in self._completed_states}
+        self._last_fetch_ts: Optional[str] = None
 
     @abstractmethod
     def next(self) -> State:
         pass
 
+    def next_batch(self, k: int) -> list[State]:
+        """
+        Returns up to k states that can be evaluated in parallel.
+        By default, this is equivalent to calling `next` k times.
+
+        :param k: The maximum number of states to return.
+        :raises SequenceFinished: If there are no more states to evaluate.
+        """
+        states = []
+        try:
+            while len(states) < k:
+                states.append(self.next())
+        except SequenceFinished:
+            if not states:
+                raise
+        return states
+
     def is_available(self, state: State) -> bool:
         return state.has_available_binary()
 
+    def _is_completed(self, elem: State) -> bool:
+        """
+        Returns whether the given element is a member of the list of evaluated states.
+        """
+        return elem.index in self._completed_states_by_index
+
     def _add_state(self, elem: State) -> None:
         """
-        Adds an element to the list of evaluated states if not already a member, and sorts the list.
+        Adds an element to the sorted list of evaluated states if not already a member.
         """
-        if elem not in self._completed_states:
-            self._completed_states.append(elem)
-            self._completed_states.sort(key=lambda x: x.index)
+        if not self._is_completed(elem):
+            self.__insert_state(elem)
 
     def _fetch_evaluated_states(self) -> None:
         """
-        Fetches all evaluated states from the database and stores them in the list of evaluated states.
+        Fetches the states that were evaluated since the previous fetch from the database, and merges them in the list
+        of evaluated states. Fetched states replace members with the same index, since they hold the latest result.
         """
-        fetched_states = self._state_factory.create_evaluated_states()
-        for state in self._completed_states:
-            if state not in fetched_states:
-                fetched_states.append(state)
-        fetched_states.sort(key=lambda x: x.index)
-        self._completed_states = fetched_states
+        fetch_started = datetime.now(timezone.utc)
+        fetched_states = self._state_factory.create_evaluated_states(since=self._last_fetch_ts)
+        self._last_fetch_ts = str((fetch_started - FETCH_OVERLAP).replace(microsecond=0))
+        for state in fetched_states:
+            if self._is_completed(state):
+                position = bisect.bisect_left(self._completed_states, state.index, key=lambda x: x.index)
+                self._completed_states[position] = state
+                self._completed_states_by_index[state.index] = state
+            else:
+                self.__insert_state(state)
+
+    def __insert_state(self, elem: State) -> None:
+        bisect.insort(self._completed_states, elem, key=lambda x: x.index)
+        self._completed_states_by_index[elem.index] = elem
 
     def __create_available_boundary_states(self) -> tuple[State, State]:
         first_state, last_state = self._state_factory.boundary_states
@@ -62,66 +104,33 @@ class SequenceStrategy:
     def _find_closest_state_with_available_binary(self, target: State, boundaries: tuple[State, State]) -> State | None:
         """
         Finds the closest state with an available binary **strictly** within the given boundaries.
+        The prefetched binary availability index is consulted first. States of which the availability is unknown, but
+        which would be closer than the closest known available state, are probed in concurrent batches.
         """
-        if target.has_available_binary():
-            return target
-
-        try:
-            if state := self.__get_closest_available_state(target, boundaries):
-                return state
-            else:
-                return None
-        except FunctionalityNotAvailable:
-            pass
-
-        def index_has_available_binary(index: int) -> Optional[State]:
-            state = self._state_factory.create_state(index)
-            if state.has_available_binary():
-                return state
-            else:
-                return None
-
-        diff = 1
+        availability_index = self._state_factory.binary_availability_index
         first_state, last_state = boundaries
-        best_splitter_index = target.index
-        while (best_splitter_index - diff) > first_state.index or (best_splitter_index + diff) < last_state.index:
-            with ThreadPoolExecutor(max_workers=6) as executor:
-                futures = []
-                for offset in (-diff, diff, - 1 - diff, 1 + diff, - 2 - diff, 2 + diff):
-                    target_index = best_splitter_index + offset
-                    if first_state.index < target_index < last_state.index:
-                        futures.append(executor.submit(index_has_available_binary, target_index))
-
-                for future in futures:
-                    state = future.result()
-                    if state:
-                        return state
-
-            diff += 2
-        return None
-
-
-    def __get_closest_available_state(self, target: State, boundaries: tuple[State, State]) -> State | None:
-        """
-        Return the closest state with an available binary.
-        """
-        try:
-            states = target.get_previous_and_next_state_with_binary()
-            states = [state for state in states if state is not None]
-            ordered_states = sorted(states, key=lambda x: abs(target.revision_nb - x.revision_nb))
+        probed_states = {target.index: target}
 
-            for state in ordered_states:
-                if boundaries[0].revision_nb < state.revision_nb < boundaries[1].revision_nb:
-                    return state
+        def probe(index: int) -> tuple[State, bool]:
+            state = probed_states.get(index) or self._state_factory.create_state(index)
+            return state, state.has_available_binary()
 
+        while True:
+            closest_index = availability_index.get_closest_available(target.index, first_state.index, last_state.index)
+            unknown_indexes = availability_index.get_unknown_closer_than(
+                target.index, first_state.index, last_state.index, closest_index, PROBE_BATCH_SIZE
+            )
+            if not unknown_indexes:
+                break
+            with ThreadPoolExecutor(max_workers=PROBE_BATCH_SIZE) as executor:
+                for state, is_available in executor.map(probe, unknown_indexes):
+                    probed_states[state.index] = state
+                    availability_index.mark(state.index, is_available)
+
+        if closest_index is None:
             return None
-
-        except NotImplementedError as e:
-            raise FunctionalityNotAvailable() from e
+        return probed_states.get(closest_index) or self._state_factory.create_state(closest_index)
 
 
 class SequenceFinished(Exception):
     pass
-
-class FunctionalityNotAvailable(Exception):
-    pass
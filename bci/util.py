@@ -3,21 +3,34 @@ Functions from the os and shutil libraries show erroneous behavior when attempti
 to another. These methods should be safe.
 """
 
+import base64
+import hashlib
 import json
 import logging
 import os
 import shutil
 import tarfile
+import threading
 import time
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 from urllib.parse import urlparse
 
+import urllib3
 from requests import RequestException, Session
 from requests.adapters import HTTPAdapter, Retry
 
+from bci.configuration import Global
+
 logger = logging.getLogger(__name__)
 
+CHUNK_SIZE = 1024 * 1024
+# Resources are only downloaded in parallel segments if each segment is at least this large.
+MIN_DOWNLOAD_SEGMENT_SIZE = 16 * 1024 * 1024
+MAX_DOWNLOAD_SEGMENTS = 4
+MAX_DOWNLOAD_RETRIES = 5
+
 
 def safe_move_file(src_path, dst_path):
     if not os.path.isfile(src_path):
@@ -49,6 +62,45 @@ def copy_folder(src_path, dst_path):
     shutil.copytree(src_path, dst_path, dirs_exist_ok=True)
 
 
+def link_folder(src_path: str, dst_path: str) -> bool:
+    """
+    Recreates the folder at src_path at dst_path, with hard links to the original files instead of copies.
+    This takes a fraction of the time of copying a folder, but files are shared: writing to an existing file in one
+    folder changes it in the other. Creating, replacing or removing files does not affect the other folder.
+    If files cannot be linked (e.g., because both paths are on different file systems), they are copied instead.
+
+    :param src_path: path to the folder that is to be linked
+    :param dst_path: path to the new folder
+    :return: True if all files were linked, False if (some) files had to be copied.
+    """
+    all_linked = True
+    for root, dir_names, file_names in os.walk(src_path):
+        dst_root = os.path.join(dst_path, os.path.relpath(root, src_path))
+        os.makedirs(dst_root, exist_ok=True)
+        shutil.copystat(root, dst_root)
+        for dir_name in dir_names:
+            # Symbolic links to folders are not followed by os.walk, so they are recreated as is.
+            if os.path.islink(os.path.join(root, dir_name)):
+                os.symlink(os.readlink(os.path.join(root, dir_name)), os.path.join(dst_root, dir_name))
+        for file_name in file_names:
+            src_file_path = os.path.join(root, file_name)
+            dst_file_path = os.path.join(dst_root, file_name)
+            if os.path.lexists(dst_file_path):
+                os.remove(dst_file_path)
+            if os.path.islink(src_file_path):
+                os.symlink(os.readlink(src_file_path), dst_file_path)
+                continue
+            if all_linked:
+                try:
+                    os.link(src_file_path, dst_file_path)
+                    continue
+                except OSError:
+                    logger.debug(f"Could not link files of '{src_path}', falling back to copying")
+                    all_linked = False
+            shutil.copy2(src_file_path, dst_file_path)
+    return all_linked
+
+
 def remove_all_in_folder(folder_path: str, except_files: Optional[list[str]] = None) -> None:
     except_files = [] if except_files is None else except_files
     for root, dirs, files in os.walk(folder_path):
@@ -89,7 +141,7 @@ def read_web_report(file_name):
 
 
 def request_html(url: str):
-    session = __get_session()
+    session = get_session()
     logger.debug(f'Requesting {url}')
     try:
         with session.get(url, timeout=60, stream=True) as resp:
@@ -101,7 +153,7 @@ def request_html(url: str):
 
 
 def request_json(url: str):
-    session = __get_session()
+    session = get_session()
     logger.debug(f'Requesting {url}')
     try:
         with session.get(url, timeout=60, stream=True) as resp:
@@ -113,97 +165,419 @@ def request_json(url: str):
 
 
 def request_final_url(url: str) -> str:
-    session = __get_session()
+    session = get_session()
     logger.debug(f'Requesting {url}')
     try:
-        resp = session.get(url, timeout=60, stream=True)
-        if resp.status_code >= 400:
-            raise ResourceNotFound(url)
-        return resp.url
+        with session.get(url, timeout=60, stream=True) as resp:
+            if resp.status_code >= 400:
+                raise ResourceNotFound(url)
+            return resp.url
     except RequestException as e:
         raise ResourceNotFound from e
 
 
-def __get_session(max_retries: int = 3, backoff_factor: float = 2.0) -> Session:
+class PooledHTTPAdapter(HTTPAdapter):
+    """
+    HTTP adapter that keeps a pool of keep-alive connections per host, and counts the requests it sends and the
+    connections it opens.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        # The pool manager is initialized by the constructor of the super class.
+        self.__stats_lock = threading.Lock()
+        self.__nb_of_requests = 0
+        self.__nb_of_pool_requests_of_disposed_pools = 0
+        self.__nb_of_connections_of_disposed_pools = 0
+        super().__init__(*args, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        pools = self.poolmanager.pools
+        dispose = pools.dispose_func
+
+        # Pools of the least recently used hosts are disposed when there are too many, their stats are kept.
+        def dispose_and_count(pool) -> None:
+            with self.__stats_lock:
+                self.__nb_of_pool_requests_of_disposed_pools += pool.num_requests
+                self.__nb_of_connections_of_disposed_pools += pool.num_connections
+            if dispose is not None:
+                dispose(pool)
+
+        pools.dispose_func = dispose_and_count
+
+    def send(self, request, **kwargs):
+        with self.__stats_lock:
+            self.__nb_of_requests += 1
+        return super().send(request, **kwargs)
+
+    def get_stats(self) -> dict:
+        """
+        Returns the number of sent requests, opened connections and requests that reused an open connection.
+        Retries are counted as separate requests on the connection level.
+        """
+        with self.__stats_lock:
+            nb_of_pool_requests = self.__nb_of_pool_requests_of_disposed_pools
+            nb_of_connections = self.__nb_of_connections_of_disposed_pools
+            for key in self.poolmanager.pools.keys():
+                if (pool := self.poolmanager.pools.get(key)) is not None:
+                    nb_of_pool_requests += pool.num_requests
+                    nb_of_connections += pool.num_connections
+            return {
+                'requests': self.__nb_of_requests,
+                'connections': nb_of_connections,
+                'reused_connections': max(nb_of_pool_requests - nb_of_connections, 0),
+            }
+
+
+# Adapters (and thus connection pools) are shared by all threads, sessions are not since they are not thread-safe.
+__adapters: dict[int, PooledHTTPAdapter] = {}
+__adapters_lock = threading.Lock()
+__sessions = threading.local()
+
+
+def get_session(max_retries: Optional[int] = None) -> Session:
+    """
+    Returns the HTTP session of the calling thread, which should be used for all outbound requests.
+    The sessions of all threads share a pool of keep-alive connections per host.
+
+    :param max_retries: The number of times failed GET and HEAD requests are retried with exponential backoff.
+        Defaults to the configured number of retries.
+    """
+    if max_retries is None:
+        max_retries = Global.get_http_max_retries()
+    if not hasattr(__sessions, 'by_max_retries'):
+        __sessions.by_max_retries = {}
+    sessions = __sessions.by_max_retries
+    if (session := sessions.get(max_retries)) is not None:
+        return session
     session = Session()
-    retries = Retry(
-        total=max_retries,
-        backoff_factor=backoff_factor,
-        status_forcelist=tuple(range(500,600)),
-        allowed_methods={'GET'},
-    )
-    adapter = HTTPAdapter(max_retries=retries)
+    adapter = __get_adapter(max_retries)
     session.mount('http://', adapter)
     session.mount('https://', adapter)
+    sessions[max_retries] = session
     return session
 
 
+def __get_adapter(max_retries: int) -> PooledHTTPAdapter:
+    with __adapters_lock:
+        if (adapter := __adapters.get(max_retries)) is None:
+            retries = Retry(
+                total=max_retries,
+                backoff_factor=2.0,
+                status_forcelist=tuple(range(500, 600)),
+                allowed_methods={'GET', 'HEAD'},
+            )
+            pool_size = Global.get_http_pool_size()
+            adapter = PooledHTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retries)
+            __adapters[max_retries] = adapter
+        return adapter
+
+
+def get_http_stats() -> dict:
+    """
+    Returns the number of outbound requests, opened connections and reused connections of this process.
+    """
+    with __adapters_lock:
+        adapters = list(__adapters.values())
+    stats = {'requests': 0, 'connections': 0, 'reused_connections': 0}
+    for adapter in adapters:
+        for key, value in adapter.get_stats().items():
+            stats[key] += value
+    return stats
+
+
+class ResumableReader:
+    """
+    File-like object that streams the resource at the given URL.
+    If the connection breaks and the server supports range requests, the download is resumed where it stopped.
+    The MD5 checksum is computed while reading, so it can be verified afterwards.
+    """
+
+    def __init__(self, session: Session, url: str, max_retries: int = MAX_DOWNLOAD_RETRIES) -> None:
+        self.__session = session
+        self.__url = url
+        self.__max_retries = max_retries
+        self.__md5 = hashlib.md5()
+        self.nb_of_bytes = 0
+        self.__resp = session.get(url, stream=True, timeout=60)
+        if self.__resp.status_code >= 400:
+            self.__resp.close()
+            raise ResourceNotFound(url)
+        self.__size = int(self.__resp.headers.get('Content-Length', 0)) or None
+        self.__supports_ranges = self.__resp.headers.get('Accept-Ranges') == 'bytes'
+        self.__expected_md5 = get_expected_md5(self.__resp.headers)
+
+    def read(self, size: int = -1) -> bytes:
+        tries = 0
+        while True:
+            try:
+                data = self.__resp.raw.read(size)
+                if data or self.__size is None or self.nb_of_bytes >= self.__size:
+                    break
+                raise EOFError(f'Connection closed after {self.nb_of_bytes} of {self.__size} bytes')
+            except (RequestException, urllib3.exceptions.HTTPError, OSError, EOFError) as e:
+                tries += 1
+                if not self.__supports_ranges or tries > self.__max_retries:
+                    raise
+                logger.debug(f'Download interrupted ({e}), resuming at byte {self.nb_of_bytes}')
+                time.sleep(min(2**tries, 30) / 10)
+                self.__resume()
+        self.nb_of_bytes += len(data)
+        self.__md5.update(data)
+        return data
+
+    def __resume(self) -> None:
+        self.__resp.close()
+        try:
+            self.__resp = self.__session.get(
+                self.__url, headers={'Range': f'bytes={self.nb_of_bytes}-'}, stream=True, timeout=60
+            )
+        except RequestException as e:
+            raise EOFError('Could not resume download') from e
+        if self.__resp.status_code != 206:
+            raise EOFError(f'Could not resume download (status {self.__resp.status_code})')
+
+    def verify(self) -> None:
+        """
+        Reads the remainder of the resource, and verifies its size and (if provided by the server) MD5 checksum.
+
+        :raises ValueError: If the downloaded resource is not complete or corrupted.
+        """
+        while self.read(CHUNK_SIZE):
+            pass
+        verify_download(self.nb_of_bytes, self.__md5.digest(), self.__size, self.__expected_md5)
+
+    def close(self) -> None:
+        self.__resp.close()
+
+
+def get_expected_md5(headers) -> Optional[bytes]:
+    """
+    Returns the MD5 digest announced by the server, which is only done by Google Cloud Storage (x-goog-hash).
+    """
+    for value in headers.get('x-goog-hash', '').split(','):
+        algorithm, _, encoded_digest = value.strip().partition('=')
+        if algorithm == 'md5':
+            return base64.b64decode(encoded_digest)
+    return None
+
+
+def verify_download(
+    nb_of_bytes: int, md5_digest: bytes, expected_size: Optional[int], expected_md5: Optional[bytes]
+) -> None:
+    if expected_size is not None and nb_of_bytes != expected_size:
+        raise ValueError(f'Downloaded {nb_of_bytes} bytes, expected {expected_size} bytes')
+    if expected_md5 is not None and md5_digest != expected_md5:
+        raise ValueError('MD5 checksum of download does not match')
+
+
+def download_file(url: str, dst_file_path: str, max_nb_of_segments: int = MAX_DOWNLOAD_SEGMENTS) -> int:
+    """
+    Downloads the resource at the given URL to the given file.
+    Large resources are downloaded in segments in parallel if the server supports range requests. Interrupted
+    downloads are resumed, and the size and checksum (if provided by the server) are verified.
+
+    :return: The number of downloaded bytes.
+    :raises ResourceNotFound: If the resource is not available.
+    :raises ValueError: If the downloaded resource is not complete or corrupted.
+    """
+    session = get_session()
+    try:
+        head = session.head(url, allow_redirects=True, timeout=60)
+    except RequestException as e:
+        raise ResourceNotFound(url) from e
+    if head.status_code >= 400:
+        raise ResourceNotFound(url)
+    size = int(head.headers.get('Content-Length', 0)) or None
+    expected_md5 = get_expected_md5(head.headers)
+    nb_of_segments = min(max_nb_of_segments, (size or 0) // MIN_DOWNLOAD_SEGMENT_SIZE)
+
+    if head.headers.get('Accept-Ranges') != 'bytes' or nb_of_segments < 2:
+        try:
+            reader = ResumableReader(session, url)
+        except RequestException as e:
+            raise ResourceNotFound(url) from e
+        try:
+            with open(dst_file_path, 'wb') as file:
+                shutil.copyfileobj(reader, file, CHUNK_SIZE)
+            reader.verify()
+        finally:
+            reader.close()
+        return reader.nb_of_bytes
+
+    logger.debug(f'Downloading {size} bytes in {nb_of_segments} segments')
+    segment_size = -(-size // nb_of_segments)
+    with open(dst_file_path, 'wb') as file:
+        file.truncate(size)
+    fd = os.open(dst_file_path, os.O_WRONLY)
+    try:
+        with ThreadPoolExecutor(max_workers=nb_of_segments) as executor:
+            futures = [
+                executor.submit(__download_segment, url, fd, start, min(start + segment_size, size) - 1)
+                for start in range(0, size, segment_size)
+            ]
+            for future in futures:
+                future.result()
+    finally:
+        os.close(fd)
+
+    md5 = hashlib.md5()
+    with open(dst_file_path, 'rb') as file:
+        while chunk := file.read(CHUNK_SIZE):
+            md5.update(chunk)
+    verify_download(os.path.getsize(dst_file_path), md5.digest(), size, expected_md5)
+    return size
+
+
+def __download_segment(url: str, fd: int, start: int, end: int, max_retries: int = MAX_DOWNLOAD_RETRIES) -> None:
+    """
+    Downloads the given (inclusive) byte range of the resource at the given URL, and writes it at the same offset in the
+    given file. Interrupted downloads are resumed.
+    """
+    session = get_session()
+    position = start
+    tries = 0
+    while position <= end:
+        try:
+            with session.get(url, headers={'Range': f'bytes={position}-{end}'}, stream=True, timeout=60) as resp:
+                if resp.status_code != 206:
+                    raise ValueError(f'Server did not honor range request (status {resp.status_code})')
+                for chunk in resp.iter_content(CHUNK_SIZE):
+                    os.pwrite(fd, chunk, position)
+                    position += len(chunk)
+            if position <= end:
+                raise EOFError(f'Connection closed at byte {position} of segment {start}-{end}')
+        except (RequestException, EOFError) as e:
+            tries += 1
+            if tries > max_retries:
+                raise
+            logger.debug(f'Download of segment {start}-{end} interrupted ({e}), resuming at byte {position}')
+            time.sleep(min(2**tries, 30) / 10)
+
+
 def download_and_extract(urls: list[str], dst_folder_path: str) -> bool:
     """
     Downloads the archive residing at the given URL and extracts it to the given dest_path.
     This method currently supports zip, tar.bz2 and tar.xz archives.
+    Tar archives are extracted while they are downloaded, without storing the archive itself. Zip archives have to be
+    stored first, since their index is located at the end of the archive, which allows downloading them in parallel
+    segments. Interrupted downloads are resumed, and the archive is verified if the server provides a checksum.
+    If the archive contains a single top-level folder, its contents are extracted directly into dest_path.
 
     :return bool: Returns True if the archive was successfully downloaded and extracted, otherwise False.
     """
     for url in urls:
         logger.debug(f"Attempting to download archive from '{url}'.")
-        tmp_file_name = urlparse(url).path.split('/')[-1]
-        tmp_file_path = os.path.join('/tmp', tmp_file_name)
-        if os.path.exists(tmp_file_path):
-            os.remove(tmp_file_path)
-        session = __get_session()
+        file_name = urlparse(url).path.split('/')[-1]
+        _, file_extension = os.path.splitext(file_name)
+        if file_extension not in ['.zip', '.bz2', '.xz']:
+            raise AttributeError(f'File extension {file_extension} is not supported.')
+        start = time.time()
         try:
-            with session.get(url, stream=True) as resp:
-                if resp.status_code >= 400:
-                    continue
-                with open(tmp_file_path, 'wb') as file:
-                    shutil.copyfileobj(resp.raw, file)
-        except RequestException:
-            logger.debug("Download failed.")
+            if file_extension == '.zip':
+                tmp_file_path = os.path.join('/tmp', file_name)
+                try:
+                    nb_of_downloaded_bytes = download_file(url, tmp_file_path)
+                    nb_of_extracted_bytes = unzip(tmp_file_path, dst_folder_path)
+                finally:
+                    if os.path.exists(tmp_file_path):
+                        os.remove(tmp_file_path)
+                nb_of_written_bytes = nb_of_downloaded_bytes + nb_of_extracted_bytes
+                peak_disk_use = nb_of_written_bytes
+            else:
+                reader = ResumableReader(get_session(), url)
+                try:
+                    nb_of_written_bytes = peak_disk_use = untar(reader, dst_folder_path)
+                    reader.verify()
+                except ValueError:
+                    shutil.rmtree(dst_folder_path, ignore_errors=True)
+                    raise
+                finally:
+                    reader.close()
+                nb_of_downloaded_bytes = reader.nb_of_bytes
+        except (ResourceNotFound, RequestException, tarfile.TarError, zipfile.BadZipFile, EOFError, ValueError):
+            logger.debug('Download failed.', exc_info=True)
             continue
-
-        logger.debug(f"Extracting downloaded archive '{tmp_file_path}'.")
-        _, file_extension = os.path.splitext(tmp_file_path)
-        match file_extension:
-            case '.zip':
-                unzip(tmp_file_path, dst_folder_path)
-            case '.bz2':
-                untar(tmp_file_path, dst_folder_path)
-            case '.xz':
-                untar(tmp_file_path, dst_folder_path)
-            case _:
-                AttributeError(f'File extension {file_extension} is not supported.')
-        os.remove(tmp_file_path)
+        logger.info(
+            f"Fetched '{file_name}' in {time.time() - start:.2f}s: "
+            f'{nb_of_downloaded_bytes / 1024**2:.1f} MB downloaded, {nb_of_written_bytes / 1024**2:.1f} MB written, '
+            f'{peak_disk_use / 1024**2:.1f} MB peak disk use'
+        )
         return True
     return False
 
 
-def unzip(src_archive_path: str, dst_folder_path: str) -> None:
+def unzip(src_archive_path: str, dst_folder_path: str) -> int:
+    """
+    Extracts the given zip archive into the given folder.
+    If the archive contains a single top-level folder, its contents are extracted directly into the given folder.
+
+    :return: The number of extracted bytes.
+    """
+    os.makedirs(dst_folder_path, exist_ok=True)
+    nb_of_bytes = 0
     with zipfile.ZipFile(src_archive_path, 'r') as zip:
-        members = zip.namelist()
-        top_dirs_and_files = {name.split('/')[0] for name in members}
+        members = zip.infolist()
+        top_dirs_and_files = {member.filename.split('/')[0] for member in members}
+        strip_top_dir = len(top_dirs_and_files) == 1 and all('/' in member.filename for member in members)
+        for member in members:
+            if strip_top_dir:
+                member.filename = member.filename.split('/', 1)[1]
+                if not member.filename:
+                    continue
+            zip.extract(member, dst_folder_path)
+            nb_of_bytes += member.file_size
+    return nb_of_bytes
+
+
+def untar(src_archive, dst_folder_path: str) -> int:
+    """
+    Extracts the given tar archive into the given folder, reading it as a stream.
+    If the archive contains a single top-level folder, its contents are moved directly into the given folder.
+
+    :param src_archive: The path to the archive, or a file-like object from which the archive can be read.
+    :return: The number of extracted bytes.
+    """
+    # The archive is extracted next to the destination, so its top-level folder can be moved without copying.
+    staging_folder_path = dst_folder_path.rstrip('/') + '.partial'
+    if os.path.exists(staging_folder_path):
+        shutil.rmtree(staging_folder_path)
+    os.makedirs(staging_folder_path)
+    try:
+        if isinstance(src_archive, str):
+            tar = tarfile.open(src_archive, 'r|*')
+        else:
+            tar = tarfile.open(fileobj=src_archive, mode='r|*')
+        with tar:
+            tar.extractall(staging_folder_path, filter='tar')
+            nb_of_bytes = sum(member.size for member in tar.getmembers() if member.isfile())
+        members = os.listdir(staging_folder_path)
         # If there is a single top-level directory, we move all contents up.
-        if len(top_dirs_and_files) == 1:
-            parent_folder_path = os.path.dirname(dst_folder_path)
-            zip.extractall(parent_folder_path)
-            safe_move_dir(os.path.join(parent_folder_path, top_dirs_and_files.pop()), dst_folder_path)
+        if len(members) == 1 and os.path.isdir(os.path.join(staging_folder_path, members[0])):
+            move_folder_contents(os.path.join(staging_folder_path, members[0]), dst_folder_path)
         else:
-            os.makedirs(dst_folder_path, exist_ok=True)
-            zip.extractall(dst_folder_path)
+            move_folder_contents(staging_folder_path, dst_folder_path)
+    finally:
+        shutil.rmtree(staging_folder_path, ignore_errors=True)
+    return nb_of_bytes
 
 
-def untar(src_archive_path: str, dst_folder_path: str) -> None:
-    os.makedirs(dst_folder_path, exist_ok=True)
-    # We do not inspects contents first like in unzip, because this is a very costly operation for tar archives.
-    with tarfile.open(src_archive_path, 'r:*') as tar:
-        tar.extractall(dst_folder_path)
-        members = os.listdir(dst_folder_path)
-        top_dirs_and_files = {name.split('/')[0] for name in members}
-        # If there is a single top-level directory, we move all contents up.
-        if len(top_dirs_and_files) == 1:
-            safe_move_dir(os.path.join(dst_folder_path, members.pop()), dst_folder_path + '_2')
-            shutil.rmtree(dst_folder_path)
-            safe_move_dir(os.path.join(dst_folder_path + '_2'), dst_folder_path)
+def move_folder_contents(src_path: str, dst_path: str) -> None:
+    """
+    Moves all files and folders in src_path to dst_path.
+    Within the same file system, entries are renamed instead of copied.
+    """
+    os.makedirs(dst_path, exist_ok=True)
+    for name in os.listdir(src_path):
+        src_entry_path = os.path.join(src_path, name)
+        dst_entry_path = os.path.join(dst_path, name)
+        if os.path.isdir(dst_entry_path) and not os.path.islink(dst_entry_path):
+            shutil.rmtree(dst_entry_path)
+        try:
+            os.replace(src_entry_path, dst_entry_path)
+        except OSError:
+            # Different file systems
+            shutil.move(src_entry_path, dst_entry_path)
 
 
 class ResourceNotFound(Exception):
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import bisect
+from typing import Iterable, Optional
+
+
+class BinaryAvailabilityIndex:
+    """
+    In-memory index of which states within an evaluation range have a binary available.
+    It is prefetched when the evaluation starts, so that finding the closest available state does not require a
+    database or network request for each candidate. States of which the availability is not known yet can be probed
+    by the caller, after which the outcome should be marked in the index.
+    """
+
+    def __init__(
+        self,
+        available: Iterable[int] = (),
+        unavailable: Iterable[int] = (),
+        index_range: Optional[tuple[int, int]] = None,
+        is_complete: bool = False,
+    ) -> None:
+        """
+        Initializes the index.
+
+        :param available: Indexes of states with an available binary.
+        :param unavailable: Indexes of states without an available binary.
+        :param index_range: The (inclusive) range of indexes covered by the index.
+        :param is_complete: Whether all states within the range that are not marked available are unavailable.
+        """
+        self.__available = sorted(set(available))
+        self.__unavailable = set(unavailable)
+        self.__index_range = index_range
+        self.__is_complete = is_complete and index_range is not None
+
+    def __len__(self) -> int:
+        return len(self.__available) + len(self.__unavailable)
+
+    def is_available(self, index: int) -> Optional[bool]:
+        """
+        Returns whether the state with the given index has an available binary, or None if this is not known.
+        """
+        position = bisect.bisect_left(self.__available, index)
+        if position < len(self.__available) and self.__available[position] == index:
+            return True
+        if index in self.__unavailable:
+            return False
+        if self.__is_complete and self.__index_range[0] <= index <= self.__index_range[1]:
+            return False
+        return None
+
+    def mark(self, index: int, available: bool) -> None:
+        """
+        Stores the availability of the binary of the state with the given index.
+        """
+        if available:
+            if self.is_available(index) is not True:
+                bisect.insort(self.__available, index)
+            self.__unavailable.discard(index)
+        else:
+            self.__unavailable.add(index)
+
+    def get_closest_available(self, target: int, lower: int, upper: int) -> Optional[int]:
+        """
+        Returns the index closest to the target that is known to have an available binary.
+        The target itself is always considered, other indexes only if they are **strictly** within the given bounds.
+        Ties are broken in favor of the lower index.
+        """
+        if self.is_available(target):
+            return target
+        position = bisect.bisect_left(self.__available, target)
+        candidates = []
+        if position > 0 and self.__available[position - 1] > lower:
+            candidates.append(self.__available[position - 1])
+        if position < len(self.__available) and self.__available[position] < upper:
+            candidates.append(self.__available[position])
+        if not candidates:
+            return None
+        return min(candidates, key=lambda index: (abs(index - target), index))
+
+    def get_unknown_closer_than(
+        self, target: int, lower: int, upper: int, closest: Optional[int], limit: int
+    ) -> list[int]:
+        """
+        Returns up to `limit` indexes of which the availability is unknown, and which would be preferred over the given
+        closest available index. They are ordered by preference, using the same rules as `get_closest_available`.
+        """
+        # In a complete index, the availability of all states within its range is known.
+        if self.__is_complete:
+            first_index, last_index = self.__index_range
+            if first_index <= min(lower, target) and max(upper, target) <= last_index:
+                return []
+        if closest is not None:
+            max_key = (abs(closest - target), closest)
+        else:
+            max_key = (max(target - lower, upper - target), upper)
+        unknown = []
+        if self.is_available(target) is None:
+            unknown.append(target)
+        distance = 1
+        while len(unknown) < limit and (distance, target - distance) < max_key:
+            for index in (target - distance, target + distance):
+                if (distance, index) < max_key and lower < index < upper and self.is_available(index) is None:
+                    unknown.append(index)
+            distance += 1
+        return unknown[:limit]
@@ -1,5 +1,25 @@
+import logging
+import threading
+import time
+from typing import Optional
+from urllib.parse import urlencode
+
+from bci import util
 from bci.database.mongo.revision_cache import RevisionCache
 
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_BUCKET = 'chromium-browser-snapshots'
+SNAPSHOT_LISTING_URL = f'https://www.googleapis.com/storage/v1/b/{SNAPSHOT_BUCKET}/o'
+SNAPSHOT_DOWNLOAD_URL = f'https://storage.googleapis.com/{SNAPSHOT_BUCKET}'
+SNAPSHOT_PLATFORM = 'Linux_x64'
+SNAPSHOT_FILE_NAME = 'chrome-linux.zip'
+# Listings are reused for this many seconds, since a state factory is created for every experiment of an evaluation.
+SNAPSHOT_LISTING_MAX_AGE = 60 * 60
+
+__snapshot_listings: dict[tuple[int, int], tuple[float, list[int]]] = {}
+__snapshot_listings_lock = threading.Lock()
+
 
 def is_tag(tag: str) -> bool:
     return RevisionCache.is_tag('chromium', tag)
@@ -19,3 +39,74 @@ def get_release_revision_id(major_release_version: int) -> int:
 
 def get_most_recent_major_version() -> int:
     return RevisionCache.get_most_recent_major_version('chromium')
+
+
+def has_snapshot_binary(revision_nb: int) -> bool:
+    """
+    Returns whether a snapshot binary is available for the given revision number.
+    Only the headers of the binary are requested.
+    """
+    url = f'{SNAPSHOT_DOWNLOAD_URL}/{SNAPSHOT_PLATFORM}/{revision_nb}/{SNAPSHOT_FILE_NAME}'
+    response = util.get_session().head(url, timeout=60)
+    return response.status_code == 200
+
+
+def get_revision_nbs_with_snapshot_binary(lower_revision_nb: int, upper_revision_nb: int) -> list[int]:
+    """
+    Returns the revision numbers within the given (inclusive) range of which a snapshot binary is available.
+    The snapshot bucket is listed page by page, which takes one request per 1000 available binaries.
+
+    :raises ResourceNotFound: If the bucket could not be listed.
+    """
+    revision_nbs = []
+    # Objects are listed in lexicographic order, so each number of digits is listed separately.
+    for nb_of_digits in range(len(str(lower_revision_nb)), len(str(upper_revision_nb)) + 1):
+        lower = max(lower_revision_nb, 10 ** (nb_of_digits - 1))
+        upper = min(upper_revision_nb, 10**nb_of_digits - 1)
+        params = {
+            'prefix': f'{SNAPSHOT_PLATFORM}/',
+            'startOffset': f'{SNAPSHOT_PLATFORM}/{lower}/',
+            # The end offset is exclusive, and '/' sorts before all digits.
+            'endOffset': f'{SNAPSHOT_PLATFORM}/{upper}0',
+            'matchGlob': f'{SNAPSHOT_PLATFORM}/{"?" * nb_of_digits}/{SNAPSHOT_FILE_NAME}',
+            'fields': 'items(name),nextPageToken',
+            'maxResults': 1000,
+        }
+        while True:
+            page = util.request_json(f'{SNAPSHOT_LISTING_URL}?{urlencode(params)}')
+            for item in page.get('items', []):
+                _, revision_nb, file_name = item['name'].split('/', 2)
+                if file_name == SNAPSHOT_FILE_NAME and revision_nb.isdigit() and lower <= int(revision_nb) <= upper:
+                    revision_nbs.append(int(revision_nb))
+            if 'nextPageToken' not in page:
+                break
+            params['pageToken'] = page['nextPageToken']
+    logger.debug(f'Listed {len(revision_nbs)} snapshot binaries in [{lower_revision_nb}, {upper_revision_nb}]')
+    now = time.time()
+    with __snapshot_listings_lock:
+        for listed_range, (listed_ts, _) in list(__snapshot_listings.items()):
+            if now - listed_ts >= SNAPSHOT_LISTING_MAX_AGE:
+                del __snapshot_listings[listed_range]
+        __snapshot_listings[(lower_revision_nb, upper_revision_nb)] = (now, revision_nbs)
+    return revision_nbs
+
+
+def get_listed_revision_nbs_with_snapshot_binary(
+    lower_revision_nb: int, upper_revision_nb: int
+) -> Optional[list[int]]:
+    """
+    Returns the revision numbers within the given (inclusive) range of which a snapshot binary is available, according
+    to a recent listing of a range that includes it.
+
+    :return: The available revision numbers, or None if no such range was listed recently.
+    """
+    now = time.time()
+    with __snapshot_listings_lock:
+        for (listed_lower, listed_upper), (listed_ts, revision_nbs) in __snapshot_listings.items():
+            if (
+                listed_lower <= lower_revision_nb
+                and upper_revision_nb <= listed_upper
+                and now - listed_ts < SNAPSHOT_LISTING_MAX_AGE
+            ):
+                return [nb for nb in revision_nbs if lower_revision_nb <= nb <= upper_revision_nb]
+    return None
@@ -1,6 +1,6 @@
 import logging
 import re
-from typing import Optional
+from typing import Iterable, Iterator, Optional
 
 from bci.util import ResourceNotFound, request_final_url, request_html
 from bci.version_control.revision_parser.parser import RevisionParser
@@ -8,6 +8,15 @@ from bci.version_control.revision_parser.parser import RevisionParser
 REV_ID_BASE_URL = 'https://chromium.googlesource.com/chromium/src/+/'
 REV_NUMBER_BASE_URL = 'http://crrev.com/'
 
+# A commit hash at the start of a line, as printed by `git log` ('commit <hash>') or by a custom format ('%H ...').
+GIT_LOG_COMMIT_PATTERN = re.compile(r'^(?:commit )?([0-9a-f]{40})\b')
+# The commit position of a commit on the main branch, or the SVN revision of commits from before the git migration.
+# Positions quoted in the message of another commit (e.g., reverts, which prefix them with '>') are not matched.
+GIT_LOG_POSITION_PATTERN = re.compile(
+    r'^\s*(?:Cr-Commit-Position: )?refs/heads/(?:master|main)@\{#([0-9]{1,7})\}\s*$'
+    r'|^\s*git-svn-id: \S*svn\.chromium\.org/chrome/trunk/src@([0-9]{1,7}) '
+)
+
 logger = logging.getLogger(__name__)
 
 
@@ -41,3 +50,25 @@ class ChromiumRevisionParser(RevisionParser):
         if matches:
             return matches[0]
         return None
+
+    @staticmethod
+    def parse_git_log(lines: Iterable[str]) -> Iterator[tuple[int, str]]:
+        """
+        Parses the revision number (commit position) and revision id (commit hash) of each commit in a git log dump of
+        the Chromium repository. Commits without a commit position on the main branch are skipped.
+        Both the default format of `git log` and the compact format of
+        `git log --format='%H %(trailers:key=Cr-Commit-Position,valueonly,separator=)'` are supported.
+
+        :param lines: The lines of the dump.
+        :return: Pairs of revision number and revision id.
+        """
+        revision_id = None
+        for line in lines:
+            if match := GIT_LOG_COMMIT_PATTERN.match(line):
+                revision_id = match.group(1)
+                line = line[match.end() :]
+            if revision_id is None:
+                continue
+            if match := GIT_LOG_POSITION_PATTERN.search(line):
+                yield int(match.group(1) or match.group(2)), revision_id
+                revision_id = None
@@ -1,7 +1,17 @@
 from __future__ import annotations
 
+import logging
+from typing import Optional
+
 from bci.database.mongo.mongodb import MongoDB
+from bci.database.mongo.revision_cache import RevisionCache
 from bci.evaluations.logic import EvaluationParameters
+from bci.util import ResourceNotFound
+from bci.version_control.repository.online.chromium import (
+    get_listed_revision_nbs_with_snapshot_binary,
+    get_revision_nbs_with_snapshot_binary,
+)
+from bci.version_control.binary_availability_index import BinaryAvailabilityIndex
 from bci.version_control.state_result_factory import StateResultFactory
 from bci.version_control.states.revisions.chromium import ChromiumRevision
 from bci.version_control.states.revisions.firefox import FirefoxRevision
@@ -10,6 +20,8 @@ from bci.version_control.states.versions.base import BaseVersion
 from bci.version_control.states.versions.chromium import ChromiumVersion
 from bci.version_control.states.versions.firefox import FirefoxVersion
 
+logger = logging.getLogger(__name__)
+
 
 class StateFactory:
     def __init__(self, eval_params: EvaluationParameters) -> None:
@@ -21,6 +33,7 @@ class StateFactory:
         self.__eval_params = eval_params
         self.__state_result_factory = StateResultFactory(experiment=eval_params.evaluation_range.mech_group)
         self.boundary_states = self.__create_boundary_states()
+        self.binary_availability_index = self.__create_binary_availability_index()
 
     def create_state(self, index: int) -> State:
         """
@@ -59,11 +72,54 @@ class StateFactory:
         else:
             raise ValueError('No evaluation range specified')
 
-    def create_evaluated_states(self) -> list[State]:
+    def __create_binary_availability_index(self) -> BinaryAvailabilityIndex:
+        """
+        Prefetch the known binary availability of all revisions within the evaluation range.
+        For release evaluations, the range is small enough to be probed on demand.
+        """
+        if self.__eval_params.evaluation_range.only_release_revisions:
+            return BinaryAvailabilityIndex()
+        first_state, last_state = self.boundary_states
+        index_range = (first_state.index, last_state.index)
+        match self.__eval_params.browser_configuration.browser_name:
+            case 'chromium':
+                index = self.__create_chromium_binary_availability_index(index_range)
+            case 'firefox':
+                # All Firefox revisions with a binary are known in advance through the revision cache.
+                available = RevisionCache.firefox_get_revision_nbs_with_binary(*index_range)
+                index = BinaryAvailabilityIndex(available, index_range=index_range, is_complete=True)
+            case _:
+                index = BinaryAvailabilityIndex()
+        logger.debug(f'Prefetched binary availability of {len(index)} revisions in {index_range}')
+        return index
+
+    @staticmethod
+    def __create_chromium_binary_availability_index(index_range: tuple[int, int]) -> BinaryAvailabilityIndex:
+        """
+        List the snapshot binaries within the range, which are stored in bulk in the binary availability cache.
+        If the snapshots cannot be listed, only the cached binary availability is used.
+        Ranges that were listed recently, e.g. for a previous experiment of the same evaluation, are not listed again.
+        """
+        if (available := get_listed_revision_nbs_with_snapshot_binary(*index_range)) is not None:
+            return BinaryAvailabilityIndex(available, index_range=index_range, is_complete=True)
+        try:
+            available = get_revision_nbs_with_snapshot_binary(*index_range)
+        except ResourceNotFound:
+            logger.warning(f'Could not list snapshot binaries in {index_range}, using cached availability')
+            available, unavailable = MongoDB().get_binary_availability_of_revisions('chromium', *index_range)
+            return BinaryAvailabilityIndex(available, unavailable, index_range=index_range)
+        MongoDB().store_binary_availability_of_revisions('chromium', available)
+        return BinaryAvailabilityIndex(available, index_range=index_range, is_complete=True)
+
+    def create_evaluated_states(self, since: Optional[str] = None) -> list[State]:
         """
         Create evaluated state objects within the evaluation range where the result is fetched from the database.
+
+        :param since: If given, only states of which the result was stored at or after this timestamp are created.
         """
-        return MongoDB().get_evaluated_states(self.__eval_params, self.boundary_states, self.__state_result_factory)
+        return MongoDB().get_evaluated_states(
+            self.__eval_params, self.boundary_states, self.__state_result_factory, since=since
+        )
 
     def __create_version_state(self, index: int) -> BaseVersion:
         """
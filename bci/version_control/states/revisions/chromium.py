@@ -1,8 +1,8 @@
 from typing import Optional
 
-import requests
-
 from bci.database.mongo.mongodb import MongoDB
+from bci.database.mongo.revision_cache import RevisionCache
+from bci.version_control.repository.online.chromium import has_snapshot_binary
 from bci.version_control.revision_parser.chromium_parser import ChromiumRevisionParser
 from bci.version_control.states.revisions.base import BaseRevision
 
@@ -21,9 +21,7 @@ class ChromiumRevision(BaseRevision):
         cached_binary_available_online = MongoDB().has_binary_available_online('chromium', self)
         if cached_binary_available_online is not None:
             return cached_binary_available_online
-        url = f'https://www.googleapis.com/storage/v1/b/chromium-browser-snapshots/o/Linux_x64%2F{self._revision_nb}%2Fchrome-linux.zip'
-        response = requests.get(url, stream=True)
-        has_binary_online = response.status_code == 200
+        has_binary_online = has_snapshot_binary(self._revision_nb)
         MongoDB().store_binary_availability_online_cache('chromium', self, has_binary_online)
         return has_binary_online
 
@@ -38,16 +36,25 @@ class ChromiumRevision(BaseRevision):
         States are initialized with either a revision id or revision number.
         This method attempts to fetch other data to complete this state object.
         """
-        # First check if the missing data is available in the cache
         if self._revision_id and self._revision_nb:
             return
+        # First check the revision index, which is imported from a git log dump and does not require network requests
+        if self._revision_id is None:
+            self._revision_id = RevisionCache.chromium_get_revision_id(self._revision_nb)
+        if self._revision_nb is None:
+            self._revision_nb = RevisionCache.chromium_get_revision_nb(self._revision_id)
+        if self._revision_id and self._revision_nb:
+            return
+        # Then check if the missing data is available in the cache
         if state := MongoDB().get_complete_state_dict_from_binary_availability_cache(self):
             if self._revision_id is None:
                 self._revision_id = state.get('revision_id', None)
             if self._revision_nb is None:
                 self._revision_nb = state.get('revision_number', None)
-        # If not, fetch the missing data from the parser
+        # If not, fetch the missing data from the parser, and add it to the revision index for next time
         if self._revision_id is None:
             self._revision_id = PARSER.get_revision_id(self._revision_nb)
         if self._revision_nb is None:
             self._revision_nb = PARSER.get_revision_nb(self._revision_id)
+        if self._revision_id and self._revision_nb:
+            RevisionCache.chromium_store_revisions([(self._revision_nb, self._revision_id)])
@@ -1,7 +1,9 @@
-import requests
-
 from bci.database.mongo.mongodb import MongoDB
-from bci.version_control.repository.online.chromium import get_release_revision_id, get_release_revision_number
+from bci.version_control.repository.online.chromium import (
+    get_release_revision_id,
+    get_release_revision_number,
+    has_snapshot_binary,
+)
 from bci.version_control.states.revisions.chromium import ChromiumRevision
 from bci.version_control.states.versions.base import BaseVersion
 
@@ -24,9 +26,7 @@ class ChromiumVersion(BaseVersion):
         cached_binary_available_online = MongoDB().has_binary_available_online('chromium', self)
         if cached_binary_available_online is not None:
             return cached_binary_available_online
-        url = f'https://www.googleapis.com/storage/v1/b/chromium-browser-snapshots/o/Linux_x64%2F{self._revision_nb}%2Fchrome-linux.zip'
-        req = requests.get(url)
-        has_binary_online = req.status_code == 200
+        has_binary_online = has_snapshot_binary(self._revision_nb)
         MongoDB().store_binary_availability_online_cache('chromium', self, has_binary_online)
         return has_binary_online
 
@@ -6,6 +6,7 @@ import threading
 from flask import Blueprint, current_app, redirect, request
 
 import bci.browser.support as browser_support
+from bci import util
 from bci.database.mongo.mongodb import MongoDB
 import bci.evaluations.logic as application_logic
 from bci.analysis.plot_factory import PlotFactory
@@ -15,6 +16,7 @@ from bci.evaluations.logic import MissingParametersException, PlotParameters
 from bci.integration_tests.evaluation_configurations import get_eval_parameters_list
 from bci.main import Main
 from bci.web.clients import Clients
+from bci.web.report_forwarding import ReportForwarder
 
 logger = logging.getLogger(__name__)
 api = Blueprint('api', __name__, url_prefix='/api')
@@ -183,10 +185,36 @@ def create_project():
 def get_system_info():
     return {
         'status': 'OK',
-        'cpu_count': os.cpu_count() if os.cpu_count() else 2
+        'cpu_count': os.cpu_count() if os.cpu_count() else 2,
+        'report_forwarding': ReportForwarder.get_instance().get_stats(),
+        'http': util.get_http_stats(),
     }
 
 
+@api.route('/collector/partition/', methods=['POST'])
+def register_collector_partition():
+    """
+    Registers the partition of the request collector at the given IP address.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or 'partition_id' not in data or 'collector_ip' not in data:
+        return {'status': 'NOK', 'msg': 'No partition id or collector IP address found'}, 400
+    ReportForwarder.get_instance().register_partition(data['collector_ip'], data['partition_id'])
+    return {'status': 'OK'}
+
+
+@api.route('/collector/report/', methods=['POST'])
+def forward_mirrored_report():
+    """
+    Forwards the reports of requests to static experiment resources, which are mirrored by NGINX.
+    """
+    report = request.get_json(silent=True)
+    if not isinstance(report, dict):
+        return {'status': 'NOK', 'msg': 'No report found'}, 400
+    ReportForwarder.get_instance().forward(request.headers.get('X-Real-IP'), report)
+    return {'status': 'OK'}
+
+
 @api.route('/log/', methods=['POST'])
 def log():
     # TODO: emit logs of workers in central log
@@ -1,15 +1,15 @@
 import datetime
-import importlib.util
 import logging
 import sys
-import threading
 
-import requests
 from bci.evaluations.experiments import SUPPORTED_DOMAINS
+from bci.web.module_cache import ModuleCache
+from bci.web.report_forwarding import ReportForwarder
 from flask import Blueprint, Request, make_response, render_template, request, url_for
 
 logger = logging.getLogger(__name__)
 exp = Blueprint("experiments", __name__, template_folder="/app/bci/web/templates")
+module_cache = ModuleCache()
 
 
 @exp.before_request
@@ -36,14 +36,7 @@ def __report(request: Request) -> None:
         "headers": dict(request.headers),
         "content": request.data.decode("utf-8"),
     }
-
-    def send_report_to_collector():
-        try:
-            requests.post(f"http://{remote_ip}:5001/report/", json=response_data, timeout=5)
-        except requests.exceptions.ConnectionError:
-            logger.warning(f"WARNING: Could not propagate request to collector at {remote_ip}:5001")
-
-    threading.Thread(target=send_report_to_collector).start()
+    ReportForwarder.get_instance().forward(remote_ip, response_data)
 
 
 def __get_all_GET_parameters(request) -> dict[str,str]:
@@ -138,12 +131,9 @@ def python_evaluation(project: str, experiment: str, file_name: str):
     module_name = f"{host}/{project}/{experiment}"
     path = f"experiments/pages/{project}/{experiment}/{host}/{file_name}.py"
 
-    # Dynamically import the file
+    # Dynamically import the file, which is only done again when it changes
     sys.dont_write_bytecode = True
-    spec = importlib.util.spec_from_file_location(module_name, path)
-    module = importlib.util.module_from_spec(spec)
-    sys.modules[module_name] = module
-    spec.loader.exec_module(module)
+    module = module_cache.get_module(module_name, path)
 
     def report_leak() -> None:
         remote_ip = request.headers.get("X-Real-IP")
@@ -153,7 +143,6 @@ def python_evaluation(project: str, experiment: str, file_name: str):
             "headers": dict(request.headers),
             "content": request.data.decode("utf-8"),
         }
-
-        requests.post(f"http://{remote_ip}:5001/report/", json=response_data, timeout=5)
+        ReportForwarder.get_instance().forward(remote_ip, response_data)
 
     return module.main(request, report_leak)
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import importlib.util
+import logging
+import os
+import sys
+import threading
+from collections import OrderedDict
+from types import ModuleType
+
+logger = logging.getLogger(__name__)
+
+MAX_NB_OF_MODULES = 128
+
+
+class ModuleCache:
+    """
+    Least recently used cache of Python modules that are loaded from experiment files.
+    A module is only loaded again when its file changes, which is detected through its modification time and size.
+    """
+
+    def __init__(self, max_nb_of_modules: int = MAX_NB_OF_MODULES) -> None:
+        self.__max_nb_of_modules = max_nb_of_modules
+        self.__modules: OrderedDict[str, tuple[tuple[int, int], str, ModuleType]] = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def get_module(self, module_name: str, path: str) -> ModuleType:
+        """
+        Returns the module loaded from the file at the given path.
+
+        :param module_name: The name under which the module is registered in `sys.modules`.
+        :param path: The path of the Python file.
+        """
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self.__lock:
+            if (entry := self.__modules.get(path)) is not None and entry[0] == version:
+                self.__modules.move_to_end(path)
+                sys.modules[module_name] = entry[2]
+                return entry[2]
+
+        module = self.__load_module(module_name, path)
+        with self.__lock:
+            self.__modules[path] = (version, module_name, module)
+            self.__modules.move_to_end(path)
+            while len(self.__modules) > self.__max_nb_of_modules:
+                _, (_, evicted_module_name, evicted_module) = self.__modules.popitem(last=False)
+                if sys.modules.get(evicted_module_name) is evicted_module:
+                    del sys.modules[evicted_module_name]
+        return module
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return len(self.__modules)
+
+    @staticmethod
+    def __load_module(module_name: str, path: str) -> ModuleType:
+        logger.debug(f"Loading module '{module_name}' from '{path}'")
+        spec = importlib.util.spec_from_file_location(module_name, path)
+        if spec is None or spec.loader is None:
+            raise ImportError(f"Could not load module from '{path}'")
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        spec.loader.exec_module(module)
+        return module
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+from collections import defaultdict
+from typing import Optional
+
+from requests import RequestException, Session
+
+from bci import util
+
+logger = logging.getLogger(__name__)
+
+COLLECTOR_PORT = 5001
+MAX_QUEUE_SIZE = 10000
+MAX_BATCH_SIZE = 50
+NB_OF_SENDERS = 4
+
+
+class ReportForwarder:
+    """
+    Forwards reports of requests to experiment pages to the collector of the worker that made the request.
+    Reports are queued and sent in batches by a fixed number of sender threads, which share a pool of keep-alive
+    connections to the collectors. When the queue is full, reports are dropped instead of piling up.
+    """
+
+    __instance: Optional[ReportForwarder] = None
+    __instance_lock = threading.Lock()
+
+    def __init__(self, nb_of_senders: int = NB_OF_SENDERS, max_queue_size: int = MAX_QUEUE_SIZE) -> None:
+        self.__queue: queue.Queue[tuple[str, dict]] = queue.Queue(maxsize=max_queue_size)
+        self.__stats_lock = threading.Lock()
+        self.__nb_of_forwarded = 0
+        self.__nb_of_dropped = 0
+        self.__nb_of_failed = 0
+        self.__partition_ids: dict[str, str] = {}
+        self.__partition_ids_lock = threading.Lock()
+        for i in range(nb_of_senders):
+            threading.Thread(target=self.__send_forever, name=f'report-sender-{i}', daemon=True).start()
+
+    @staticmethod
+    def get_instance() -> ReportForwarder:
+        with ReportForwarder.__instance_lock:
+            if ReportForwarder.__instance is None:
+                ReportForwarder.__instance = ReportForwarder()
+            return ReportForwarder.__instance
+
+    def register_partition(self, collector_ip: str, partition_id: str) -> None:
+        """
+        Registers the partition in which the collector at the given IP address stores the reports received from now on.
+        """
+        with self.__partition_ids_lock:
+            self.__partition_ids[collector_ip] = partition_id
+
+    def forward(self, collector_ip: str, report: dict) -> bool:
+        """
+        Queues the given report to be sent to the collector at the given IP address.
+
+        :return: False if the report was dropped because the queue is full.
+        """
+        # The partition is determined on receipt, since reports may wait in the queue while the next test starts.
+        with self.__partition_ids_lock:
+            report = {**report, 'partition_id': self.__partition_ids.get(collector_ip)}
+        try:
+            self.__queue.put_nowait((collector_ip, report))
+            return True
+        except queue.Full:
+            with self.__stats_lock:
+                self.__nb_of_dropped += 1
+            logger.warning(f'Report forwarding queue is full, dropped report for collector at {collector_ip}')
+            return False
+
+    def get_stats(self) -> dict:
+        with self.__stats_lock:
+            return {
+                'queue_depth': self.__queue.qsize(),
+                'forwarded': self.__nb_of_forwarded,
+                'dropped': self.__nb_of_dropped,
+                'failed': self.__nb_of_failed,
+            }
+
+    def __send_forever(self) -> None:
+        # Reports are not retried, since they are time-sensitive and the queue would grow while retrying.
+        session = util.get_session(max_retries=0)
+        while True:
+            batch = [self.__queue.get()]
+            while len(batch) < MAX_BATCH_SIZE:
+                try:
+                    batch.append(self.__queue.get_nowait())
+                except queue.Empty:
+                    break
+            reports_per_collector = defaultdict(list)
+            for collector_ip, report in batch:
+                reports_per_collector[collector_ip].append(report)
+            for collector_ip, reports in reports_per_collector.items():
+                self.__send(session, collector_ip, reports)
+            for _ in batch:
+                self.__queue.task_done()
+
+    def __send(self, session: Session, collector_ip: str, reports: list[dict]) -> None:
+        try:
+            # The collector accepts both single reports and lists of reports.
+            session.post(f'http://{collector_ip}:{COLLECTOR_PORT}/report/', json=reports, timeout=5)
+            with self.__stats_lock:
+                self.__nb_of_forwarded += len(reports)
+        except RequestException:
+            with self.__stats_lock:
+                self.__nb_of_failed += len(reports)
+            logger.warning(f'Could not propagate {len(reports)} report(s) to collector at {collector_ip}:5001')
+
+    def join(self) -> None:
+        """
+        Blocks until all queued reports are handled.
+        """
+        self.__queue.join()
@@ -1,15 +1,21 @@
+import json
 import logging
 import os
 import sys
+import time
 
 from bci.configuration import Loggers
 from bci.database.mongo.mongodb import MongoDB
+from bci.database.mongo.worker_queue import WorkerQueue
 from bci.evaluations.custom.custom_evaluation import CustomEvaluationFramework
-from bci.evaluations.logic import WorkerParameters
+from bci.evaluations.logic import DatabaseParameters, WorkerParameters
 
 # This logger argument is set explicitly so when this file is ran as a script, it will still use the logger configuration
 logger = logging.getLogger('bci.worker')
 
+# Interval at which an idle pool worker checks the worker queue for new tests.
+POOL_POLL_INTERVAL = 0.2
+
 
 def __run_by_worker() -> None:
     """
@@ -20,6 +26,8 @@ def __run_by_worker() -> None:
     if len(sys.argv) < 2:
         logger.info('Worker did not receive any arguments.')
         os._exit(0)
+    if sys.argv[1] == '--pool' and len(sys.argv) == 4:
+        __run_as_pool_worker(sys.argv[2], DatabaseParameters.from_dict(json.loads(sys.argv[3])))
     args = sys.argv[1]
 
     logger.info('Worker started')
@@ -34,6 +42,33 @@ def __run_by_worker() -> None:
     os._exit(0)
 
 
+def __run_as_pool_worker(pool_id: str, database_connection_params: DatabaseParameters) -> None:
+    """
+    Keeps performing tests from the worker queue until a shutdown job is claimed.
+    The database connection and evaluation framework are reused for all tests.
+    """
+    worker_name = os.getenv('HOSTNAME', 'unknown')
+    logger.info(f"Worker '{worker_name}' joined pool '{pool_id}'")
+    MongoDB().connect(database_connection_params)
+    evaluation_framework = CustomEvaluationFramework()
+
+    while (job := WorkerQueue.claim(pool_id, worker_name)) is None or not job.get('shutdown', False):
+        if job is None:
+            time.sleep(POOL_POLL_INTERVAL)
+            continue
+        params = WorkerParameters.deserialize(job['params'])
+        try:
+            evaluation_framework.evaluate(params, is_worker=True)
+            WorkerQueue.mark_finished(job, True)
+        except Exception:
+            logger.error(f"An exception occurred during evaluation of '{params.state}'", exc_info=True)
+            WorkerQueue.mark_finished(job, False)
+
+    logger.info(f"Worker '{worker_name}' left pool '{pool_id}', exiting...")
+    logging.shutdown()
+    os._exit(0)
+
+
 def run(params: WorkerParameters):
     """
     Executes evaluation based on given parameters.
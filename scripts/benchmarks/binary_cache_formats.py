@@ -0,0 +1,97 @@
+"""
+Compares both binary cache formats (one GridFS file per binary file, or one archive per binary) in terms of store time,
+restore time and database size.
+Binaries are cached in separate collections, so that the binary cache itself is never affected (e.g., by evicting
+cached binaries to make room for the benchmark). These collections are removed afterwards.
+
+Usage (from the repository root, with a reachable MongoDB and the BCI_MONGO_* environment variables set):
+    PYTHONPATH=. python scripts/benchmarks/binary_cache_formats.py <path to binary executable> [--repetitions N]
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from types import SimpleNamespace
+
+from bci.configuration import Global
+from bci.database.mongo import binary_cache
+from bci.database.mongo.binary_cache import BinaryCache
+from bci.database.mongo.mongodb import MongoDB
+
+BENCHMARK_STATE = SimpleNamespace(browser_name='chromium', type='revision', index=-1)
+BENCHMARK_BUCKET_NAME = 'benchmark_fs'
+BENCHMARK_ENTRIES_COLLECTION_NAME = 'benchmark_binary_cache_entries'
+
+
+def get_chunks_size() -> tuple[int, int]:
+    """
+    Returns the uncompressed and compressed size of the GridFS chunks.
+    """
+    db = MongoDB().get_collection(f'{BENCHMARK_BUCKET_NAME}.chunks').database
+    try:
+        # Flushes pending writes, so the compressed size is up-to-date. This requires admin privileges.
+        MongoDB().client.admin.command('fsync')
+    except Exception:
+        pass
+    stats = db.command('collStats', f'{BENCHMARK_BUCKET_NAME}.chunks')
+    return stats['size'], stats['storageSize']
+
+
+def run(binary_executable_path: str, cache_format: str, repetitions: int) -> None:
+    MongoDB().binary_cache_format = cache_format
+    store_times, restore_times = [], []
+    size_before = get_chunks_size()
+    size_after = size_before
+    for i in range(repetitions):
+        BinaryCache.remove_binary_files(BENCHMARK_STATE)
+
+        start = time.perf_counter()
+        BinaryCache.store_binary_files(binary_executable_path, BENCHMARK_STATE)
+        store_times.append(time.perf_counter() - start)
+        if i == 0:
+            size_after = get_chunks_size()
+
+        with tempfile.TemporaryDirectory() as restore_folder:
+            restore_path = os.path.join(restore_folder, 'binary', os.path.basename(binary_executable_path))
+            start = time.perf_counter()
+            assert BinaryCache.fetch_binary_files(restore_path, BENCHMARK_STATE)
+            restore_times.append(time.perf_counter() - start)
+            shutil.rmtree(os.path.dirname(restore_path))
+    BinaryCache.remove_binary_files(BENCHMARK_STATE)
+
+    nb_of_documents = MongoDB().get_collection(f'{BENCHMARK_BUCKET_NAME}.files').count_documents({})
+    print(
+        f'{cache_format:>8}: store {min(store_times):.2f}s, restore {min(restore_times):.2f}s, '
+        f'size {(size_after[0] - size_before[0]) / 2**20:.1f} MB '
+        f'({(size_after[1] - size_before[1]) / 2**20:.1f} MB compressed), '
+        f'{nb_of_documents} file documents left after cleanup'
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('binary_executable_path')
+    parser.add_argument('--repetitions', type=int, default=3)
+    args = parser.parse_args()
+
+    MongoDB().connect(Global.get_database_params())
+    # The cache is disabled when no limit is set.
+    MongoDB().binary_cache_limit = max(MongoDB().binary_cache_limit, 1_000_000)
+    MongoDB().binary_cache_size_limit = 0
+    binary_cache.BUCKET_NAME = BENCHMARK_BUCKET_NAME
+    binary_cache.ENTRIES_COLLECTION_NAME = BENCHMARK_ENTRIES_COLLECTION_NAME
+    MongoDB().create_binary_cache_collections(BENCHMARK_BUCKET_NAME, BENCHMARK_ENTRIES_COLLECTION_NAME)
+    try:
+        for cache_format in ('files', 'archive'):
+            run(args.binary_executable_path, cache_format, args.repetitions)
+    finally:
+        for collection_name in ('files', 'chunks'):
+            MongoDB().get_collection(f'{BENCHMARK_BUCKET_NAME}.{collection_name}').drop()
+        MongoDB().get_collection(BENCHMARK_ENTRIES_COLLECTION_NAME).drop()
+        MongoDB().disconnect()
+
+
+if __name__ == '__main__':
+    main()
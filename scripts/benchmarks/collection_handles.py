@@ -0,0 +1,74 @@
+"""
+Measures the number of database round trips needed for typical lookups, with and without cached collection handles.
+
+Usage (from the repository root, with a reachable MongoDB and the BCI_MONGO_* environment variables set):
+    PYTHONPATH=. python scripts/benchmarks/collection_handles.py [--iterations N]
+"""
+
+import argparse
+import time
+from collections import Counter
+
+from pymongo import monitoring
+
+from bci.configuration import Global
+from bci.database.mongo.mongodb import MongoDB
+
+BENCHMARK_COLLECTION = 'benchmark_collection_handles'
+
+
+class CommandCounter(monitoring.CommandListener):
+    def __init__(self) -> None:
+        self.commands = Counter()
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        self.commands[event.command_name] += 1
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        pass
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        pass
+
+
+def run(counter: CommandCounter, iterations: int, cached: bool) -> tuple[Counter, float]:
+    db = MongoDB()
+    counter.commands.clear()
+    start = time.perf_counter()
+    for i in range(iterations):
+        if not cached:
+            # Every access verifies the existence of the collection again, as before handles were cached.
+            db.invalidate_collection_cache(BENCHMARK_COLLECTION)
+        db.get_collection(BENCHMARK_COLLECTION).find_one({'i': i})
+    elapsed = time.perf_counter() - start
+    return Counter(counter.commands), elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=1000)
+    args = parser.parse_args()
+
+    counter = CommandCounter()
+    # Listeners have to be registered before the client is created.
+    monitoring.register(counter)
+    db = MongoDB()
+    db.connect(Global.get_database_params())
+    db.get_collection(BENCHMARK_COLLECTION, create_if_not_found=True).insert_one({'i': 0})
+
+    try:
+        for label, cached in (('uncached', False), ('cached', True)):
+            commands, elapsed = run(counter, args.iterations, cached)
+            round_trips = sum(commands.values())
+            print(
+                f'{label:>8}: {round_trips} round trips ({round_trips / args.iterations:.2f} per lookup), '
+                f'{elapsed * 1000 / args.iterations:.3f} ms per lookup, {dict(commands)}'
+            )
+    finally:
+        db.get_collection(BENCHMARK_COLLECTION).drop()
+        db.invalidate_collection_cache(BENCHMARK_COLLECTION)
+        db.disconnect()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+Compares the per-test setup and cleanup time of execution folders that are copied or linked from the binary folder.
+
+Usage (from the repository root, preferably in a worker container so the file systems match those used in practice):
+    PYTHONPATH=. python scripts/benchmarks/execution_folder.py <path to binary folder> [--repetitions N]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from bci import util
+from bci.browser.configuration.browser import EXECUTION_PARENT_FOLDER
+
+
+def run(binary_folder_path: str, label: str, repetitions: int) -> None:
+    setup_times, cleanup_times = [], []
+    all_linked = True
+    for _ in range(repetitions):
+        execution_folder_path = tempfile.mkdtemp(dir=EXECUTION_PARENT_FOLDER)
+        start = time.perf_counter()
+        if label == 'copy':
+            util.copy_folder(binary_folder_path, execution_folder_path)
+        else:
+            all_linked = util.link_folder(binary_folder_path, execution_folder_path) and all_linked
+        setup_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        util.rmtree(execution_folder_path)
+        cleanup_times.append(time.perf_counter() - start)
+    note = '' if label == 'copy' or all_linked else ' (fell back to copying)'
+    print(f'{label:>5}: setup {min(setup_times) * 1000:.1f} ms, cleanup {min(cleanup_times) * 1000:.1f} ms{note}')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('binary_folder_path')
+    parser.add_argument('--repetitions', type=int, default=5)
+    args = parser.parse_args()
+
+    nb_of_files = sum(len(file_names) for _, _, file_names in os.walk(args.binary_folder_path))
+    print(f"Binary folder '{args.binary_folder_path}' contains {nb_of_files} files")
+    for label in ('copy', 'link'):
+        run(args.binary_folder_path, label, args.repetitions)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+import os
+import tempfile
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from bci.browser.binary import binary_store
+from bci.browser.binary.binary_store import BinaryStore
+
+
+def create_state(index: int) -> SimpleNamespace:
+    return SimpleNamespace(browser_name='chromium', type='revision', index=index, name=f'{index}')
+
+
+class TestBinaryStore(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_folder = tempfile.TemporaryDirectory()
+        self.store_folder_path = os.path.join(self.tmp_folder.name, 'store')
+        os.makedirs(self.store_folder_path)
+        self.patches = [
+            patch.object(binary_store, 'STORE_FOLDER_PATH', self.store_folder_path),
+            patch.object(binary_store.Global, 'get_binary_store_limit', return_value=250),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self) -> None:
+        for p in self.patches:
+            p.stop()
+        self.tmp_folder.cleanup()
+
+    def create_binary(self, index: int, nb_of_bytes: int = 100) -> str:
+        executable_path = os.path.join(self.tmp_folder.name, 'downloaded', str(index), 'chrome')
+        os.makedirs(os.path.join(os.path.dirname(executable_path), 'locales'))
+        with open(executable_path, 'wb') as file:
+            file.write(b'x' * nb_of_bytes)
+        with open(os.path.join(os.path.dirname(executable_path), 'locales', 'en-US.pak'), 'wb') as file:
+            file.write(b'y')
+        return executable_path
+
+    def test_store_and_fetch(self):
+        executable_path = self.create_binary(1)
+        assert BinaryStore.store_binary_files(executable_path, create_state(1))
+
+        restore_path = os.path.join(self.tmp_folder.name, 'restored', 'chrome')
+        assert BinaryStore.fetch_binary_files(restore_path, create_state(1))
+        with open(restore_path, 'rb') as file:
+            assert file.read() == b'x' * 100
+        assert os.path.isfile(os.path.join(os.path.dirname(restore_path), 'locales', 'en-US.pak'))
+        assert not BinaryStore.fetch_binary_files(restore_path, create_state(2))
+        # Temporary folders are cleaned up after publishing.
+        assert os.listdir(os.path.join(self.store_folder_path, '.tmp')) == []
+
+    def test_fetched_binaries_are_linked(self):
+        executable_path = self.create_binary(1)
+        assert BinaryStore.store_binary_files(executable_path, create_state(1))
+        restore_path = os.path.join(self.tmp_folder.name, 'restored', 'chrome')
+        assert BinaryStore.fetch_binary_files(restore_path, create_state(1))
+        # Both folders are on the same file system, so no files are copied.
+        assert os.stat(restore_path).st_ino == os.stat(executable_path).st_ino
+
+        # Evicting the entry does not affect the restored binary.
+        with patch.object(binary_store.Global, 'get_binary_store_limit', return_value=1):
+            BinaryStore.evict()
+        assert not BinaryStore.fetch_binary_files(restore_path, create_state(1))
+        with open(restore_path, 'rb') as file:
+            assert file.read() == b'x' * 100
+
+    def test_least_recently_used_is_evicted(self):
+        for index in (1, 2):
+            assert BinaryStore.store_binary_files(self.create_binary(index), create_state(index))
+        # Make sure the first entry is used more recently than the second one.
+        time.sleep(0.01)
+        assert BinaryStore.fetch_binary_files(os.path.join(self.tmp_folder.name, 'a', 'chrome'), create_state(1))
+
+        assert BinaryStore.store_binary_files(self.create_binary(3), create_state(3))
+        restore_path = os.path.join(self.tmp_folder.name, 'b', 'chrome')
+        assert BinaryStore.fetch_binary_files(restore_path, create_state(1))
+        assert not BinaryStore.fetch_binary_files(restore_path, create_state(2))
+        assert BinaryStore.fetch_binary_files(restore_path, create_state(3))
+
+    def test_disabled_without_limit(self):
+        with patch.object(binary_store.Global, 'get_binary_store_limit', return_value=0):
+            assert not BinaryStore.store_binary_files(self.create_binary(1), create_state(1))
+        assert not os.path.exists(os.path.join(self.store_folder_path, 'chromium'))
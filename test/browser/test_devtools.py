@@ -0,0 +1,77 @@
+import http.server
+import json
+import threading
+import unittest
+
+from bci.browser.automation.devtools import DevToolsSession
+
+
+class LegacyDevToolsHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Mimics the remote debugging server of older Chromium builds, which do not accept PUT requests.
+    """
+
+    opened_urls = []
+    closed_tabs = []
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def do_PUT(self):
+        self.send_response(405)
+        self.end_headers()
+
+    def do_GET(self):
+        if self.path == '/json/version':
+            self.__send_json({'Browser': 'Chrome/30.0.1599.0'})
+        elif self.path.startswith('/json/new?'):
+            self.opened_urls.append(self.path[len('/json/new?'):])
+            self.__send_json({'id': f'tab{len(self.opened_urls)}'})
+        elif self.path.startswith('/json/close/'):
+            self.closed_tabs.append(self.path[len('/json/close/'):])
+            self.__send_json({})
+        else:
+            self.send_response(404)
+            self.end_headers()
+
+    def __send_json(self, data: dict):
+        body = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class TestDevToolsSession(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), LegacyDevToolsHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+
+    def test_open_and_close_tab(self):
+        session = DevToolsSession(self.server.server_address[1])
+        assert session.wait_until_available(timeout=5)
+
+        tab_id = session.open_tab('https://a.test/project/poc/main?x=1')
+        assert tab_id == 'tab1'
+        assert LegacyDevToolsHandler.opened_urls[-1] == 'https://a.test/project/poc/main?x=1'
+        session.close_tab(tab_id)
+        assert LegacyDevToolsHandler.closed_tabs[-1] == 'tab1'
+
+        # The fragment is part of the URL to open, rather than of the endpoint.
+        session.open_tab('https://a.test/project/poc/main#section')
+        assert LegacyDevToolsHandler.opened_urls[-1] == 'https://a.test/project/poc/main%23section'
+
+    @staticmethod
+    def test_unavailable():
+        with http.server.HTTPServer(('127.0.0.1', 0), LegacyDevToolsHandler) as server:
+            port = server.server_address[1]
+        # Nothing listens on the port anymore.
+        session = DevToolsSession(port)
+        assert not session.wait_until_available(timeout=0.5)
+        assert session.open_tab('https://a.test/') is None
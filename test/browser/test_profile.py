@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from bci.browser.configuration import profile
+
+
+class TestProfile(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_folder = tempfile.TemporaryDirectory()
+        storage_path = os.path.join(self.tmp_folder.name, 'storage')
+        os.makedirs(os.path.join(storage_path, 'chromium', '59_btpc', 'Default'))
+        with open(os.path.join(storage_path, 'chromium', '59_btpc', 'Default', 'Preferences'), 'w') as file:
+            file.write('{}')
+        os.makedirs(os.path.join(storage_path, 'firefox', 'tp-67'))
+        with open(os.path.join(storage_path, 'firefox', 'tp-67', 'prefs.js'), 'w') as file:
+            file.write('')
+        self.patches = [
+            patch.object(profile, 'PROFILE_STORAGE_FOLDER', storage_path),
+            patch.object(profile, 'PROFILE_EXECUTION_FOLDER', os.path.join(self.tmp_folder.name, 'execution')),
+            patch.object(profile, 'PROFILE_TEMPLATE_FOLDER', os.path.join(self.tmp_folder.name, 'templates')),
+            patch.dict(profile.__dict__, {'__templates': {}}),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self) -> None:
+        for p in self.patches:
+            p.stop()
+        self.tmp_folder.cleanup()
+
+    def test_chromium_profile(self):
+        profile_path = profile.prepare_chromium_profile('59_btpc')
+        assert os.path.isfile(os.path.join(profile_path, 'Default', 'Preferences'))
+        other_profile_path = profile.prepare_chromium_profile('59_btpc')
+        assert other_profile_path != profile_path
+
+        profile.remove_profile_execution_folder(profile_path)
+        assert not os.path.exists(profile_path)
+        assert os.path.isfile(os.path.join(other_profile_path, 'Default', 'Preferences'))
+
+        with self.assertRaises(Exception):
+            profile.prepare_chromium_profile('unknown')
+
+    def test_firefox_ca_is_trusted_once(self):
+        with patch.object(profile.cli, 'execute') as execute:
+            for _ in range(3):
+                profile_path = profile.prepare_firefox_profile('tp-67')
+                assert os.path.isfile(os.path.join(profile_path, 'prefs.js'))
+            profile.prepare_firefox_profile()
+        # Both certificate databases of both templates are initialized once.
+        assert execute.call_count == 4
+        assert all('certutil' in call.args[0] for call in execute.call_args_list)
@@ -0,0 +1,61 @@
+import io
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from bci.database.mongo import binary_cache
+from bci.database.mongo.binary_cache import BinaryCache
+
+
+class InMemoryGridFS:
+    """
+    Keeps GridFS files in memory, which is sufficient to store and restore archives.
+    """
+
+    def __init__(self) -> None:
+        self.files = {}
+
+    def new_file(self, **kwargs):
+        grid_file = io.BytesIO()
+        grid_file.abort = lambda: None
+        # The contents are kept when the file is closed.
+        grid_file.close = lambda: self.files.__setitem__('archive', grid_file.getvalue())
+        return grid_file
+
+    def get(self, grid_file_id):
+        return io.BytesIO(self.files[grid_file_id])
+
+
+class TestBinaryCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_folder = tempfile.TemporaryDirectory()
+        self.gridfs = InMemoryGridFS()
+        mongodb = MagicMock()
+        mongodb.get_gridfs.return_value = self.gridfs
+        self.mongodb_patch = patch.object(binary_cache, 'MongoDB', return_value=mongodb)
+        self.mongodb_patch.start()
+
+    def tearDown(self) -> None:
+        self.mongodb_patch.stop()
+        self.tmp_folder.cleanup()
+
+    def test_archive_with_symbolic_links_is_restored(self):
+        src = os.path.join(self.tmp_folder.name, 'src')
+        os.makedirs(os.path.join(src, 'locales'))
+        for file_name in ('chrome', 'libfoo.so.1', os.path.join('locales', 'en-US.pak')):
+            with open(os.path.join(src, file_name), 'wb') as file:
+                file.write(b'binary')
+        os.symlink('libfoo.so.1', os.path.join(src, 'libfoo.so'))
+        os.symlink('locales', os.path.join(src, 'resources'))
+        state = MagicMock(browser_name='chromium', type='revision', index=1)
+
+        nb_of_stored_files = BinaryCache._BinaryCache__store_archive(src, state)
+        dst = os.path.join(self.tmp_folder.name, 'dst')
+        nb_of_restored_files = BinaryCache._BinaryCache__restore_archive('archive', dst)
+
+        assert nb_of_stored_files == nb_of_restored_files == 5
+        assert os.readlink(os.path.join(dst, 'libfoo.so')) == 'libfoo.so.1'
+        assert os.readlink(os.path.join(dst, 'resources')) == 'locales'
+        with open(os.path.join(dst, 'resources', 'en-US.pak'), 'rb') as file:
+            assert file.read() == b'binary'
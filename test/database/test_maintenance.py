@@ -0,0 +1,66 @@
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from pymongo import UpdateOne
+
+from bci.database.mongo import maintenance
+from bci.database.mongo.maintenance import backfill_test_keys, get_hot_queries, has_collection_scan
+from bci.database.mongo.mongodb import get_test_key_of_document
+
+
+class TestMaintenance(unittest.TestCase):
+
+    @staticmethod
+    def test_has_collection_scan():
+        index_plan = {'stage': 'FETCH', 'inputStage': {'stage': 'IXSCAN', 'indexName': 'mech_group_1'}}
+        assert not has_collection_scan(index_plan)
+
+        collection_plan = {'stage': 'SUBPLAN', 'inputStage': {'stage': 'OR', 'inputStages': [
+            {'stage': 'IXSCAN'},
+            {'stage': 'COLLSCAN'},
+        ]}}
+        assert has_collection_scan(collection_plan)
+        # Plans of the slot-based execution engine are nested in 'queryPlan'
+        assert has_collection_scan({'queryPlan': {'stage': 'COLLSCAN'}, 'slotBasedPlan': {}})
+
+    @staticmethod
+    def test_get_hot_queries():
+        sample = {
+            'state': {'type': 'revision', 'browser_name': 'chromium', 'revision_number': 1000},
+            'browser_automation': 'terminal',
+            'browser_config': 'default',
+            'mech_group': 'test',
+            'extensions': [],
+            'cli_options': ['--disable-gpu'],
+            'ts': '2024-01-01 00:00:00+00:00',
+        }
+        queries = get_hot_queries(sample)
+        assert queries['test_result']['state'] == sample['state']
+        assert queries['test_result']['extensions'] == []
+        assert queries['test_result']['cli_options'] == {'$size': 1, '$all': ['--disable-gpu']}
+        assert queries['evaluated_states']['state.revision_number'] == {'$gte': 0, '$lte': 2000}
+        assert queries['evaluated_states_since']['ts'] == {'$gte': sample['ts']}
+
+    @staticmethod
+    def test_backfill_skips_incomplete_documents():
+        complete = {
+            '_id': 1,
+            'state': {'type': 'revision', 'browser_name': 'chromium', 'revision_number': 1000},
+            'browser_automation': 'terminal',
+            'browser_config': 'default',
+            'mech_group': 'test',
+        }
+        without_automation = {key: value for key, value in complete.items() if key != 'browser_automation'}
+        without_automation['_id'] = 2
+        without_revision_number = {**complete, '_id': 3, 'state': {'type': 'revision', 'browser_name': 'chromium'}}
+        collection = MagicMock()
+        collection.find.return_value = [without_automation, complete, without_revision_number]
+        collection.bulk_write.side_effect = lambda batch, ordered: SimpleNamespace(modified_count=len(batch))
+        mongodb = MagicMock()
+        mongodb.get_collection.return_value = collection
+
+        with patch.object(maintenance, 'MongoDB', return_value=mongodb):
+            assert not backfill_test_keys(['test'])
+        (batch,), _ = collection.bulk_write.call_args
+        assert batch == [UpdateOne({'_id': 1}, {'$set': {'test_key': get_test_key_of_document(complete)}})]
@@ -0,0 +1,39 @@
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from pymongo.errors import BulkWriteError
+
+from bci.database.mongo import revision_cache
+from bci.database.mongo.revision_cache import RevisionCache
+
+
+class TestRevisionCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.collection = MagicMock()
+        mongodb = MagicMock()
+        mongodb.get_collection.return_value = self.collection
+        self.mongodb_patch = patch.object(revision_cache, 'MongoDB', return_value=mongodb)
+        self.mongodb_patch.start()
+
+    def tearDown(self) -> None:
+        self.mongodb_patch.stop()
+
+    def test_revisions_are_stored_in_batches(self):
+        self.collection.bulk_write.side_effect = lambda updates, ordered: SimpleNamespace(
+            upserted_count=len(updates), modified_count=0
+        )
+        revisions = ((nb, f'{nb:040x}') for nb in range(revision_cache.CHROMIUM_REVISION_INDEX_BATCH_SIZE + 1))
+        assert RevisionCache.chromium_store_revisions(revisions) == revision_cache.CHROMIUM_REVISION_INDEX_BATCH_SIZE + 1
+        assert self.collection.bulk_write.call_count == 2
+
+    def test_conflicting_revisions_are_skipped(self):
+        self.collection.bulk_write.side_effect = BulkWriteError({
+            'nUpserted': 1,
+            'nModified': 1,
+            'writeErrors': [{'index': 1, 'code': 11000, 'errmsg': 'E11000 duplicate key error'}],
+        })
+        with self.assertLogs(revision_cache.logger, 'WARNING') as logs:
+            nb_of_stored = RevisionCache.chromium_store_revisions([(1, 'a' * 40), (2, 'a' * 40), (3, 'c' * 40)])
+        assert nb_of_stored == 2
+        assert 'revision 2' in logs.output[0]
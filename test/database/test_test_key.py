@@ -0,0 +1,44 @@
+import unittest
+
+from bci.database.mongo.mongodb import create_test_key, get_test_key_of_document
+
+
+class TestTestKey(unittest.TestCase):
+
+    @staticmethod
+    def test_test_key_is_canonical():
+        state = {'type': 'revision', 'browser_name': 'chromium', 'revision_number': 1000}
+        complete_state = {**state, 'revision_id': 'a' * 40}
+        key = create_test_key('default', ['--a', '--b'], ['ext1', 'ext2'], 'test', 'terminal', state)
+
+        # Order of options and extensions, and optional state attributes do not matter.
+        assert key == create_test_key('default', ['--b', '--a'], ['ext2', 'ext1'], 'test', 'terminal', complete_state)
+
+        other_state = {**state, 'revision_number': 1001}
+        assert key != create_test_key('default', ['--a', '--b'], ['ext1', 'ext2'], 'test', 'terminal', other_state)
+        assert key != create_test_key('default', ['--a'], ['ext1', 'ext2'], 'test', 'terminal', state)
+        assert key != create_test_key('default', ['--a', '--b'], ['ext1', 'ext2'], 'test', 'selenium', state)
+
+    @staticmethod
+    def test_test_key_of_document():
+        document = {
+            'state': {'type': 'version', 'browser_name': 'firefox', 'major_version': 120, 'revision_number': 5},
+            'browser_automation': 'terminal',
+            'browser_config': 'default',
+            'mech_group': 'test',
+            'extensions': [],
+            'cli_options': [],
+        }
+        assert get_test_key_of_document(document) == create_test_key(
+            'default', [], [], 'test', 'terminal', {'type': 'version', 'browser_name': 'firefox', 'major_version': 120}
+        )
+
+    @staticmethod
+    def test_test_key_of_incomplete_document():
+        document = {
+            'state': {'type': 'revision', 'browser_name': 'chromium'},
+            'browser_config': 'default',
+            'mech_group': 'test',
+        }
+        assert get_test_key_of_document(document) is None
+        assert get_test_key_of_document({**document, 'browser_automation': 'terminal'}) is None
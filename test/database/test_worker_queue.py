@@ -0,0 +1,129 @@
+import datetime
+import itertools
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from bci.database.mongo import worker_queue
+from bci.database.mongo.worker_queue import WorkerQueue
+
+
+class InMemoryCollection:
+    """
+    Supports the subset of collection operations and query operators that are used by the worker queue.
+    """
+
+    def __init__(self) -> None:
+        self.documents = []
+        self.__ids = itertools.count()
+
+    def insert_one(self, document: dict):
+        document = {'_id': next(self.__ids), **document}
+        self.documents.append(document)
+        return SimpleNamespace(inserted_id=document['_id'])
+
+    def insert_many(self, documents: list[dict]) -> None:
+        for document in documents:
+            self.insert_one(document)
+
+    def find(self, query: dict, projection: dict = None) -> list[dict]:
+        return [dict(document) for document in self.documents if self.__matches(document, query)]
+
+    def find_one_and_update(self, query: dict, update: dict, sort: list = None, return_document=None):
+        for document in sorted(self.documents, key=lambda document: document['_id']):
+            if self.__matches(document, query):
+                document.update(update['$set'])
+                return dict(document)
+        return None
+
+    def update_one(self, query: dict, update: dict) -> None:
+        self.update_many(query, update, limit=1)
+
+    def update_many(self, query: dict, update: dict, limit: int = None) -> None:
+        for document in [document for document in self.documents if self.__matches(document, query)][:limit]:
+            document.update(update['$set'])
+
+    def delete_many(self, query: dict) -> None:
+        self.documents = [document for document in self.documents if not self.__matches(document, query)]
+
+    @staticmethod
+    def __matches(document: dict, query: dict) -> bool:
+        for field, condition in query.items():
+            value = document.get(field)
+            if isinstance(condition, dict):
+                if '$in' in condition and value not in condition['$in']:
+                    return False
+                if '$lt' in condition and not (value is not None and value < condition['$lt']):
+                    return False
+            elif value != condition:
+                return False
+        return True
+
+
+def create_params(state: str) -> MagicMock:
+    params = MagicMock(state=state)
+    params.serialize.return_value = f'params of {state}'
+    return params
+
+
+class TestWorkerQueue(unittest.TestCase):
+    def setUp(self) -> None:
+        self.collection = InMemoryCollection()
+        mongodb = MagicMock()
+        mongodb.get_collection.return_value = self.collection
+        self.mongodb_patch = patch.object(worker_queue, 'MongoDB', return_value=mongodb)
+        self.mongodb_patch.start()
+
+    def tearDown(self) -> None:
+        self.mongodb_patch.stop()
+
+    def test_jobs_are_claimed_in_order_within_their_pool(self):
+        first_job_id = WorkerQueue.put('pool', create_params('1'))
+        WorkerQueue.put('other_pool', create_params('2'))
+        WorkerQueue.put('pool', create_params('3'))
+
+        job = WorkerQueue.claim('pool', 'bh_worker_0')
+        assert str(job['_id']) == first_job_id
+        assert job['status'] == 'running' and job['worker'] == 'bh_worker_0'
+        assert WorkerQueue.claim('pool', 'bh_worker_1')['state'] == '3'
+        assert WorkerQueue.claim('pool', 'bh_worker_1') is None
+
+    def test_shutdown_jobs_are_claimed_after_queued_tests(self):
+        WorkerQueue.put('pool', create_params('1'))
+        WorkerQueue.put_shutdown('pool', 2)
+        assert not WorkerQueue.claim('pool', 'bh_worker_0').get('shutdown', False)
+        assert WorkerQueue.claim('pool', 'bh_worker_0')['shutdown']
+        assert WorkerQueue.claim('pool', 'bh_worker_1')['shutdown']
+
+    def test_running_jobs_of_worker_are_failed(self):
+        WorkerQueue.put('pool', create_params('1'))
+        WorkerQueue.put('pool', create_params('2'))
+        WorkerQueue.put('pool', create_params('3'))
+        WorkerQueue.claim('pool', 'bh_worker_0')
+        WorkerQueue.mark_finished(WorkerQueue.claim('pool', 'bh_worker_0'), True)
+
+        WorkerQueue.fail_running_jobs('pool', 'bh_worker_0')
+        statuses = {job['state']: job['status'] for job in self.collection.documents}
+        assert statuses == {'1': 'failed', '2': 'finished', '3': 'pending'}
+
+    def test_finished_jobs_are_popped_once(self):
+        WorkerQueue.put('pool', create_params('1'))
+        WorkerQueue.put('pool', create_params('2'))
+        WorkerQueue.put('other_pool', create_params('3'))
+        WorkerQueue.mark_finished(WorkerQueue.claim('pool', 'bh_worker_0'), True)
+        WorkerQueue.mark_finished(WorkerQueue.claim('other_pool', 'bh_worker_0'), False)
+
+        assert [job['state'] for job in WorkerQueue.pop_finished_jobs('pool')] == ['1']
+        assert WorkerQueue.pop_finished_jobs('pool') == []
+        assert [job['status'] for job in WorkerQueue.pop_finished_jobs('other_pool')] == ['failed']
+        assert [job['state'] for job in self.collection.documents] == ['2']
+
+    def test_only_stale_jobs_are_cleared(self):
+        WorkerQueue.put('stale_pool', create_params('1'))
+        self.collection.documents[0]['ts'] -= datetime.timedelta(days=2)
+        WorkerQueue.put('pool', create_params('2'))
+
+        WorkerQueue.clear_stale(datetime.timedelta(days=1))
+        assert [job['pool_id'] for job in self.collection.documents] == ['pool']
+        WorkerQueue.clear('pool')
+        assert self.collection.documents == []
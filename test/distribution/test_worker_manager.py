@@ -0,0 +1,174 @@
+import itertools
+import queue
+import threading
+import time
+import unittest
+from collections import defaultdict
+from unittest.mock import MagicMock, patch
+
+from bci.distribution import worker_manager
+from bci.distribution.worker_manager import WorkerManager
+
+
+class FakeEvents:
+    """
+    Stands in for the Docker events stream, of which the events are pushed by the test.
+    """
+
+    def __init__(self) -> None:
+        self.__events = queue.Queue()
+
+    def push(self, event: dict) -> None:
+        self.__events.put(event)
+
+    def close(self) -> None:
+        self.__events.put(None)
+
+    def __iter__(self):
+        while (event := self.__events.get()) is not None:
+            if isinstance(event, Exception):
+                raise event
+            yield event
+
+
+def create_event(action: str, container_id: str) -> dict:
+    return {'Action': action, 'id': container_id, 'Actor': {'Attributes': {'name': f'{container_id}_name'}}}
+
+
+def create_container(container_id: str) -> MagicMock:
+    container = MagicMock(id=container_id)
+    container.name = f'{container_id}_name'
+    return container
+
+
+def wait_until(predicate, timeout: float = 5) -> bool:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class TestWorkerManager(unittest.TestCase):
+    def setUp(self) -> None:
+        self.events = FakeEvents()
+        self.client = MagicMock()
+        self.client.events.return_value = self.events
+        self.client.containers.list.return_value = []
+        job_ids = itertools.count()
+        self.worker_queue = MagicMock()
+        self.worker_queue.put.side_effect = lambda pool_id, params: str(next(job_ids))
+        self.worker_queue.pop_finished_jobs.return_value = []
+        self.patches = [
+            patch.object(worker_manager.docker, 'from_env', return_value=self.client),
+            patch.object(worker_manager, 'WorkerQueue', self.worker_queue),
+            patch.object(worker_manager, 'Clients'),
+            patch.object(worker_manager, 'POOL_POLL_INTERVAL', 0.01),
+            patch.object(worker_manager, 'POOL_WORKER_RESTART_DELAY', 0),
+            patch.object(worker_manager, 'DOCKER_EVENTS_RESUBSCRIBE_DELAY', 0),
+        ]
+        for p in self.patches:
+            p.start()
+        self.managers = []
+
+    def tearDown(self) -> None:
+        for manager in self.managers:
+            manager.shutdown()
+        for p in self.patches:
+            p.stop()
+
+    def create_manager(self, max_nb_of_containers: int, use_worker_pool: bool = False) -> WorkerManager:
+        manager = WorkerManager(max_nb_of_containers, use_worker_pool)
+        self.managers.append(manager)
+        return manager
+
+    @staticmethod
+    def create_params() -> MagicMock:
+        params = MagicMock()
+        params.database_connection_params.to_dict.return_value = {}
+        return params
+
+    def assert_all_evaluations_are_done(self, manager: WorkerManager) -> None:
+        thread = threading.Thread(target=manager.wait_until_all_evaluations_are_done, daemon=True)
+        thread.start()
+        thread.join(timeout=5)
+        assert not thread.is_alive()
+
+    def test_failed_pool_workers_are_restarted(self):
+        manager = self.create_manager(2, use_worker_pool=True)
+        nb_of_runs = defaultdict(int)
+        may_exit = threading.Event()
+
+        def run_pool_container_once(container_name: str, command: list[str]) -> bool:
+            nb_of_runs[container_name] += 1
+            if nb_of_runs[container_name] == 1:
+                # The first run of each worker fails.
+                return True
+            may_exit.wait()
+            return False
+
+        manager._WorkerManager__run_pool_container_once = run_pool_container_once
+        manager.start_test(self.create_params(), blocking_wait=False)
+        pool_id = self.worker_queue.put.call_args.args[0]
+
+        assert wait_until(lambda: nb_of_runs == {'bh_worker_0': 2, 'bh_worker_1': 2})
+        self.worker_queue.fail_running_jobs.assert_any_call(pool_id, 'bh_worker_0')
+        self.worker_queue.fail_running_jobs.assert_any_call(pool_id, 'bh_worker_1')
+        # The pool is kept as long as it has workers.
+        self.worker_queue.clear.assert_not_called()
+        manager.start_test(self.create_params(), blocking_wait=False)
+        assert self.worker_queue.put.call_args.args[0] == pool_id
+
+        may_exit.set()
+        self.assert_all_evaluations_are_done(manager)
+        self.worker_queue.clear.assert_called_once_with(pool_id)
+
+    def test_pool_is_abandoned_once_all_workers_are_gone(self):
+        manager = self.create_manager(2, use_worker_pool=True)
+        nb_of_runs = defaultdict(int)
+
+        def run_pool_container_once(container_name: str, command: list[str]) -> bool:
+            nb_of_runs[container_name] += 1
+            return True
+
+        manager._WorkerManager__run_pool_container_once = run_pool_container_once
+        manager.start_test(self.create_params(), blocking_wait=False)
+        pool_id = self.worker_queue.put.call_args.args[0]
+
+        # Queued tests are abandoned instead of awaited forever.
+        self.assert_all_evaluations_are_done(manager)
+        expected_nb_of_runs = worker_manager.MAX_POOL_WORKER_RESTARTS + 1
+        assert nb_of_runs == {'bh_worker_0': expected_nb_of_runs, 'bh_worker_1': expected_nb_of_runs}
+        self.worker_queue.clear.assert_called_once_with(pool_id)
+
+        # The next test starts a new pool.
+        manager.start_test(self.create_params(), blocking_wait=False)
+        assert self.worker_queue.put.call_args.args[0] != pool_id
+
+    def test_foreign_containers_occupy_slots(self):
+        self.client.containers.list.return_value = [create_container('leftover')]
+        manager = self.create_manager(3)
+        assert manager.wait_for_free_slots() == 2
+
+        self.events.push(create_event('start', 'foreign'))
+        assert wait_until(lambda: manager.wait_for_free_slots() == 1)
+        self.events.push(create_event('die', 'leftover'))
+        self.events.push(create_event('die', 'foreign'))
+        assert wait_until(lambda: manager.wait_for_free_slots() == 3)
+
+    def test_foreign_containers_are_synchronized_after_losing_the_events_stream(self):
+        self.client.containers.list.return_value = [create_container('leftover')]
+        manager = self.create_manager(2)
+        assert manager.wait_for_free_slots() == 1
+
+        # The leftover container exits while the events stream is lost, so its die event is missed.
+        resubscribed_events = FakeEvents()
+        self.client.events.return_value = resubscribed_events
+        self.client.containers.list.return_value = []
+        self.events.push(ConnectionError('Docker daemon restarted'))
+        assert wait_until(lambda: manager.wait_for_free_slots() == 2)
+
+        # Events of the new stream are processed.
+        resubscribed_events.push(create_event('start', 'foreign'))
+        assert wait_until(lambda: manager.wait_for_free_slots() == 1)
@@ -1,12 +1,34 @@
 import time
 import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
 
 import requests
 
+from bci.evaluations.collectors import requests as request_collector
 from bci.evaluations.collectors.collector import Collector, Type
+from bci.evaluations.collectors.requests import CollectorServer
 
 
 class TestCollector(unittest.TestCase):
+    def setUp(self) -> None:
+        # Stands in for the core, which tags forwarded reports with the most recently registered partition.
+        self.partition_ids = []
+        self.register_patch = patch.object(
+            request_collector, 'register_partition', lambda partition_id: self.partition_ids.append(partition_id) or True
+        )
+        self.register_patch.start()
+
+    def tearDown(self) -> None:
+        self.register_patch.stop()
+
+    def report(self, data: dict | list) -> None:
+        """
+        Sends the given report(s) to the collector, tagged with the partition of the most recently started collector.
+        """
+        reports = data if isinstance(data, list) else [data]
+        tagged = [{**report, 'partition_id': self.partition_ids[-1]} for report in reports]
+        requests.post('http://localhost:5001', json=tagged if isinstance(data, list) else tagged[0])
 
     @staticmethod
     def test_start_stop():
@@ -29,8 +51,7 @@ class TestCollector(unittest.TestCase):
         time.sleep(2)
         collector.stop()
 
-    @staticmethod
-    def test_requests():
+    def test_requests(self):
         collector = Collector([Type.REQUESTS])
         collector.start()
         response_data = {
@@ -39,8 +60,137 @@ class TestCollector(unittest.TestCase):
             'headers': [],
             'content': 'test'
         }
-        requests.post('http://localhost:5001', json=response_data)
+        self.report(response_data)
         time.sleep(1)
         collector.stop()
         results = collector.collect_results()
         assert results['requests'] == [response_data]
+
+    def test_batched_requests(self):
+        collector = Collector([Type.REQUESTS])
+        collector.start()
+        batch = [{'url': 'https://a.test/report/?bughog_a=1'}, {'url': 'https://a.test/report/?bughog_b=2'}]
+        self.report(batch)
+        collector.stop()
+        results = collector.collect_results()
+        assert results['requests'] == batch
+        assert sorted(results['req_vars'], key=lambda var: var['var']) == [
+            {'var': 'a', 'val': '1'},
+            {'var': 'b', 'val': '2'},
+        ]
+
+    def test_wait_for_terminal_report(self):
+        collector = Collector([Type.REQUESTS])
+        collector.start()
+        try:
+            self.report({'url': 'https://a.test/report/?bughog_reproduced=OK'})
+            since = collector.get_nb_of_requests()
+            assert since == 1
+
+            # Reports received before the visit started are not considered.
+            start = time.time()
+            assert not collector.wait_for_terminal_report(since, 0.5)
+            assert time.time() - start >= 0.5
+
+            self.report({'url': 'https://a.test/report/?bughog_other=OK'})
+            self.report({'url': 'https://a.test/report/if/?bughog_done=OK'})
+            assert not collector.wait_for_terminal_report(since, 0.5)
+
+            # The sanity check is commonly reported before the outcome.
+            self.report({'url': 'https://a.test/report/?bughog_sanity_check=OK'})
+            assert not collector.wait_for_terminal_report(since, 0.5)
+
+            self.report({'url': 'https://a.test/report/?bughog_done=OK'})
+            start = time.time()
+            assert collector.wait_for_terminal_report(since, 5)
+            assert time.time() - start < 1
+        finally:
+            collector.stop()
+
+    @staticmethod
+    def test_concurrent_reports_are_partitioned():
+        server = CollectorServer.get_instance()
+        first = server.open_partition()
+        second = server.open_partition()
+        try:
+            reports = [
+                {'url': f'https://a.test/report/?bughog_var{i}=OK', 'partition_id': (first, second)[i % 2].id}
+                for i in range(50)
+            ]
+            with ThreadPoolExecutor(max_workers=10) as executor:
+                list(executor.map(lambda report: requests.post('http://localhost:5001', json=report), reports))
+
+            # Requests are stored in the partition they are tagged with, without the tag.
+            assert sorted(request['url'] for request in first.snapshot()) == sorted(
+                report['url'] for report in reports[::2]
+            )
+            assert sorted(request['url'] for request in second.snapshot()) == sorted(
+                report['url'] for report in reports[1::2]
+            )
+            assert all('partition_id' not in request for request in first.snapshot())
+
+            second.reset()
+            assert second.snapshot() == []
+        finally:
+            server.close_partition(first)
+            server.close_partition(second)
+
+    def test_reports_of_unknown_or_closed_partitions_are_dropped(self):
+        collector = Collector([Type.REQUESTS])
+        collector.start()
+        previous_partition_id = self.partition_ids[-1]
+        collector.stop()
+
+        collector = Collector([Type.REQUESTS])
+        collector.start()
+        try:
+            # A late report of the previous test
+            requests.post(
+                'http://localhost:5001',
+                json={'url': 'https://a.test/report/?bughog_reproduced=OK', 'partition_id': previous_partition_id},
+            )
+            requests.post('http://localhost:5001', json={'url': 'https://a.test/report/?bughog_reproduced=OK'})
+            requests.post(
+                'http://localhost:5001',
+                json={'url': 'https://a.test/report/?bughog_reproduced=OK', 'partition_id': 'unknown'},
+            )
+            assert collector.get_nb_of_requests() == 0
+            self.report({'url': 'https://a.test/report/?bughog_sanity_check=OK'})
+            assert collector.get_nb_of_requests() == 1
+        finally:
+            collector.stop()
+
+    def test_reports_are_collected_without_partitioning_if_registration_fails(self):
+        with patch.object(request_collector, 'register_partition', return_value=False):
+            collector = Collector([Type.REQUESTS])
+            collector.start()
+        try:
+            # The core tags reports with the last partition it knows of, or none at all.
+            requests.post('http://localhost:5001', json={'url': 'https://a.test/report/?bughog_a=1'})
+            requests.post(
+                'http://localhost:5001', json={'url': 'https://a.test/report/?bughog_b=2', 'partition_id': 'unknown'}
+            )
+            assert collector.get_nb_of_requests() == 2
+        finally:
+            collector.stop()
+
+        # Closing the fallback partition restores partitioning.
+        collector = Collector([Type.REQUESTS])
+        collector.start()
+        try:
+            requests.post('http://localhost:5001', json={'url': 'https://a.test/report/?bughog_a=1'})
+            assert collector.get_nb_of_requests() == 0
+        finally:
+            collector.stop()
+
+    def test_registration_failure_is_not_raised(self):
+        self.register_patch.stop()
+        try:
+            # Nothing listens on port 1.
+            with (
+                patch.object(request_collector, 'PARTITION_REGISTRATION_URL', 'http://127.0.0.1:1/'),
+                patch.object(request_collector.util.Global, 'get_http_max_retries', return_value=0),
+            ):
+                assert not request_collector.register_partition('partition')
+        finally:
+            self.register_patch.start()
@@ -0,0 +1,64 @@
+import os
+import tempfile
+import time
+import unittest
+
+from bci.evaluations.collectors.logs import LogCollector
+
+
+class TestLogCollector(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_folder = tempfile.TemporaryDirectory()
+        self.log_file_path = os.path.join(self.tmp_folder.name, 'browser.log')
+
+    def tearDown(self) -> None:
+        self.tmp_folder.cleanup()
+
+    def append(self, text: str) -> None:
+        with open(self.log_file_path, 'a') as file:
+            file.write(text)
+
+    def test_incremental_parsing(self):
+        collector = LogCollector(log_file_path=self.log_file_path)
+        collector.start()
+        self.append('[INFO:CONSOLE(1)] "+++bughog_sanity_check=OK+++", source: https://a.test/ (1)\n')
+        self.append('[VERBOSE1:network.cc] unrelated\n')
+        collector.parse_data()
+        assert collector.data['log_vars'] == [{'var': 'sanity_check', 'val': 'OK'}]
+
+        # Incomplete lines are parsed again once they are complete.
+        self.append('[INFO:CONSOLE(1)] "+++bughog_reproduced=O')
+        collector.parse_data()
+        assert len(collector.data['log_vars']) == 1
+        self.append('K+++"\n+++bughog_other=1+++')
+        collector.parse_data()
+        # A variable on an unterminated last line is included, e.g., for the check at the end of a try.
+        assert collector.data['log_vars'][-2:] == [{'var': 'reproduced', 'val': 'OK'}, {'var': 'other', 'val': '1'}]
+        self.append(' (1)')
+        collector.parse_data()
+        assert len(collector.data['log_vars']) == 3
+        collector.stop()
+        assert collector.data['log_vars'] == [
+            {'var': 'sanity_check', 'val': 'OK'},
+            {'var': 'reproduced', 'val': 'OK'},
+            {'var': 'other', 'val': '1'},
+        ]
+
+        # Restarting the collector empties the log.
+        collector.start()
+        collector.parse_data()
+        assert collector.data['log_vars'] == []
+
+    def test_follow(self):
+        matches = []
+        collector = LogCollector(on_match=matches.append, log_file_path=self.log_file_path)
+        collector.start()
+        try:
+            self.append('+++bughog_reproduced=OK+++\n')
+            deadline = time.time() + 5
+            while not matches and time.time() < deadline:
+                time.sleep(0.05)
+            assert matches == [{'var': 'reproduced', 'val': 'OK'}]
+        finally:
+            collector.stop()
+        assert collector.data['log_vars'] == [{'var': 'reproduced', 'val': 'OK'}]
@@ -79,3 +79,21 @@ class TestBiggestGapBisectionSearch(unittest.TestCase):
 
         assert ([state.index for state in sequence._completed_states]
                 == [0, 12, 22, 34, 36, 38, 44, 56, 66, 68, 72, 78, 88, 98])
+
+    def test_sbg_search_always_available_batch(self):
+        state_factory = helper.create_state_factory(
+            helper.always_has_binary,
+            outcome_func=lambda x: True if x < 50 else False)
+        sequence = BiggestGapBisectionSearch(state_factory)
+        index_batches = [[state.index for state in sequence.next_batch(3)] for _ in range(5)]
+        assert index_batches == [[0, 99], [25, 50, 74], [31, 37, 44], [46, 47, 48], [49]]
+        self.assertRaises(SequenceFinished, sequence.next_batch, 3)
+
+    def test_sbg_search_batch_is_spread_over_gaps(self):
+        state_factory = helper.create_state_factory(
+            helper.always_has_binary,
+            evaluated_indexes=[0, 50, 99],
+            outcome_func=lambda x: True if 30 <= x < 60 else False)
+        sequence = BiggestGapBisectionSearch(state_factory)
+        assert [state.index for state in sequence.next_batch(4)] == [17, 33, 66, 83]
+        assert [state.index for state in sequence.next_batch(5)] == [21, 25, 29, 55, 61]
@@ -40,3 +40,10 @@ class TestBiggestGapBisectionSequence(unittest.TestCase):
         print(index_sequence)
         assert index_sequence == [0, 99, 24, 80, 36, 12, 70, 89, 42, 6, 18, 30, 55, 75, 94]
         self.assertRaises(SequenceFinished, sequence.next)
+
+    def test_sbg_sequence_always_available_batch(self):
+        state_factory = helper.create_state_factory(helper.always_has_binary)
+        sequence = BiggestGapBisectionSequence(state_factory, 5)
+        assert [state.index for state in sequence.next_batch(3)] == [0, 99, 49]
+        assert [state.index for state in sequence.next_batch(3)] == [74, 24]
+        self.assertRaises(SequenceFinished, sequence.next_batch, 3)
@@ -4,6 +4,7 @@ from unittest.mock import MagicMock
 
 from bci.evaluations.logic import EvaluationConfiguration, EvaluationRange
 from bci.search_strategy.sequence_strategy import SequenceStrategy
+from bci.version_control.binary_availability_index import BinaryAvailabilityIndex
 from bci.version_control.state_factory import StateFactory
 from bci.version_control.states.state import State, StateResult
 
@@ -33,11 +34,12 @@ class TestSequenceStrategy(unittest.TestCase):
         first_state = TestSequenceStrategy.create_state(0, is_available, outcome_func)
         last_state = TestSequenceStrategy.create_state(99, is_available, outcome_func)
         factory.boundary_states = (first_state, last_state)
+        factory.binary_availability_index = BinaryAvailabilityIndex()
 
         if evaluated_indexes:
-            factory.create_evaluated_states = lambda: TestSequenceStrategy.get_states(evaluated_indexes, lambda _: True, outcome_func)
+            factory.create_evaluated_states = lambda since=None: TestSequenceStrategy.get_states(evaluated_indexes, lambda _: True, outcome_func)
         else:
-            factory.create_evaluated_states = lambda: []
+            factory.create_evaluated_states = lambda since=None: []
         return factory
 
     @staticmethod
@@ -94,3 +96,66 @@ class TestSequenceStrategy(unittest.TestCase):
         sequence_strategy = SequenceStrategy(state_factory, 0)
         state = sequence_strategy._find_closest_state_with_available_binary(state_factory.create_state(1), (state_factory.create_state(0), state_factory.create_state(2)))
         assert state is None
+
+    def test_fetch_evaluated_states_incrementally(self):
+        state_factory = TestSequenceStrategy.create_state_factory(TestSequenceStrategy.always_has_binary)
+        fetched_since = []
+
+        def create_evaluated_states(since=None):
+            fetched_since.append(since)
+            if since is None:
+                return TestSequenceStrategy.get_states([10, 50], lambda _: True, lambda _: False)
+            return TestSequenceStrategy.get_states([30, 50], lambda _: True, lambda _: True)
+
+        state_factory.create_evaluated_states = create_evaluated_states
+        sequence_strategy = SequenceStrategy(state_factory, 0)
+        sequence_strategy._add_state(state_factory.create_state(70))
+
+        sequence_strategy._fetch_evaluated_states()
+        assert [state.index for state in sequence_strategy._completed_states] == [10, 50, 70]
+
+        sequence_strategy._fetch_evaluated_states()
+        assert fetched_since[0] is None
+        assert fetched_since[1] is not None
+        assert [state.index for state in sequence_strategy._completed_states] == [10, 30, 50, 70]
+        # Fetched states replace their previous version, which might not have had a result yet.
+        assert sequence_strategy._completed_states[2].result.reproduced
+
+    def test_find_closest_state_with_prefetched_availability(self):
+        state_factory = TestSequenceStrategy.create_state_factory(TestSequenceStrategy.only_has_binaries_for_even)
+        sequence_strategy = SequenceStrategy(state_factory, 0)
+        state_factory.binary_availability_index = BinaryAvailabilityIndex(
+            available=[40, 60], unavailable=[44, 45, 46, 47, 48, 49], index_range=(0, 99)
+        )
+        probed_indexes = []
+
+        def create_state(index):
+            probed_indexes.append(index)
+            return TestSequenceStrategy.create_state(index, TestSequenceStrategy.only_has_binaries_for_even, None)
+
+        state_factory.create_state = create_state
+        target = TestSequenceStrategy.create_state(45, TestSequenceStrategy.only_has_binaries_for_even, None)
+        boundaries = (TestSequenceStrategy.create_state(0, TestSequenceStrategy.only_has_binaries_for_even, None),
+                      TestSequenceStrategy.create_state(99, TestSequenceStrategy.only_has_binaries_for_even, None))
+        state = sequence_strategy._find_closest_state_with_available_binary(target, boundaries)
+        assert state is not None
+        assert state.index == 42
+        # Only unknown states closer than the closest known available state are probed.
+        assert sorted(probed_indexes) == [41, 42, 43]
+
+    def test_find_closest_state_with_complete_availability(self):
+        state_factory = TestSequenceStrategy.create_state_factory(TestSequenceStrategy.always_has_binary)
+        sequence_strategy = SequenceStrategy(state_factory, 0)
+        state_factory.binary_availability_index = BinaryAvailabilityIndex(
+            available=[10, 70], index_range=(0, 99), is_complete=True
+        )
+        state_factory.create_state = MagicMock(
+            side_effect=lambda index: TestSequenceStrategy.create_state(index, lambda _: True, None)
+        )
+        target = TestSequenceStrategy.create_state(50, lambda _: False, None)
+        boundaries = (TestSequenceStrategy.create_state(0, lambda _: True, None),
+                      TestSequenceStrategy.create_state(99, lambda _: True, None))
+        state = sequence_strategy._find_closest_state_with_available_binary(target, boundaries)
+        assert state is not None
+        assert state.index == 70
+        state_factory.create_state.assert_called_once_with(70)
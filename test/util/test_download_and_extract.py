@@ -0,0 +1,81 @@
+import functools
+import http.server
+import io
+import os
+import tarfile
+import tempfile
+import threading
+import unittest
+import zipfile
+
+from bci import util
+
+FILES = {
+    'firefox/firefox': b'#!/bin/sh\n',
+    'firefox/browser/omni.ja': b'x' * 100_000,
+}
+
+
+class TestDownloadAndExtract(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_folder = tempfile.TemporaryDirectory()
+        self.archive_folder_path = os.path.join(self.tmp_folder.name, 'archives')
+        os.makedirs(self.archive_folder_path)
+        for mode, extension in (('w:xz', 'tar.xz'), ('w:bz2', 'tar.bz2')):
+            with tarfile.open(os.path.join(self.archive_folder_path, f'firefox.{extension}'), mode) as tar:
+                for name, content in FILES.items():
+                    info = tarfile.TarInfo(name)
+                    info.size = len(content)
+                    info.mode = 0o755
+                    tar.addfile(info, io.BytesIO(content))
+        with zipfile.ZipFile(os.path.join(self.archive_folder_path, 'chrome-linux.zip'), 'w') as zip:
+            zip.writestr('chrome-linux/', '')
+            for name, content in FILES.items():
+                zip.writestr(name.replace('firefox', 'chrome-linux', 1), content)
+        with zipfile.ZipFile(os.path.join(self.archive_folder_path, 'flat.zip'), 'w') as zip:
+            zip.writestr('chrome', b'binary')
+            zip.writestr('locales/en-US.pak', b'locale')
+
+        handler = functools.partial(QuietHandler, directory=self.archive_folder_path)
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.base_url = f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+        self.tmp_folder.cleanup()
+
+    def test_tar_archives_are_streamed_and_flattened(self):
+        for extension in ('tar.xz', 'tar.bz2'):
+            dst_folder_path = os.path.join(self.tmp_folder.name, extension)
+            assert util.download_and_extract([f'{self.base_url}/firefox.{extension}'], dst_folder_path)
+            with open(os.path.join(dst_folder_path, 'browser', 'omni.ja'), 'rb') as file:
+                assert file.read() == FILES['firefox/browser/omni.ja']
+            assert os.access(os.path.join(dst_folder_path, 'firefox'), os.X_OK)
+            assert not os.path.exists(dst_folder_path + '.partial')
+
+    def test_zip_archives_are_flattened(self):
+        dst_folder_path = os.path.join(self.tmp_folder.name, 'chromium')
+        assert util.download_and_extract([f'{self.base_url}/chrome-linux.zip'], dst_folder_path)
+        assert sorted(os.listdir(dst_folder_path)) == ['browser', 'firefox']
+        with open(os.path.join(dst_folder_path, 'browser', 'omni.ja'), 'rb') as file:
+            assert file.read() == FILES['firefox/browser/omni.ja']
+
+        dst_folder_path = os.path.join(self.tmp_folder.name, 'flat')
+        assert util.download_and_extract([f'{self.base_url}/flat.zip'], dst_folder_path)
+        assert sorted(os.listdir(dst_folder_path)) == ['chrome', 'locales']
+
+    def test_next_url_is_tried(self):
+        dst_folder_path = os.path.join(self.tmp_folder.name, 'fallback')
+        urls = [f'{self.base_url}/missing.tar.xz', f'{self.base_url}/firefox.tar.xz']
+        assert util.download_and_extract(urls, dst_folder_path)
+        assert os.path.isfile(os.path.join(dst_folder_path, 'firefox'))
+        assert not util.download_and_extract([f'{self.base_url}/missing.tar.xz'], dst_folder_path + '_2')
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format: str, *args) -> None:
+        pass
@@ -0,0 +1,63 @@
+import http.server
+import threading
+import unittest
+
+from bci import util
+
+
+class TestHttpSession(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/'
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+
+    @staticmethod
+    def test_session_is_reused_per_thread():
+        assert util.get_session() is util.get_session()
+        assert util.get_session() is not util.get_session(max_retries=0)
+
+        sessions = []
+        thread = threading.Thread(target=lambda: sessions.append(util.get_session()))
+        thread.start()
+        thread.join()
+        assert sessions[0] is not util.get_session()
+        # Sessions of different threads share their connection pools.
+        assert sessions[0].get_adapter('https://') is util.get_session().get_adapter('https://')
+
+    def test_connections_are_reused(self):
+        stats_before = util.get_http_stats()
+        for _ in range(5):
+            assert util.request_html(self.url) == b'ok'
+        stats = util.get_http_stats()
+        assert stats['requests'] - stats_before['requests'] == 5
+        assert stats['connections'] - stats_before['connections'] == 1
+        assert stats['reused_connections'] - stats_before['reused_connections'] == 4
+
+    def test_connections_are_shared_between_threads(self):
+        stats_before = util.get_http_stats()
+        for _ in range(3):
+            thread = threading.Thread(target=util.request_html, args=(self.url,))
+            thread.start()
+            thread.join()
+        stats = util.get_http_stats()
+        assert stats['requests'] - stats_before['requests'] == 3
+        assert stats['connections'] - stats_before['connections'] == 1
+
+
+class KeepAliveHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, format: str, *args) -> None:
+        pass
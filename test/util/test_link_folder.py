@@ -0,0 +1,46 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from bci import util
+
+
+class TestLinkFolder(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_folder = tempfile.TemporaryDirectory()
+        self.src_path = os.path.join(self.tmp_folder.name, 'src')
+        self.dst_path = os.path.join(self.tmp_folder.name, 'dst')
+        os.makedirs(os.path.join(self.src_path, 'locales'))
+        with open(os.path.join(self.src_path, 'chrome'), 'w') as file:
+            file.write('binary')
+        os.chmod(os.path.join(self.src_path, 'chrome'), 0o755)
+        with open(os.path.join(self.src_path, 'locales', 'en-US.pak'), 'w') as file:
+            file.write('locale')
+        os.symlink('chrome', os.path.join(self.src_path, 'chrome-link'))
+
+    def tearDown(self) -> None:
+        self.tmp_folder.cleanup()
+
+    def assert_same_tree(self) -> None:
+        with open(os.path.join(self.dst_path, 'chrome')) as file:
+            assert file.read() == 'binary'
+        with open(os.path.join(self.dst_path, 'locales', 'en-US.pak')) as file:
+            assert file.read() == 'locale'
+        assert os.access(os.path.join(self.dst_path, 'chrome'), os.X_OK)
+        assert os.readlink(os.path.join(self.dst_path, 'chrome-link')) == 'chrome'
+
+    def test_link_folder(self):
+        assert util.link_folder(self.src_path, self.dst_path)
+        self.assert_same_tree()
+        assert os.path.samefile(os.path.join(self.src_path, 'chrome'), os.path.join(self.dst_path, 'chrome'))
+
+        # Removing the linked folder leaves the original untouched.
+        util.rmtree(self.dst_path)
+        assert os.path.isfile(os.path.join(self.src_path, 'chrome'))
+
+    def test_link_folder_falls_back_to_copying(self):
+        with patch('os.link', side_effect=OSError(18, 'Invalid cross-device link')):
+            assert not util.link_folder(self.src_path, self.dst_path)
+        self.assert_same_tree()
+        assert not os.path.samefile(os.path.join(self.src_path, 'chrome'), os.path.join(self.dst_path, 'chrome'))
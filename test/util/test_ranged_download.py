@@ -0,0 +1,144 @@
+import base64
+import hashlib
+import http.server
+import io
+import os
+import re
+import tarfile
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+from bci import util
+
+CONTENT = os.urandom(1_000_000)
+
+
+class TestRangedDownload(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_folder = tempfile.TemporaryDirectory()
+        tar_buffer = io.BytesIO()
+        with tarfile.open(fileobj=tar_buffer, mode='w:xz') as tar:
+            info = tarfile.TarInfo('firefox/omni.ja')
+            info.size = len(CONTENT)
+            tar.addfile(info, io.BytesIO(CONTENT))
+        RangeHandler.resources = {'/file.bin': CONTENT, '/firefox.tar.xz': tar_buffer.getvalue()}
+        RangeHandler.corrupt_hash = False
+        RangeHandler.drop_after = None
+        RangeHandler.requested_ranges = []
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), RangeHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.base_url = f'http://127.0.0.1:{self.server.server_address[1]}'
+        self.dst_file_path = os.path.join(self.tmp_folder.name, 'file.bin')
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+        self.tmp_folder.cleanup()
+
+    def test_large_file_is_downloaded_in_segments(self):
+        with patch.object(util, 'MIN_DOWNLOAD_SEGMENT_SIZE', 100_000):
+            assert util.download_file(f'{self.base_url}/file.bin', self.dst_file_path) == len(CONTENT)
+        with open(self.dst_file_path, 'rb') as file:
+            assert file.read() == CONTENT
+        assert len(RangeHandler.requested_ranges) == util.MAX_DOWNLOAD_SEGMENTS
+
+    def test_small_file_is_downloaded_at_once(self):
+        assert util.download_file(f'{self.base_url}/file.bin', self.dst_file_path) == len(CONTENT)
+        with open(self.dst_file_path, 'rb') as file:
+            assert file.read() == CONTENT
+        assert RangeHandler.requested_ranges == []
+
+    def test_interrupted_segments_are_resumed(self):
+        RangeHandler.drop_after = 50_000
+        with patch.object(util, 'MIN_DOWNLOAD_SEGMENT_SIZE', 100_000):
+            assert util.download_file(f'{self.base_url}/file.bin', self.dst_file_path) == len(CONTENT)
+        with open(self.dst_file_path, 'rb') as file:
+            assert file.read() == CONTENT
+        assert len(RangeHandler.requested_ranges) > util.MAX_DOWNLOAD_SEGMENTS
+
+    def test_interrupted_stream_is_resumed(self):
+        RangeHandler.drop_after = 50_000
+        assert util.download_file(f'{self.base_url}/file.bin', self.dst_file_path) == len(CONTENT)
+        with open(self.dst_file_path, 'rb') as file:
+            assert file.read() == CONTENT
+        assert RangeHandler.requested_ranges[0] == 'bytes=50000-'
+
+    def test_checksum_mismatch_is_detected(self):
+        RangeHandler.corrupt_hash = True
+        with patch.object(util, 'MIN_DOWNLOAD_SEGMENT_SIZE', 100_000):
+            self.assertRaises(ValueError, util.download_file, f'{self.base_url}/file.bin', self.dst_file_path)
+        self.assertRaises(ValueError, util.download_file, f'{self.base_url}/file.bin', self.dst_file_path)
+
+    def test_interrupted_tar_archive_is_resumed(self):
+        RangeHandler.drop_after = 50_000
+        dst_folder_path = os.path.join(self.tmp_folder.name, 'firefox')
+        assert util.download_and_extract([f'{self.base_url}/firefox.tar.xz'], dst_folder_path)
+        with open(os.path.join(dst_folder_path, 'omni.ja'), 'rb') as file:
+            assert file.read() == CONTENT
+
+    def test_corrupted_tar_archive_is_discarded(self):
+        RangeHandler.corrupt_hash = True
+        dst_folder_path = os.path.join(self.tmp_folder.name, 'firefox')
+        assert not util.download_and_extract([f'{self.base_url}/firefox.tar.xz'], dst_folder_path)
+        assert not os.path.exists(dst_folder_path)
+
+
+class RangeHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Serves in-memory resources like Google Cloud Storage does: with range support and an MD5 hash header.
+    The first response that exceeds `drop_after` bytes is cut off to simulate a broken connection.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    resources: dict[str, bytes] = {}
+    corrupt_hash = False
+    drop_after = None
+    requested_ranges: list[str] = []
+    lock = threading.Lock()
+
+    def do_HEAD(self):
+        self.__respond(include_body=False)
+
+    def do_GET(self):
+        self.__respond(include_body=True)
+
+    def __respond(self, include_body: bool) -> None:
+        content = self.resources.get(self.path)
+        if content is None:
+            self.send_error(404)
+            return
+        start, end = 0, len(content) - 1
+        range_header = self.headers.get('Range')
+        if range_header is not None:
+            with self.lock:
+                self.requested_ranges.append(range_header)
+            match = re.fullmatch(r'bytes=(\d+)-(\d*)', range_header)
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) else end
+        md5 = hashlib.md5(content[::-1] if self.corrupt_hash else content).digest()
+        self.send_response(206 if range_header else 200)
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Length', str(end - start + 1))
+        self.send_header('x-goog-hash', f'crc32c=AAAAAA==,md5={base64.b64encode(md5).decode()}')
+        if range_header:
+            self.send_header('Content-Range', f'bytes {start}-{end}/{len(content)}')
+        self.end_headers()
+        if not include_body:
+            return
+        body = content[start : end + 1]
+        with self.lock:
+            drop_after = RangeHandler.drop_after
+            if drop_after is not None and len(body) > drop_after:
+                RangeHandler.drop_after = None
+                body = body[:drop_after]
+                self.close_connection = True
+        self.wfile.write(body)
+        if self.close_connection:
+            self.wfile.flush()
+
+    def log_message(self, format: str, *args) -> None:
+        pass
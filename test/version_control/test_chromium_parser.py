@@ -0,0 +1,56 @@
+import unittest
+
+from bci.version_control.revision_parser.chromium_parser import ChromiumRevisionParser
+
+DEFAULT_FORMAT_DUMP = '''commit 1111111111111111111111111111111111111111 (HEAD -> main, origin/main)
+Author: Developer <developer@chromium.org>
+Date:   Mon Jan 1 00:00:00 2024 +0000
+
+    Revert "Add feature"
+
+    This reverts commit 2222222222222222222222222222222222222222.
+
+    > Add feature
+    >
+    > Cr-Commit-Position: refs/heads/main@{#1250000}
+
+    Change-Id: I0000000000000000000000000000000000000000
+    Cr-Commit-Position: refs/heads/main@{#1250010}
+
+commit 3333333333333333333333333333333333333333
+Author: Developer <developer@chromium.org>
+
+    Merge to release branch
+
+    Cr-Commit-Position: refs/branch-heads/6099@{#12}
+
+commit 4444444444444444444444444444444444444444
+Author: developer@chromium.org
+
+    Old commit
+
+    git-svn-id: svn://svn.chromium.org/chrome/trunk/src@290000 0039d316-1c4b-4281-b951-d872f2087c98
+'''
+
+COMPACT_FORMAT_DUMP = '''5555555555555555555555555555555555555555 refs/heads/main@{#1250011}
+6666666666666666666666666666666666666666
+7777777777777777777777777777777777777777 refs/heads/master@{#800000}
+'''
+
+
+class TestChromiumParser(unittest.TestCase):
+    @staticmethod
+    def test_parse_default_git_log():
+        revisions = list(ChromiumRevisionParser.parse_git_log(DEFAULT_FORMAT_DUMP.splitlines()))
+        assert revisions == [
+            (1250010, '1111111111111111111111111111111111111111'),
+            (290000, '4444444444444444444444444444444444444444'),
+        ]
+
+    @staticmethod
+    def test_parse_compact_git_log():
+        revisions = list(ChromiumRevisionParser.parse_git_log(COMPACT_FORMAT_DUMP.splitlines(keepends=True)))
+        assert revisions == [
+            (1250011, '5555555555555555555555555555555555555555'),
+            (800000, '7777777777777777777777777777777777777777'),
+        ]
@@ -0,0 +1,103 @@
+import fnmatch
+import http.server
+import json
+import threading
+import unittest
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlparse
+
+from bci import util
+from bci.version_control.repository.online import chromium
+
+REVISION_NBS = [9998, 9999, 10000, 10001, 10050, 99999, 100000, 100007, 123456]
+OBJECT_NAMES = sorted(
+    [f'Linux_x64/{nb}/chrome-linux.zip' for nb in REVISION_NBS]
+    + [f'Linux_x64/{nb}/REVISIONS' for nb in REVISION_NBS]
+    + ['Linux_x64/LAST_CHANGE']
+)
+
+
+class TestChromiumSnapshotListing(unittest.TestCase):
+    def setUp(self) -> None:
+        BucketHandler.requests = []
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), BucketHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        listing_url = f'http://127.0.0.1:{self.server.server_address[1]}/storage/v1/b/bucket/o'
+        self.url_patch = patch.object(chromium, 'SNAPSHOT_LISTING_URL', listing_url)
+        self.url_patch.start()
+        self.listings_patch = patch.dict(chromium.__dict__, {'__snapshot_listings': {}})
+        self.listings_patch.start()
+
+    def tearDown(self) -> None:
+        self.listings_patch.stop()
+        self.url_patch.stop()
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+
+    def test_revisions_within_range_are_listed(self):
+        assert chromium.get_revision_nbs_with_snapshot_binary(10000, 100000) == [10000, 10001, 10050, 99999, 100000]
+        assert chromium.get_revision_nbs_with_snapshot_binary(9999, 10000) == [9999, 10000]
+        assert chromium.get_revision_nbs_with_snapshot_binary(10002, 10049) == []
+
+    def test_pages_are_followed(self):
+        assert chromium.get_revision_nbs_with_snapshot_binary(1, 999999) == REVISION_NBS
+        # One listing per number of digits, of which the five- and six-digit ones span two pages.
+        assert len(BucketHandler.requests) == 8
+
+    def test_recent_listings_are_reused(self):
+        assert chromium.get_listed_revision_nbs_with_snapshot_binary(10000, 100000) is None
+        chromium.get_revision_nbs_with_snapshot_binary(10000, 100000)
+        nb_of_requests = len(BucketHandler.requests)
+
+        listed = chromium.get_listed_revision_nbs_with_snapshot_binary(10000, 100000)
+        assert listed == [10000, 10001, 10050, 99999, 100000]
+        assert chromium.get_listed_revision_nbs_with_snapshot_binary(10001, 99999) == [10001, 10050, 99999]
+        assert chromium.get_listed_revision_nbs_with_snapshot_binary(9999, 100000) is None
+        assert len(BucketHandler.requests) == nb_of_requests
+
+        with patch.object(chromium, 'SNAPSHOT_LISTING_MAX_AGE', 0):
+            assert chromium.get_listed_revision_nbs_with_snapshot_binary(10000, 100000) is None
+
+    def test_listing_failure_is_raised(self):
+        self.url_patch.stop()
+        with patch.object(chromium, 'SNAPSHOT_LISTING_URL', self.url_patch.new + '/missing'):
+            self.assertRaises(util.ResourceNotFound, chromium.get_revision_nbs_with_snapshot_binary, 1, 10)
+        self.url_patch.start()
+
+
+class BucketHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Mimics the object listing of Google Cloud Storage, with pages of two objects.
+    """
+
+    requests: list[dict] = []
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if not url.path.endswith('/o'):
+            self.send_error(404)
+            return
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        self.requests.append(params)
+        names = [
+            name
+            for name in OBJECT_NAMES
+            if name.startswith(params['prefix'])
+            and params['startOffset'] <= name < params['endOffset']
+            and fnmatch.fnmatchcase(name, params['matchGlob'])
+        ]
+        start = int(params.get('pageToken', 0))
+        page = {'items': [{'name': name} for name in names[start : start + 2]]}
+        if start + 2 < len(names):
+            page['nextPageToken'] = str(start + 2)
+        body = json.dumps(page).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
@@ -0,0 +1,48 @@
+import os
+import sys
+import tempfile
+import unittest
+
+from bci.web.module_cache import ModuleCache
+
+
+class TestModuleCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_folder = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.tmp_folder.cleanup()
+        for module_name in [name for name in sys.modules if name.startswith('a.test/')]:
+            del sys.modules[module_name]
+
+    def write(self, file_name: str, value: str) -> str:
+        path = os.path.join(self.tmp_folder.name, file_name)
+        with open(path, 'w') as file:
+            file.write(f'VALUE = {value!r}\n')
+        return path
+
+    def test_module_is_reloaded_when_changed(self):
+        cache = ModuleCache()
+        path = self.write('main.py', 'first')
+        module = cache.get_module('a.test/project/poc', path)
+        assert module.VALUE == 'first'
+        assert cache.get_module('a.test/project/poc', path) is module
+
+        path = self.write('main.py', 'second value')
+        reloaded_module = cache.get_module('a.test/project/poc', path)
+        assert reloaded_module is not module
+        assert reloaded_module.VALUE == 'second value'
+        assert sys.modules['a.test/project/poc'] is reloaded_module
+
+    def test_least_recently_used_module_is_evicted(self):
+        cache = ModuleCache(max_nb_of_modules=2)
+        paths = [self.write(f'poc{i}.py', str(i)) for i in range(3)]
+        first_module = cache.get_module('a.test/project/poc0', paths[0])
+        cache.get_module('a.test/project/poc1', paths[1])
+        # Using the first module makes the second one the least recently used.
+        assert cache.get_module('a.test/project/poc0', paths[0]) is first_module
+        cache.get_module('a.test/project/poc2', paths[2])
+
+        assert len(cache) == 2
+        assert 'a.test/project/poc1' not in sys.modules
+        assert cache.get_module('a.test/project/poc0', paths[0]) is first_module
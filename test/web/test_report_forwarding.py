@@ -0,0 +1,69 @@
+import http.server
+import json
+import threading
+import unittest
+from unittest.mock import patch
+
+from bci.web import report_forwarding
+from bci.web.report_forwarding import ReportForwarder
+
+
+class CollectorHandler(http.server.BaseHTTPRequestHandler):
+    bodies = []
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def do_POST(self):
+        self.bodies.append(json.loads(self.rfile.read(int(self.headers['Content-Length']))))
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+
+class TestReportForwarder(unittest.TestCase):
+    def setUp(self) -> None:
+        CollectorHandler.bodies = []
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), CollectorHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.port_patch = patch.object(report_forwarding, 'COLLECTOR_PORT', self.server.server_address[1])
+        self.port_patch.start()
+
+    def tearDown(self) -> None:
+        self.port_patch.stop()
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+
+    def test_reports_are_forwarded_in_batches(self):
+        forwarder = ReportForwarder(nb_of_senders=1)
+        reports = [{'url': f'https://a.test/report/?bughog_var{i}=OK'} for i in range(200)]
+        for report in reports:
+            assert forwarder.forward('127.0.0.1', report)
+        forwarder.join()
+
+        received = [report for body in CollectorHandler.bodies for report in body]
+        assert received == [{**report, 'partition_id': None} for report in reports]
+        assert len(CollectorHandler.bodies) < len(reports)
+        assert forwarder.get_stats() == {'queue_depth': 0, 'forwarded': 200, 'dropped': 0, 'failed': 0}
+
+    @staticmethod
+    def test_reports_are_tagged_with_partition_on_receipt():
+        forwarder = ReportForwarder(nb_of_senders=1)
+        forwarder.register_partition('127.0.0.1', 'first')
+        assert forwarder.forward('127.0.0.1', {'url': 'a'})
+        forwarder.register_partition('127.0.0.1', 'second')
+        assert forwarder.forward('127.0.0.1', {'url': 'b'})
+        forwarder.join()
+
+        received = [report for body in CollectorHandler.bodies for report in body]
+        assert received == [{'url': 'a', 'partition_id': 'first'}, {'url': 'b', 'partition_id': 'second'}]
+
+    @staticmethod
+    def test_reports_are_dropped_when_queue_is_full():
+        forwarder = ReportForwarder(nb_of_senders=0, max_queue_size=2)
+        assert forwarder.forward('127.0.0.1', {'url': 'a'})
+        assert forwarder.forward('127.0.0.1', {'url': 'b'})
+        assert not forwarder.forward('127.0.0.1', {'url': 'c'})
+        assert forwarder.get_stats() == {'queue_depth': 2, 'forwarded': 0, 'dropped': 1, 'failed': 0}